@@ -198,21 +198,31 @@ def create_app():
     # CSP nonce support removed - using Talisman's built-in CSP with unsafe-inline for scripts
     # This avoids importing app.core.csp which has heavy cryptography dependencies
 
-    # Initialize Flask-Caching for performance optimization
+    # Initialize the response cache: a SQLite file shared by every worker on the
+    # host (default) or Flask-Caching's per-process SimpleCache
+    cache_backend = CONFIG.get('RESPONSE_CACHE_BACKEND') or 'sqlite'
     try:
-        from flask_caching import Cache
-        cache_config = {
-            'CACHE_TYPE': 'SimpleCache',  # In-memory cache
-            'CACHE_DEFAULT_TIMEOUT': 300  # 5 minutes default timeout
-        }
-        cache = Cache(app, config=cache_config)
-        app.config['CACHE'] = cache
-        logger.info("Flask-Caching initialized successfully")
+        if cache_backend == 'sqlite':
+            from .utils.sqlite_cache import SQLiteCache
+            cache_path = CONFIG.get('RESPONSE_CACHE_PATH') or str(runtime_state.persistent_dir / 'response_cache.db')
+            app.config['CACHE'] = SQLiteCache(cache_path, default_timeout=300)
+            logger.info(f"Shared SQLite response cache initialized at {cache_path}")
+        else:
+            from flask_caching import Cache
+            cache_config = {
+                'CACHE_TYPE': 'SimpleCache',  # In-memory cache
+                'CACHE_DEFAULT_TIMEOUT': 300  # 5 minutes default timeout
+            }
+            # Wrapped so entries can be evicted by tag instead of clearing the whole store
+            from .utils.tagged_cache import TaggedCache
+            cache = Cache(app, config=cache_config)
+            app.config['CACHE'] = TaggedCache(cache)
+            logger.info("Flask-Caching initialized successfully")
     except ImportError:
         logger.warning("Flask-Caching not available, caching disabled")
         app.config['CACHE'] = None
     except Exception as e:
-        logger.warning(f"Failed to initialize Flask-Caching: {e}")
+        logger.warning(f"Failed to initialize response cache ({cache_backend}): {e}")
         app.config['CACHE'] = None
 
     # Initialize Flask-Compress for gzip compression
@@ -364,6 +374,13 @@ def create_app():
     except Exception as e:
         logger.warning(f"Failed to register audit blueprint: {e}")
 
+    # Midnight roll-forward of the materialised compliance snapshot
+    try:
+        from .services.compliance_snapshot import start_snapshot_scheduler
+        start_snapshot_scheduler(app)
+    except Exception as e:
+        logger.warning(f"Compliance snapshot scheduler unavailable: {e}")
+
 
     # Jinja filters (match main app filters for consistency)
     @app.template_filter('format_date')
@@ -7,6 +7,16 @@ db = None
 User = None
 
 def init_cli(app, database, user_model):
+    @app.cli.command("compliance-daemon")
+    def compliance_daemon():
+        """Run the shared compliance daemon on COMPLIANCE_DAEMON_SOCKET."""
+        from .services.compliance_daemon import serve
+        socket_path = app.config['CONFIG'].get('COMPLIANCE_DAEMON_SOCKET')
+        if not socket_path:
+            raise click.UsageError("Set COMPLIANCE_DAEMON_SOCKET to run the compliance daemon")
+        serve(socket_path, app.config['DATABASE'])
+
+
     @app.cli.group("admin")
     def admin():
         """Admin management commands."""
@@ -61,6 +61,46 @@ def get_db():
         g._db_conn = conn
     return conn
 
+TRIP_NORMALIZED_COLUMNS = ('entry_ord', 'exit_ord', 'country_code', 'is_schengen')
+
+
+def sync_trip_normalized_columns(conn: sqlite3.Connection, trip_ids) -> None:
+    """Recompute the normalised columns for trips after an UPDATE (caller commits)."""
+    trip_ids = [int(trip_id) for trip_id in trip_ids]
+    if not trip_ids:
+        return
+    placeholders = ','.join('?' * len(trip_ids))
+    rows = conn.execute(
+        f'SELECT id, entry_date, exit_date, country FROM trips WHERE id IN ({placeholders})',
+        trip_ids,
+    ).fetchall()
+    _write_trip_normalized_columns(conn, rows)
+
+
+def backfill_trip_normalized_columns(conn: sqlite3.Connection) -> int:
+    """Populate normalised columns for rows written before they existed (caller commits)."""
+    rows = conn.execute(
+        'SELECT id, entry_date, exit_date, country FROM trips '
+        'WHERE is_schengen IS NULL OR entry_ord IS NULL OR exit_ord IS NULL OR country_code IS NULL'
+    ).fetchall()
+    _write_trip_normalized_columns(conn, rows)
+    return len(rows)
+
+
+def _write_trip_normalized_columns(conn: sqlite3.Connection, rows) -> None:
+    from .services.rolling90 import normalized_trip_columns
+
+    updates = []
+    for trip_id, entry_date, exit_date, country in rows:
+        columns = normalized_trip_columns(entry_date, exit_date, country)
+        updates.append(tuple(columns[name] for name in TRIP_NORMALIZED_COLUMNS) + (trip_id,))
+    if updates:
+        conn.executemany(
+            'UPDATE trips SET entry_ord = ?, exit_ord = ?, country_code = ?, is_schengen = ? WHERE id = ?',
+            updates,
+        )
+
+
 def init_db():
     """Initialize database tables"""
     conn = get_db()
@@ -87,6 +127,10 @@ def init_db():
             job_ref TEXT,
             ghosted BOOLEAN DEFAULT 0,
             travel_days INTEGER DEFAULT 0,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER,
             created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
             FOREIGN KEY (employee_id) REFERENCES employees (id)
         )
@@ -119,6 +163,21 @@ def init_db():
     except sqlite3.OperationalError:
         # Column already exists, ignore error
         pass
+
+    # Add write-time normalised columns (day ordinals, country code, Schengen flag)
+    for column, column_type in (
+        ('entry_ord', 'INTEGER'),
+        ('exit_ord', 'INTEGER'),
+        ('country_code', 'TEXT'),
+        ('is_schengen', 'INTEGER'),
+    ):
+        try:
+            c.execute(f'ALTER TABLE trips ADD COLUMN {column} {column_type}')
+        except sqlite3.OperationalError:
+            # Column already exists, ignore error
+            pass
+    c.execute('CREATE INDEX IF NOT EXISTS idx_trips_schengen_employee ON trips (is_schengen, employee_id, entry_ord, exit_ord)')
+    backfill_trip_normalized_columns(conn)
     
     # Create alerts table
     c.execute('''
@@ -136,6 +195,42 @@ def init_db():
     c.execute('CREATE INDEX IF NOT EXISTS idx_alerts_employee_active ON alerts (employee_id, resolved)')
     c.execute('CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON alerts (created_at)')
     
+    # Create materialised per-employee compliance snapshot (see services/compliance_snapshot.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS employee_compliance (
+            employee_id INTEGER PRIMARY KEY,
+            days_used INTEGER NOT NULL,
+            days_remaining INTEGER NOT NULL,
+            risk_level TEXT NOT NULL,
+            safe_entry_date DATE,
+            next_risk_transition_date DATE,
+            computed_for DATE NOT NULL,
+            data_version INTEGER NOT NULL DEFAULT 1,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_employee_compliance_current ON employee_compliance (computed_for, days_remaining)')
+
+    # Per-day trip coverage counts for incremental presence updates (see services/presence_delta.py)
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS employee_presence_counts (
+            employee_id INTEGER PRIMARY KEY,
+            base_ord INTEGER,
+            counts BLOB NOT NULL,
+            data_version INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    try:
+        c.execute('ALTER TABLE employee_presence_counts ADD COLUMN data_version INTEGER')
+    except sqlite3.OperationalError:
+        # Column already exists, ignore error
+        pass
+    
+    # Trigger-maintained data version counters for response cache keys (see utils/cache_helpers.py)
+    from .repositories import data_version_repository
+    data_version_repository.ensure_schema(conn)
+
     # Create admin table
     c.execute('''
         CREATE TABLE IF NOT EXISTS admin (
@@ -415,10 +510,15 @@ class Trip:
         """Create new trip"""
         conn = get_db()
         c = conn.cursor()
+        from .services.rolling90 import normalized_trip_columns
+
+        normalized = normalized_trip_columns(entry_date, exit_date, country)
         c.execute('''
-            INSERT INTO trips (employee_id, country, entry_date, exit_date, purpose, is_private)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (employee_id, country, entry_date, exit_date, purpose, is_private))
+            INSERT INTO trips (employee_id, country, entry_date, exit_date, purpose, is_private,
+                               entry_ord, exit_ord, country_code, is_schengen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (employee_id, country, entry_date, exit_date, purpose, is_private,
+              normalized['entry_ord'], normalized['exit_ord'], normalized['country_code'], normalized['is_schengen']))
         trip_id = c.lastrowid
         conn.commit()
         conn.close()
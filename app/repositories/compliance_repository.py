@@ -0,0 +1,274 @@
+"""SQLite access helpers for the materialised compliance snapshot."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+SNAPSHOT_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS employee_compliance (
+        employee_id INTEGER PRIMARY KEY,
+        days_used INTEGER NOT NULL,
+        days_remaining INTEGER NOT NULL,
+        risk_level TEXT NOT NULL,
+        safe_entry_date DATE,
+        next_risk_transition_date DATE,
+        computed_for DATE NOT NULL,
+        data_version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+SNAPSHOT_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_employee_compliance_current "
+    "ON employee_compliance (computed_for, days_remaining)"
+)
+
+# One row recording the last day the midnight roll-forward was claimed, shared by every worker
+ROLLOVER_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS compliance_snapshot_rollover (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        run_for DATE NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+TRIP_COLUMNS = "employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen"
+SCHENGEN_FILTER = "(is_schengen = 1 OR is_schengen IS NULL)"
+
+SNAPSHOT_COLUMNS = (
+    "employee_id",
+    "days_used",
+    "days_remaining",
+    "risk_level",
+    "safe_entry_date",
+    "next_risk_transition_date",
+    "computed_for",
+)
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(SNAPSHOT_TABLE_SQL)
+    conn.execute(SNAPSHOT_INDEX_SQL)
+
+
+def claim_rollover(conn: sqlite3.Connection, run_for: str) -> bool:
+    """Record run_for as claimed; False when a worker already claimed that day or a later one."""
+    conn.execute(ROLLOVER_TABLE_SQL)
+    cursor = conn.execute(
+        """
+        INSERT INTO compliance_snapshot_rollover (id, run_for) VALUES (1, ?)
+        ON CONFLICT (id) DO UPDATE SET
+            run_for = excluded.run_for,
+            updated_at = CURRENT_TIMESTAMP
+        WHERE compliance_snapshot_rollover.run_for < excluded.run_for
+        """,
+        (run_for,),
+    )
+    return cursor.rowcount == 1
+
+
+def fetch_trips_by_employee(
+    conn: sqlite3.Connection,
+    employee_ids: Optional[Iterable[int]] = None,
+    schengen_only: bool = True,
+) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Return Schengen trips grouped by employee for existing employees (all when ids is None).
+
+    Rows written before the normalised columns existed (is_schengen NULL) are
+    included and classified by presence_days from their country. With
+    ``schengen_only=False`` every trip is returned (for the stay rules).
+    """
+    trip_filter = SCHENGEN_FILTER if schengen_only else "1 = 1"
+    if employee_ids is None:
+        employee_rows = conn.execute("SELECT id FROM employees").fetchall()
+        trip_rows = conn.execute(
+            f"SELECT {TRIP_COLUMNS} FROM trips WHERE {trip_filter}"
+        ).fetchall()
+    else:
+        ids = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        employee_rows = conn.execute(
+            f"SELECT id FROM employees WHERE id IN ({placeholders})", ids
+        ).fetchall()
+        trip_rows = conn.execute(
+            f"SELECT {TRIP_COLUMNS} FROM trips WHERE {trip_filter} AND employee_id IN ({placeholders})",
+            ids,
+        ).fetchall()
+
+    grouped: Dict[int, List[Dict[str, Any]]] = {row[0]: [] for row in employee_rows}
+    for row in trip_rows:
+        bucket = grouped.get(row[0])
+        if bucket is not None:
+            bucket.append({
+                "entry_date": row[1],
+                "exit_date": row[2],
+                "country": row[3],
+                "entry_ord": row[4],
+                "exit_ord": row[5],
+                "is_schengen": row[6],
+            })
+    return grouped
+
+
+def upsert_snapshots(conn: sqlite3.Connection, rows: Sequence[Dict[str, Any]]) -> None:
+    """Insert or replace snapshot rows, bumping data_version on every change."""
+    if not rows:
+        return
+    conn.executemany(
+        """
+        INSERT INTO employee_compliance (
+            employee_id, days_used, days_remaining, risk_level,
+            safe_entry_date, next_risk_transition_date, computed_for
+        ) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET
+            days_used = excluded.days_used,
+            days_remaining = excluded.days_remaining,
+            risk_level = excluded.risk_level,
+            safe_entry_date = excluded.safe_entry_date,
+            next_risk_transition_date = excluded.next_risk_transition_date,
+            computed_for = excluded.computed_for,
+            data_version = employee_compliance.data_version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        [tuple(row[column] for column in SNAPSHOT_COLUMNS) for row in rows],
+    )
+
+
+def delete_snapshots(conn: sqlite3.Connection, employee_ids: Iterable[int]) -> None:
+    conn.executemany(
+        "DELETE FROM employee_compliance WHERE employee_id = ?",
+        [(int(employee_id),) for employee_id in employee_ids],
+    )
+
+
+def delete_orphaned_snapshots(conn: sqlite3.Connection) -> None:
+    conn.execute(
+        "DELETE FROM employee_compliance WHERE employee_id NOT IN (SELECT id FROM employees)"
+    )
+
+
+def fetch_stale_employee_ids(conn: sqlite3.Connection, computed_for: str) -> List[int]:
+    """Employees whose snapshot is missing or was computed for another day."""
+    cursor = conn.execute(
+        """
+        SELECT e.id FROM employees e
+        LEFT JOIN employee_compliance s ON s.employee_id = e.id
+        WHERE s.employee_id IS NULL OR s.computed_for != ?
+        """,
+        (computed_for,),
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def fetch_snapshots(conn: sqlite3.Connection) -> List[Dict[str, Any]]:
+    cursor = conn.execute(
+        """
+        SELECT employee_id, days_used, days_remaining, risk_level, safe_entry_date,
+               next_risk_transition_date, computed_for, data_version
+        FROM employee_compliance
+        """
+    )
+    columns = [description[0] for description in cursor.description]
+    return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+
+def count_at_risk(conn: sqlite3.Connection, computed_for: str, below_remaining: int) -> int:
+    cursor = conn.execute(
+        "SELECT COUNT(*) FROM employee_compliance s JOIN employees e ON e.id = s.employee_id "
+        "WHERE s.computed_for = ? AND s.days_remaining < ?",
+        (computed_for, below_remaining),
+    )
+    return int(cursor.fetchone()[0])
+
+
+# Union length of each employee's Schengen trips clipped to [window_start, window_end].
+# Clipped intervals are ordered by start; each contributes only the part beyond the
+# furthest end covered by earlier intervals, which deduplicates overlapping trips.
+WINDOW_DAYS_USED_SQL = """
+    WITH clipped AS (
+        SELECT employee_id,
+               MAX(entry_ord, :window_start) AS start_ord,
+               MIN(exit_ord, :window_end) AS end_ord
+        FROM trips
+        WHERE is_schengen = 1
+          AND entry_ord <= exit_ord
+          AND entry_ord >= :entry_floor
+          AND entry_ord <= :window_end
+          AND exit_ord >= :window_start
+    ),
+    ordered AS (
+        SELECT employee_id, start_ord, end_ord,
+               MAX(end_ord) OVER (
+                   PARTITION BY employee_id ORDER BY start_ord, end_ord
+                   ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING
+               ) AS covered_to
+        FROM clipped
+    ),
+    usage AS (
+        SELECT employee_id,
+               SUM(MAX(0, end_ord - MAX(start_ord, COALESCE(covered_to, start_ord - 1) + 1) + 1)) AS days_used
+        FROM ordered
+        GROUP BY employee_id
+    )
+"""
+
+
+def _window_params(ref_ord: int, window_days: int, compliance_start_ord: Optional[int]) -> Dict[str, int]:
+    window_start = ref_ord - window_days
+    entry_floor = 0
+    if compliance_start_ord is not None:
+        window_start = max(window_start, compliance_start_ord)
+        entry_floor = compliance_start_ord
+    return {"window_start": window_start, "window_end": ref_ord - 1, "entry_floor": entry_floor}
+
+
+def fetch_window_days_used(
+    conn: sqlite3.Connection,
+    ref_ord: int,
+    window_days: int,
+    compliance_start_ord: Optional[int] = None,
+) -> Dict[int, int]:
+    """
+    Days used in the window before ``ref_ord`` for every employee, in one aggregate query.
+
+    Matches rolling90.days_used_in_window: trips entering before the compliance
+    start are ignored and the window start is clamped to it. Relies on the
+    normalised trip columns (see models.backfill_trip_normalized_columns).
+    """
+    cursor = conn.execute(
+        WINDOW_DAYS_USED_SQL
+        + """
+        SELECT e.id, COALESCE(u.days_used, 0)
+        FROM employees e
+        LEFT JOIN usage u ON u.employee_id = e.id
+        """,
+        _window_params(ref_ord, window_days, compliance_start_ord),
+    )
+    return {row[0]: int(row[1]) for row in cursor.fetchall()}
+
+
+def count_window_days_used_at_least(
+    conn: sqlite3.Connection,
+    ref_ord: int,
+    window_days: int,
+    min_days_used: int,
+    compliance_start_ord: Optional[int] = None,
+) -> int:
+    """Number of employees whose window usage is at least ``min_days_used``."""
+    if min_days_used <= 0:
+        return int(conn.execute("SELECT COUNT(*) FROM employees").fetchone()[0])
+    params = _window_params(ref_ord, window_days, compliance_start_ord)
+    params["min_days_used"] = min_days_used
+    cursor = conn.execute(
+        WINDOW_DAYS_USED_SQL
+        + """
+        SELECT COUNT(*) FROM usage u
+        JOIN employees e ON e.id = u.employee_id
+        WHERE u.days_used >= :min_days_used
+        """,
+        params,
+    )
+    return int(cursor.fetchone()[0])
@@ -0,0 +1,188 @@
+"""SQLite access helpers for the dashboard."""
+
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Column order of the tuples in DashboardTrips.trips
+TRIP_FIELDS = ("trip_id", "entry_date", "exit_date", "country", "is_private", "entry_ord", "exit_ord", "is_schengen")
+
+EMPLOYEE_ORDER_SQL = {
+    "first_name": "name",
+    # Everything after the first space, then the full name
+    "last_name": 'SUBSTR(name, INSTR(name, " ") + 1), name',
+}
+
+# Every trip of every existing employee in one scan, ranked per employee by
+# most recent exit (for the recent-trips list) and, among upcoming trips, by
+# earliest entry (rank 1 is the next trip).
+DASHBOARD_TRIPS_SQL = """
+    SELECT t.employee_id, t.id, t.entry_date, t.exit_date, t.country, t.is_private,
+           t.entry_ord, t.exit_ord, t.is_schengen,
+           ROW_NUMBER() OVER (
+               PARTITION BY t.employee_id ORDER BY t.exit_date DESC, t.id DESC
+           ) AS recent_rank,
+           CASE WHEN t.entry_date > :today THEN ROW_NUMBER() OVER (
+               PARTITION BY t.employee_id, t.entry_date > :today ORDER BY t.entry_date, t.id
+           ) END AS upcoming_rank
+    FROM trips t
+    JOIN employees e ON e.id = t.employee_id
+    {employee_filter}
+    ORDER BY t.employee_id, t.entry_date DESC
+"""
+
+# Indexes backing the paginated dashboard's name prefix filter, name ordering and risk filter.
+# LIKE is case-insensitive, so only a NOCASE index (as models.init_db creates) can serve the prefix.
+PAGE_INDEXES_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name COLLATE NOCASE)",
+    "CREATE INDEX IF NOT EXISTS idx_employees_name_order ON employees (name, id)",
+    "CREATE INDEX IF NOT EXISTS idx_employee_compliance_risk ON employee_compliance (computed_for, risk_level)",
+)
+
+PAGE_ORDER_SQL = {
+    "first_name": "e.name, e.id",
+    "last_name": 'SUBSTR(e.name, INSTR(e.name, " ") + 1), e.name, e.id',
+    "days_remaining": "s.days_remaining, e.name, e.id",
+    "days_used": "s.days_used DESC, e.name, e.id",
+    "risk": "CASE s.risk_level WHEN 'red' THEN 0 WHEN 'amber' THEN 1 ELSE 2 END, s.days_remaining, e.name, e.id",
+}
+
+PAGE_COLUMNS = (
+    "id", "name", "days_used", "days_remaining", "risk_level", "safe_entry_date", "next_risk_transition_date",
+)
+
+
+@dataclass
+class DashboardTrips:
+    """Per-employee trip data for the dashboard, as plain tuples."""
+
+    trips: Dict[int, List[Tuple[Any, ...]]] = field(default_factory=dict)  # TRIP_FIELDS order, entry_date DESC
+    next_trip: Dict[int, Tuple[Any, ...]] = field(default_factory=dict)  # (country, entry_date, exit_date, is_private)
+    recent: Dict[int, List[Tuple[Any, ...]]] = field(default_factory=dict)  # (country, entry_date, exit_date, is_private)
+
+    def trip_count(self, employee_id: int) -> int:
+        return len(self.trips.get(employee_id, ()))
+
+    def trip_dicts(self, employee_id: int) -> List[Dict[str, Any]]:
+        """The employee's trips as dicts for the compliance engines."""
+        return [dict(zip(TRIP_FIELDS, row)) for row in self.trips.get(employee_id, ())]
+
+
+def fetch_employees(conn: sqlite3.Connection, sort_by: str = "first_name") -> List[Tuple[int, str]]:
+    """(id, name) for every employee in dashboard order."""
+    order = EMPLOYEE_ORDER_SQL.get(sort_by, EMPLOYEE_ORDER_SQL["first_name"])
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    return cursor.execute(f"SELECT id, name FROM employees ORDER BY {order}").fetchall()
+
+
+def fetch_dashboard_trips(
+    conn: sqlite3.Connection,
+    today: str,
+    recent_limit: int = 5,
+    employee_ids: Optional[Sequence[int]] = None,
+) -> DashboardTrips:
+    """
+    All trips, each employee's next upcoming trip and their most recent trips in one query.
+
+    ``today`` is an ISO date; trips entering after it are upcoming. For the
+    whole workforce (``employee_ids`` None) no per-employee parameters are
+    bound, so the query size does not grow with headcount; a dashboard page
+    passes its own bounded id list.
+    """
+    params: Dict[str, Any] = {"today": today}
+    employee_filter = ""
+    if employee_ids is not None:
+        if not employee_ids:
+            return DashboardTrips()
+        names = [f"id{index}" for index in range(len(employee_ids))]
+        employee_filter = f"WHERE t.employee_id IN ({', '.join(':' + name for name in names)})"
+        params.update(zip(names, (int(employee_id) for employee_id in employee_ids)))
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    data = DashboardTrips()
+    ranked_recent: Dict[int, List[Tuple[int, Tuple[Any, ...]]]] = {}
+    for row in cursor.execute(DASHBOARD_TRIPS_SQL.format(employee_filter=employee_filter), params):
+        employee_id = row[0]
+        data.trips.setdefault(employee_id, []).append(row[1:9])
+        if row[9] <= recent_limit:
+            ranked_recent.setdefault(employee_id, []).append((row[9], (row[4], row[2], row[3], row[5])))
+        if row[10] == 1:
+            data.next_trip[employee_id] = (row[4], row[2], row[3], row[5])
+    data.recent = {
+        employee_id: [trip for _, trip in sorted(ranked)] for employee_id, ranked in ranked_recent.items()
+    }
+    return data
+
+
+def ensure_page_indexes(conn: sqlite3.Connection) -> None:
+    row = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'index' AND name = 'idx_employees_name'"
+    ).fetchone()
+    if row and row[0] and "NOCASE" not in row[0].upper():
+        conn.execute("DROP INDEX idx_employees_name")
+    for index_sql in PAGE_INDEXES_SQL:
+        conn.execute(index_sql)
+
+
+def _page_filter(
+    risk_level: Optional[str],
+    name_prefix: Optional[str],
+    below_remaining: Optional[int] = None,
+) -> Tuple[str, Dict[str, Any]]:
+    clauses = []
+    params: Dict[str, Any] = {}
+    if risk_level:
+        clauses.append("s.risk_level = :risk_level")
+        params["risk_level"] = risk_level
+    if below_remaining is not None:
+        clauses.append("s.days_remaining < :below_remaining")
+        params["below_remaining"] = below_remaining
+    if name_prefix:
+        escaped = name_prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        clauses.append("e.name LIKE :name_prefix ESCAPE '\\'")
+        params["name_prefix"] = escaped + "%"
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def fetch_dashboard_page(
+    conn: sqlite3.Connection,
+    computed_for: str,
+    offset: int,
+    limit: int,
+    sort_by: str = "first_name",
+    risk_level: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    below_remaining: Optional[int] = None,
+) -> Tuple[int, List[Tuple[Any, ...]]]:
+    """
+    (total matching employees, one page of rows in PAGE_COLUMNS order).
+
+    Rows join each employee to their compliance snapshot for ``computed_for``;
+    callers bring the snapshot up to date first. ``name_prefix`` matches the
+    start of the name case-insensitively; ``below_remaining`` keeps employees
+    with fewer days remaining.
+    """
+    where, params = _page_filter(risk_level, name_prefix, below_remaining)
+    join = (
+        "FROM employees e LEFT JOIN employee_compliance s "
+        "ON s.employee_id = e.id AND s.computed_for = :computed_for"
+    )
+    params["computed_for"] = computed_for
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    total = cursor.execute(f"SELECT COUNT(*) {join}{where}", params).fetchone()[0]
+    order = PAGE_ORDER_SQL.get(sort_by, PAGE_ORDER_SQL["first_name"])
+    rows = cursor.execute(
+        f"""
+        SELECT e.id, e.name, s.days_used, s.days_remaining, s.risk_level,
+               s.safe_entry_date, s.next_risk_transition_date
+        {join}{where}
+        ORDER BY {order}
+        LIMIT :limit OFFSET :offset
+        """,
+        dict(params, limit=limit, offset=offset),
+    ).fetchall()
+    return int(total), rows
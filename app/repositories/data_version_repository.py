@@ -0,0 +1,107 @@
+"""SQLite access helpers for the trigger-maintained data version counters."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Iterable
+
+GLOBAL_SCOPE = "global"
+ALERTS_SCOPE = "alerts"
+
+DATA_VERSIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS data_versions (
+        scope TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+"""
+
+# UNION folds OLD and NEW into one scope when a row keeps its employee, so each
+# write bumps a counter once; WHERE 1 disambiguates the upsert after a SELECT.
+_BUMP_SQL = """
+    INSERT INTO data_versions (scope, version)
+    SELECT scope, 1 FROM ({scopes}) WHERE 1
+    ON CONFLICT (scope) DO UPDATE SET version = version + 1;
+"""
+
+
+def _bump(*scopes: str) -> str:
+    return _BUMP_SQL.format(scopes=" UNION ".join(f"SELECT {scope} AS scope" for scope in scopes))
+
+
+def _trigger(name: str, event: str, table: str, *scopes: str) -> str:
+    return (
+        f"CREATE TRIGGER IF NOT EXISTS {name} AFTER {event} ON {table}\n"
+        f"BEGIN\n{_bump(*scopes)}\nEND"
+    )
+
+
+_GLOBAL = f"'{GLOBAL_SCOPE}'"
+
+# Every insert, update and delete of trips or employees bumps the global counter
+# and the counters of the employees involved; alert writes bump their own counter.
+DATA_VERSION_TRIGGERS_SQL = (
+    _trigger("trg_trips_version_insert", "INSERT", "trips", _GLOBAL, "'employee:' || NEW.employee_id"),
+    _trigger(
+        "trg_trips_version_update", "UPDATE", "trips",
+        _GLOBAL, "'employee:' || OLD.employee_id", "'employee:' || NEW.employee_id",
+    ),
+    _trigger("trg_trips_version_delete", "DELETE", "trips", _GLOBAL, "'employee:' || OLD.employee_id"),
+    _trigger("trg_employees_version_insert", "INSERT", "employees", _GLOBAL, "'employee:' || NEW.id"),
+    _trigger(
+        "trg_employees_version_update", "UPDATE", "employees",
+        _GLOBAL, "'employee:' || OLD.id", "'employee:' || NEW.id",
+    ),
+    _trigger("trg_employees_version_delete", "DELETE", "employees", _GLOBAL, "'employee:' || OLD.id"),
+)
+
+ALERT_VERSION_TRIGGERS_SQL = tuple(
+    _trigger(f"trg_alerts_version_{event.lower()}", event, "alerts", f"'{ALERTS_SCOPE}'")
+    for event in ("INSERT", "UPDATE", "DELETE")
+)
+
+
+def employee_scope(employee_id: int) -> str:
+    return f"employee:{int(employee_id)}"
+
+
+def _table_exists(conn: sqlite3.Connection, table: str) -> bool:
+    return conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+    ).fetchone() is not None
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    """Create the counters table and its triggers for whichever source tables exist."""
+    conn.execute(DATA_VERSIONS_TABLE_SQL)
+    for table, triggers in (
+        ("trips", DATA_VERSION_TRIGGERS_SQL[:3]),
+        ("employees", DATA_VERSION_TRIGGERS_SQL[3:]),
+        ("alerts", ALERT_VERSION_TRIGGERS_SQL),
+    ):
+        if _table_exists(conn, table):
+            for trigger_sql in triggers:
+                conn.execute(trigger_sql)
+
+
+def fetch_versions(conn: sqlite3.Connection, scopes: Iterable[str]) -> Dict[str, int]:
+    """
+    Current version of each scope in one primary-key read; unseen scopes are 0.
+
+    The schema is created on first use, so a database that predates the table
+    starts every scope at 0.
+    """
+    scopes = list(dict.fromkeys(scopes))
+    sql = f"SELECT scope, version FROM data_versions WHERE scope IN ({', '.join('?' for _ in scopes)})"
+    cursor = conn.cursor()
+    cursor.row_factory = None
+    try:
+        rows = cursor.execute(sql, scopes).fetchall()
+    except sqlite3.OperationalError as exc:
+        if "no such table" not in str(exc):
+            raise
+        ensure_schema(conn)
+        conn.commit()
+        rows = cursor.execute(sql, scopes).fetchall()
+    versions = dict.fromkeys(scopes, 0)
+    versions.update(rows)
+    return versions
@@ -19,6 +19,11 @@ def _connect(db_path: str) -> sqlite3.Connection:
     return sqlite3.connect(db_path)
 
 
+def connect(config: Mapping[str, Any]) -> sqlite3.Connection:
+    """Open a connection to the configured database (the caller closes it)."""
+    return _connect(_resolve_db_path(config))
+
+
 def _ensure_schema(conn: sqlite3.Connection) -> None:
     conn.execute(EMPLOYEE_TABLE_SQL)
 
@@ -40,3 +45,27 @@ def insert_employee(config: Mapping[str, Any], name: str) -> int:
         cursor = conn.execute("INSERT INTO employees(name) VALUES (?)", (name,))
         conn.commit()
         return int(cursor.lastrowid)
+
+
+def fetch_trips(config: Mapping[str, Any], employee_id: int) -> list[dict[str, Any]] | None:
+    """Return the employee's trips, or None when the employee does not exist."""
+    db_path = _resolve_db_path(config)
+    with closing(_connect(db_path)) as conn:
+        _ensure_schema(conn)
+        if conn.execute("SELECT 1 FROM employees WHERE id = ?", (employee_id,)).fetchone() is None:
+            return None
+        cursor = conn.execute(
+            "SELECT entry_date, exit_date, country, entry_ord, exit_ord, is_schengen FROM trips WHERE employee_id = ?",
+            (employee_id,),
+        )
+        return [
+            {
+                "entry_date": row[0],
+                "exit_date": row[1],
+                "country": row[2],
+                "entry_ord": row[3],
+                "exit_ord": row[4],
+                "is_schengen": row[5],
+            }
+            for row in cursor.fetchall()
+        ]
@@ -0,0 +1,92 @@
+"""SQLite access helpers for the persisted per-employee presence bitmaps."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+PRESENCE_BITMAP_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS employee_presence_bitmap (
+        employee_id INTEGER PRIMARY KEY,
+        base_ord INTEGER NOT NULL,
+        bits BLOB NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Any raw trip write drops the affected employees' bitmaps so they rebuild on next load.
+PRESENCE_BITMAP_TRIGGERS_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_bitmap_insert AFTER INSERT ON trips
+    BEGIN
+        DELETE FROM employee_presence_bitmap WHERE employee_id = NEW.employee_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_bitmap_update AFTER UPDATE ON trips
+    BEGIN
+        DELETE FROM employee_presence_bitmap WHERE employee_id IN (OLD.employee_id, NEW.employee_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_bitmap_delete AFTER DELETE ON trips
+    BEGIN
+        DELETE FROM employee_presence_bitmap WHERE employee_id = OLD.employee_id;
+    END
+    """,
+)
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(PRESENCE_BITMAP_TABLE_SQL)
+    for trigger_sql in PRESENCE_BITMAP_TRIGGERS_SQL:
+        conn.execute(trigger_sql)
+
+
+def fetch_presence_bitmaps(
+    conn: sqlite3.Connection,
+    employee_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, Tuple[int, bytes]]:
+    """Return {employee_id: (base_ord, bits blob)} for persisted bitmaps (all when ids is None)."""
+    if employee_ids is None:
+        rows = conn.execute("SELECT employee_id, base_ord, bits FROM employee_presence_bitmap").fetchall()
+    else:
+        ids = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+        if not ids:
+            return {}
+        placeholders = ",".join("?" * len(ids))
+        rows = conn.execute(
+            f"SELECT employee_id, base_ord, bits FROM employee_presence_bitmap WHERE employee_id IN ({placeholders})",
+            ids,
+        ).fetchall()
+    return {row[0]: (row[1], bytes(row[2])) for row in rows}
+
+
+def save_presence_bitmaps(conn: sqlite3.Connection, rows: Sequence[Tuple[int, int, bytes]]) -> None:
+    """Insert or replace (employee_id, base_ord, bits) rows."""
+    if not rows:
+        return
+    conn.executemany(
+        """
+        INSERT INTO employee_presence_bitmap (employee_id, base_ord, bits)
+        VALUES (?, ?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET
+            base_ord = excluded.base_ord,
+            bits = excluded.bits,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        [(int(employee_id), base_ord, sqlite3.Binary(bits)) for employee_id, base_ord, bits in rows],
+    )
+
+
+def delete_presence_bitmaps(conn: sqlite3.Connection, employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Delete bitmaps for the given employees, or for employees that no longer exist when None."""
+    if employee_ids is None:
+        conn.execute(
+            "DELETE FROM employee_presence_bitmap WHERE employee_id NOT IN (SELECT id FROM employees)"
+        )
+        return
+    conn.executemany(
+        "DELETE FROM employee_presence_bitmap WHERE employee_id = ?",
+        [(int(employee_id),) for employee_id in employee_ids],
+    )
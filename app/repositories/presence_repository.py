@@ -0,0 +1,67 @@
+"""SQLite access helpers for the persisted per-employee presence coverage counts."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Iterable, Optional, Tuple
+
+PRESENCE_COUNTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS employee_presence_counts (
+        employee_id INTEGER PRIMARY KEY,
+        base_ord INTEGER,
+        counts BLOB NOT NULL,
+        data_version INTEGER,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(PRESENCE_COUNTS_TABLE_SQL)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(employee_presence_counts)")}
+    if "data_version" not in columns:
+        # Counts persisted before they were stamped carry NULL and are rebuilt on next use
+        conn.execute("ALTER TABLE employee_presence_counts ADD COLUMN data_version INTEGER")
+
+
+def fetch_presence_counts(
+    conn: sqlite3.Connection, employee_id: int
+) -> Optional[Tuple[Optional[int], bytes, Optional[int]]]:
+    """Return (base_ord, counts blob, data_version) for the employee, or None when not persisted."""
+    row = conn.execute(
+        "SELECT base_ord, counts, data_version FROM employee_presence_counts WHERE employee_id = ?",
+        (int(employee_id),),
+    ).fetchone()
+    return (row[0], bytes(row[1]), row[2]) if row else None
+
+
+def save_presence_counts(
+    conn: sqlite3.Connection,
+    employee_id: int,
+    base_ord: Optional[int],
+    counts: bytes,
+    data_version: Optional[int] = None,
+) -> None:
+    conn.execute(
+        """
+        INSERT INTO employee_presence_counts (employee_id, base_ord, counts, data_version)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET
+            base_ord = excluded.base_ord,
+            counts = excluded.counts,
+            data_version = excluded.data_version,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (int(employee_id), base_ord, sqlite3.Binary(counts), data_version),
+    )
+
+
+def delete_presence_counts(conn: sqlite3.Connection, employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Delete persisted coverage counts for the given employees (all when None)."""
+    if employee_ids is None:
+        conn.execute("DELETE FROM employee_presence_counts")
+        return
+    conn.executemany(
+        "DELETE FROM employee_presence_counts WHERE employee_id = ?",
+        [(int(employee_id),) for employee_id in employee_ids],
+    )
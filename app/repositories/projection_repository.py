@@ -0,0 +1,84 @@
+"""SQLite access helpers for the persisted forward days-used projections."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+PROJECTION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS employee_projection (
+        employee_id INTEGER PRIMARY KEY,
+        start_ord INTEGER NOT NULL,
+        days_used BLOB NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# Like the bitmaps, projections are dropped on any raw trip write and rebuilt on next load.
+PROJECTION_TRIGGERS_SQL = (
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_projection_insert AFTER INSERT ON trips
+    BEGIN
+        DELETE FROM employee_projection WHERE employee_id = NEW.employee_id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_projection_update AFTER UPDATE ON trips
+    BEGIN
+        DELETE FROM employee_projection WHERE employee_id IN (OLD.employee_id, NEW.employee_id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_trips_projection_delete AFTER DELETE ON trips
+    BEGIN
+        DELETE FROM employee_projection WHERE employee_id = OLD.employee_id;
+    END
+    """,
+)
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    conn.execute(PROJECTION_TABLE_SQL)
+    for trigger_sql in PROJECTION_TRIGGERS_SQL:
+        conn.execute(trigger_sql)
+
+
+def fetch_projections(conn: sqlite3.Connection, employee_ids: Iterable[int]) -> Dict[int, Tuple[int, bytes]]:
+    """Return {employee_id: (start_ord, days_used blob)} for persisted projections."""
+    ids = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT employee_id, start_ord, days_used FROM employee_projection WHERE employee_id IN ({placeholders})",
+        ids,
+    ).fetchall()
+    return {row[0]: (row[1], bytes(row[2])) for row in rows}
+
+
+def save_projections(conn: sqlite3.Connection, rows: Sequence[Tuple[int, int, bytes]]) -> None:
+    """Insert or replace (employee_id, start_ord, days_used) rows."""
+    if not rows:
+        return
+    conn.executemany(
+        """
+        INSERT INTO employee_projection (employee_id, start_ord, days_used)
+        VALUES (?, ?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET
+            start_ord = excluded.start_ord,
+            days_used = excluded.days_used,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        [(int(employee_id), start_ord, sqlite3.Binary(blob)) for employee_id, start_ord, blob in rows],
+    )
+
+
+def delete_projections(conn: sqlite3.Connection, employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Delete projections for the given employees, or for employees that no longer exist when None."""
+    if employee_ids is None:
+        conn.execute("DELETE FROM employee_projection WHERE employee_id NOT IN (SELECT id FROM employees)")
+        return
+    conn.executemany(
+        "DELETE FROM employee_projection WHERE employee_id = ?",
+        [(int(employee_id),) for employee_id in employee_ids],
+    )
@@ -57,19 +57,26 @@ def fetch_employees_with_trips(db_path: str) -> List[Dict[str, Any]]:
     with closing(_connect(db_path)) as conn:
         cursor = conn.execute("SELECT id, name FROM employees ORDER BY name")
         employees = [dict(row) for row in cursor.fetchall()]
-        results: List[Dict[str, Any]] = []
-        for emp in employees:
-            trip_cursor = conn.execute(
-                "SELECT entry_date, exit_date, country FROM trips WHERE employee_id = ?",
-                (emp["id"],),
-            )
-            trips = [
-                {
-                    "entry_date": row["entry_date"],
-                    "exit_date": row["exit_date"],
-                    "country": row["country"],
-                }
-                for row in trip_cursor.fetchall()
-            ]
-            results.append({**emp, "trips": trips})
+        trips_by_employee: Dict[int, List[Dict[str, Any]]] = {emp["id"]: [] for emp in employees}
+        # Single query for every trip instead of one per employee
+        trip_cursor = conn.execute(
+            "SELECT employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen "
+            "FROM trips ORDER BY employee_id, id"
+        )
+        for row in trip_cursor.fetchall():
+            bucket = trips_by_employee.get(row["employee_id"])
+            if bucket is not None:
+                bucket.append(
+                    {
+                        "entry_date": row["entry_date"],
+                        "exit_date": row["exit_date"],
+                        "country": row["country"],
+                        "entry_ord": row["entry_ord"],
+                        "exit_ord": row["exit_ord"],
+                        "is_schengen": row["is_schengen"],
+                    }
+                )
+        results: List[Dict[str, Any]] = [
+            {**emp, "trips": trips_by_employee[emp["id"]]} for emp in employees
+        ]
         return results
@@ -0,0 +1,143 @@
+"""SQLite access helpers for the materialised workforce risk series."""
+
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+RISK_SERIES_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS compliance_risk_series (
+        day_ord INTEGER PRIMARY KEY,
+        green INTEGER NOT NULL DEFAULT 0,
+        amber INTEGER NOT NULL DEFAULT 0,
+        red INTEGER NOT NULL DEFAULT 0
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS compliance_risk_series_meta (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        start_ord INTEGER NOT NULL,
+        end_ord INTEGER NOT NULL,
+        settings TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS employee_risk_series (
+        employee_id INTEGER PRIMARY KEY,
+        levels BLOB NOT NULL
+    )
+    """,
+)
+
+
+def ensure_schema(conn: sqlite3.Connection) -> None:
+    for table_sql in RISK_SERIES_TABLES_SQL:
+        conn.execute(table_sql)
+
+
+def fetch_series_meta(conn: sqlite3.Connection) -> Optional[Dict[str, Any]]:
+    row = conn.execute(
+        "SELECT start_ord, end_ord, settings, version FROM compliance_risk_series_meta WHERE id = 1"
+    ).fetchone()
+    if row is None:
+        return None
+    return {"start_ord": row[0], "end_ord": row[1], "settings": row[2], "version": row[3]}
+
+
+def replace_risk_series(
+    conn: sqlite3.Connection,
+    start_ord: int,
+    end_ord: int,
+    settings: str,
+    counts: Sequence[Tuple[int, int, int, int]],
+    employee_levels: Sequence[Tuple[int, bytes]],
+) -> None:
+    """Replace the whole series: (day_ord, green, amber, red) counts and per-employee levels."""
+    conn.execute("DELETE FROM compliance_risk_series")
+    conn.execute("DELETE FROM employee_risk_series")
+    conn.executemany(
+        "INSERT INTO compliance_risk_series (day_ord, green, amber, red) VALUES (?, ?, ?, ?)", counts
+    )
+    conn.executemany(
+        "INSERT INTO employee_risk_series (employee_id, levels) VALUES (?, ?)",
+        [(int(employee_id), sqlite3.Binary(levels)) for employee_id, levels in employee_levels],
+    )
+    conn.execute(
+        """
+        INSERT INTO compliance_risk_series_meta (id, start_ord, end_ord, settings, version)
+        VALUES (1, ?, ?, ?, 1)
+        ON CONFLICT(id) DO UPDATE SET
+            start_ord = excluded.start_ord,
+            end_ord = excluded.end_ord,
+            settings = excluded.settings,
+            version = compliance_risk_series_meta.version + 1,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        (start_ord, end_ord, settings),
+    )
+
+
+def fetch_employee_risk_levels(conn: sqlite3.Connection, employee_ids: Iterable[int]) -> Dict[int, bytes]:
+    ids = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    rows = conn.execute(
+        f"SELECT employee_id, levels FROM employee_risk_series WHERE employee_id IN ({placeholders})", ids
+    ).fetchall()
+    return {row[0]: bytes(row[1]) for row in rows}
+
+
+def apply_risk_series_changes(
+    conn: sqlite3.Connection,
+    count_deltas: Sequence[Tuple[int, int, int, int]],
+    saved_levels: Sequence[Tuple[int, bytes]],
+    deleted_employee_ids: Iterable[int],
+) -> None:
+    """Add (green, amber, red, day_ord) deltas, store changed employee levels and bump the version."""
+    conn.executemany(
+        "UPDATE compliance_risk_series SET green = green + ?, amber = amber + ?, red = red + ? WHERE day_ord = ?",
+        count_deltas,
+    )
+    conn.executemany(
+        """
+        INSERT INTO employee_risk_series (employee_id, levels) VALUES (?, ?)
+        ON CONFLICT(employee_id) DO UPDATE SET levels = excluded.levels
+        """,
+        [(int(employee_id), sqlite3.Binary(levels)) for employee_id, levels in saved_levels],
+    )
+    conn.executemany(
+        "DELETE FROM employee_risk_series WHERE employee_id = ?",
+        [(int(employee_id),) for employee_id in deleted_employee_ids],
+    )
+    conn.execute(
+        "UPDATE compliance_risk_series_meta SET version = version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = 1"
+    )
+
+
+def fetch_unsynced_series_employee_ids(conn: sqlite3.Connection) -> List[int]:
+    """Employees without a series row, plus series rows whose employee no longer exists."""
+    cursor = conn.execute(
+        """
+        SELECT e.id FROM employees e
+        LEFT JOIN employee_risk_series s ON s.employee_id = e.id
+        WHERE s.employee_id IS NULL
+        UNION
+        SELECT s.employee_id FROM employee_risk_series s
+        WHERE s.employee_id NOT IN (SELECT id FROM employees)
+        """
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def fetch_risk_series(conn: sqlite3.Connection) -> List[Tuple[int, int, int, int]]:
+    """(day_ord, green, amber, red) rows in date order."""
+    return [
+        tuple(row)
+        for row in conn.execute(
+            "SELECT day_ord, green, amber, red FROM compliance_risk_series ORDER BY day_ord"
+        ).fetchall()
+    ]
@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+import json
 import sqlite3
 from contextlib import closing
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional
 
 
 def _connect(db_path: str) -> sqlite3.Connection:
@@ -22,7 +23,7 @@ def fetch_employees(db_path: str) -> List[Dict[str, Any]]:
 def fetch_employee_trips(db_path: str, employee_id: int) -> List[Dict[str, Any]]:
     with closing(_connect(db_path)) as conn:
         cursor = conn.execute(
-            "SELECT entry_date, exit_date, country FROM trips WHERE employee_id = ?",
+            "SELECT entry_date, exit_date, country, entry_ord, exit_ord, is_schengen FROM trips WHERE employee_id = ?",
             (employee_id,),
         )
         return [
@@ -30,6 +31,9 @@ def fetch_employee_trips(db_path: str, employee_id: int) -> List[Dict[str, Any]]
                 "entry_date": row["entry_date"],
                 "exit_date": row["exit_date"],
                 "country": row["country"],
+                "entry_ord": row["entry_ord"],
+                "exit_ord": row["exit_ord"],
+                "is_schengen": row["is_schengen"],
             }
             for row in cursor.fetchall()
         ]
@@ -40,3 +44,71 @@ def fetch_employee_name(db_path: str, employee_id: int) -> Optional[str]:
         cursor = conn.execute("SELECT name FROM employees WHERE id = ?", (employee_id,))
         row = cursor.fetchone()
         return row["name"] if row else None
+
+
+def fetch_trips_for_employees(db_path: str, employee_ids: Iterable[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Return trips grouped by employee id for the requested employees that exist.
+
+    Unknown ids are left out. The ids are bound as a single JSON array so each
+    statement stays within SQLite's bound-variable limit however many employees
+    are requested.
+    """
+    ids = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+    if not ids:
+        return {}
+    with closing(_connect(db_path)) as conn:
+        requested = json.dumps(ids)
+        cursor = conn.execute(
+            "SELECT e.id FROM json_each(?) AS requested JOIN employees e ON e.id = requested.value "
+            "ORDER BY requested.key",
+            (requested,),
+        )
+        grouped: Dict[int, List[Dict[str, Any]]] = {row["id"]: [] for row in cursor.fetchall()}
+        cursor = conn.execute(
+            "SELECT t.employee_id, t.entry_date, t.exit_date, t.country, t.entry_ord, t.exit_ord, t.is_schengen "
+            "FROM json_each(?) AS requested JOIN trips t ON t.employee_id = requested.value",
+            (requested,),
+        )
+        for row in cursor.fetchall():
+            bucket = grouped.get(row["employee_id"])
+            if bucket is not None:
+                bucket.append(
+                    {
+                        "entry_date": row["entry_date"],
+                        "exit_date": row["exit_date"],
+                        "country": row["country"],
+                        "entry_ord": row["entry_ord"],
+                        "exit_ord": row["exit_ord"],
+                        "is_schengen": row["is_schengen"],
+                    }
+                )
+    return grouped
+
+
+def fetch_employees_with_trips(db_path: str) -> List[Dict[str, Any]]:
+    """Return every employee with their trips using a single joined query."""
+    with closing(_connect(db_path)) as conn:
+        cursor = conn.execute(
+            """
+            SELECT e.id, e.name, t.entry_date, t.exit_date, t.country, t.entry_ord, t.exit_ord, t.is_schengen
+            FROM employees e
+            LEFT JOIN trips t ON t.employee_id = e.id
+            ORDER BY e.id
+            """
+        )
+        employees: Dict[int, Dict[str, Any]] = {}
+        for row in cursor.fetchall():
+            employee = employees.setdefault(row["id"], {"id": row["id"], "name": row["name"], "trips": []})
+            if row["entry_date"] is not None:
+                employee["trips"].append(
+                    {
+                        "entry_date": row["entry_date"],
+                        "exit_date": row["exit_date"],
+                        "country": row["country"],
+                        "entry_ord": row["entry_ord"],
+                        "exit_ord": row["exit_ord"],
+                        "is_schengen": row["is_schengen"],
+                    }
+                )
+        return list(employees.values())
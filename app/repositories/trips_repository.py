@@ -4,7 +4,8 @@ from __future__ import annotations
 
 from typing import Any, Mapping, Sequence
 
-from app.models import get_db
+from app.models import get_db, sync_trip_normalized_columns
+from app.services.rolling90 import normalized_trip_columns
 
 SELECT_BASE = "SELECT id, employee_id, country, entry_date, exit_date FROM trips"
 
@@ -25,10 +26,12 @@ def insert_trip(payload: Mapping[str, Any]) -> int:
     """Insert a trip and return its id."""
     conn = get_db()
     cursor = conn.cursor()
+    normalized = normalized_trip_columns(payload["start_date"], payload["end_date"], payload["country"])
     cursor.execute(
         """
-        INSERT INTO trips(employee_id, country, entry_date, exit_date, purpose, job_ref, ghosted)
-        VALUES (?,?,?,?,?,?,?)
+        INSERT INTO trips(employee_id, country, entry_date, exit_date, purpose, job_ref, ghosted,
+                          entry_ord, exit_ord, country_code, is_schengen)
+        VALUES (?,?,?,?,?,?,?,?,?,?,?)
         """,
         (
             payload["employee_id"],
@@ -38,6 +41,10 @@ def insert_trip(payload: Mapping[str, Any]) -> int:
             payload.get("purpose"),
             payload.get("job_ref"),
             payload.get("ghosted", False),
+            normalized["entry_ord"],
+            normalized["exit_ord"],
+            normalized["country_code"],
+            normalized["is_schengen"],
         ),
     )
     trip_id = cursor.lastrowid
@@ -73,8 +80,11 @@ def update_trip(trip_id: int, updates: Mapping[str, Any]) -> int:
     assignments = ", ".join(f"{column} = ?" for column in updates.keys())
     params: Sequence[Any] = list(updates.values()) + [trip_id]  # type: ignore[arg-type]
     cursor.execute(f"UPDATE trips SET {assignments} WHERE id = ?", params)
+    updated = cursor.rowcount
+    if updated:
+        sync_trip_normalized_columns(conn, [trip_id])
     conn.commit()
-    return cursor.rowcount
+    return updated
 
 
 def delete_trip(trip_id: int) -> bool:
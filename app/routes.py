@@ -4,6 +4,7 @@ import sqlite3
 import logging
 import traceback
 from datetime import datetime, timedelta, date
+from contextlib import closing
 from functools import wraps
 import os
 import re
@@ -57,13 +58,53 @@ except Exception as e:
     raise
 
 try:
-    from .services.rolling90 import presence_days, days_used_in_window, earliest_safe_entry, calculate_days_remaining, get_risk_level, days_until_compliant
+    from .services.rolling90 import presence_days, days_used_in_window, earliest_safe_entry, calculate_days_remaining, get_risk_level, days_until_compliant, normalized_trip_columns
     logger.info("Successfully imported rolling90 service")
 except Exception as e:
     logger.error(f"Failed to import rolling90 service: {e}")
     logger.error(traceback.format_exc())
     raise
 
+try:
+    from .services import compliance_sql
+    logger.info("Successfully imported compliance_sql service")
+except Exception as e:
+    logger.error(f"Failed to import compliance_sql service: {e}")
+    logger.error(traceback.format_exc())
+    raise
+
+try:
+    from .services import compliance_cache
+    logger.info("Successfully imported compliance_cache service")
+except Exception as e:
+    logger.error(f"Failed to import compliance_cache service: {e}")
+    logger.error(traceback.format_exc())
+    raise
+
+try:
+    from .services import compliance_timeseries
+    logger.info("Successfully imported compliance_timeseries service")
+except Exception as e:
+    logger.error(f"Failed to import compliance_timeseries service: {e}")
+    logger.error(traceback.format_exc())
+    raise
+
+try:
+    from .services import stay_rules
+    logger.info("Successfully imported stay_rules service")
+except Exception as e:
+    logger.error(f"Failed to import stay_rules service: {e}")
+    logger.error(traceback.format_exc())
+    raise
+
+try:
+    from .services import compliance_snapshot
+    logger.info("Successfully imported compliance_snapshot service")
+except Exception as e:
+    logger.error(f"Failed to import compliance_snapshot service: {e}")
+    logger.error(traceback.format_exc())
+    raise
+
 try:
     from .services.trip_validator import validate_trip, validate_date_range
     logger.info("Successfully imported trip_validator service")
@@ -108,6 +149,14 @@ except Exception as e:
     logger.error(f"Failed to import scenario service: {e}")
     logger.error(traceback.format_exc())
     raise
+
+try:
+    from .services import dashboard_service
+    logger.info("Successfully imported dashboard service")
+except Exception as e:
+    logger.error(f"Failed to import dashboard service: {e}")
+    logger.error(traceback.format_exc())
+    raise
 import io
 import csv
 import zipfile
@@ -117,6 +166,9 @@ import atexit
 import signal
 from dotenv import load_dotenv
 from .runtime_env import build_runtime_state
+from .utils.cache_helpers import versioned_cache_key
+from .utils.cache_invalidation import invalidate_tags
+from .utils.tagged_cache import DASHBOARD_TAG, ENTRY_REQUIREMENTS_TAG, NEWS_TAG
 
 # Load environment variables
 load_dotenv()
@@ -619,8 +671,14 @@ def entry_requirements():
 def entry_requirements_api():
     """API endpoint returning EU entry requirements as JSON."""
     from flask import current_app
-    # Sort countries alphabetically by name
-    countries = sorted(current_app.config['EU_ENTRY_DATA'], key=lambda x: x['country'])
+    cache = current_app.config.get('CACHE')
+    countries = cache.get('entry_requirements:sorted') if cache else None
+    if countries is None:
+        tokens = cache.tag_tokens((ENTRY_REQUIREMENTS_TAG,)) if cache else None
+        # Sort countries alphabetically by name
+        countries = sorted(current_app.config['EU_ENTRY_DATA'], key=lambda x: x['country'])
+        if cache:
+            cache.set('entry_requirements:sorted', countries, tags=(ENTRY_REQUIREMENTS_TAG,), tokens=tokens)
     return jsonify(countries)
 
 @main_bp.route('/api/entry-requirements/reload', methods=['POST'])
@@ -633,6 +691,7 @@ def reload_entry_requirements():
         with open(data_file_path, 'r', encoding='utf-8') as f:
             new_data = json.load(f)
         current_app.config['EU_ENTRY_DATA'] = new_data
+        invalidate_tags(ENTRY_REQUIREMENTS_TAG)
         return jsonify({
             'success': True, 
             'message': f'Successfully reloaded {len(new_data)} countries',
@@ -653,6 +712,7 @@ def refresh_news():
     try:
         from .services.news_fetcher import fetch_news_from_sources
         db_path = current_app.config['DATABASE']
+        app = current_app._get_current_object()
         
         # Start background refresh
         import threading
@@ -660,6 +720,8 @@ def refresh_news():
             try:
                 news_items = fetch_news_from_sources(db_path)
                 logger.info(f"Background news refresh completed: {len(news_items)} items")
+                with app.app_context():
+                    invalidate_tags(NEWS_TAG)
             except Exception as e:
                 logger.error(f"Background news refresh failed: {e}")
         
@@ -899,22 +961,16 @@ def home():
     c.execute('SELECT COUNT(*) FROM trips WHERE entry_date >= ?', (this_month,))
     trips_this_month = c.fetchone()[0]
     
-    # At risk of 90-day limit (days_remaining < 10) - simplified for performance
+    # At risk of 90-day limit (days_remaining below the amber threshold)
     today = date.today()
     at_risk_count = 0
+    below_remaining = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10}).get('amber', 10)
     try:
-        # Use a more efficient query to get at-risk count
-        c.execute('''
-            SELECT COUNT(DISTINCT e.id) 
-            FROM employees e
-            JOIN trips t ON e.id = t.employee_id
-            WHERE t.entry_date >= date('now', '-90 days')
-            GROUP BY e.id
-            HAVING COUNT(t.id) > 0
-        ''')
-        # This is a simplified check - for exact rolling90 calculation, 
-        # we'd need the full rolling90 service, but this gives a reasonable estimate
-        at_risk_count = 0  # Simplified for now - can be enhanced later
+        # Exact rolling-window count, from the snapshot table or one SQL aggregate
+        if CONFIG.get('COMPLIANCE_SUMMARY_SOURCE') == 'sql':
+            at_risk_count = compliance_sql.at_risk_count(conn, below_remaining=below_remaining, today=today)
+        else:
+            at_risk_count = compliance_snapshot.at_risk_count(conn, below_remaining=below_remaining, today=today)
     except Exception as e:
         logger.error(f"Error calculating at-risk count: {e}")
         at_risk_count = 0
@@ -923,9 +979,15 @@ def home():
     
     # Get news (use cached version for performance)
     try:
-        from .services.news_fetcher import get_cached_news
-        db_path = current_app.config['DATABASE']
-        news_items = get_cached_news(db_path)
+        cache = current_app.config.get('CACHE')
+        news_items = cache.get('news:home') if cache else None
+        if news_items is None:
+            tokens = cache.tag_tokens((NEWS_TAG,)) if cache else None
+            from .services.news_fetcher import get_cached_news
+            db_path = current_app.config['DATABASE']
+            news_items = get_cached_news(db_path)
+            if cache:
+                cache.set('news:home', news_items, timeout=300, tags=(NEWS_TAG,), tokens=tokens)
     except Exception as e:
         logger.error(f"Error fetching cached news: {e}")
         news_items = []
@@ -946,260 +1008,55 @@ def dashboard():
     # OPTIMIZATION (Phase 2): Response caching for dashboard
     cache = current_app.config.get('CACHE')
     sort_by = request.args.get('sort', 'first_name')
+    page = request.args.get('page')
+    page_size = request.args.get('page_size')
+    risk = request.args.get('risk')
+    name_prefix = request.args.get('q')
     cache_key = None
+    cache_tokens = None
     
-    # Generate cache key based on sort parameter and data version
-    # Cache key includes sort_by to ensure different sorts are cached separately
-    # OPTIMIZATION V2: Single query instead of 2 queries for cache key generation
+    # Cache key combines the page arguments, today's date and the trigger-maintained
+    # data version, so any trip or employee write (including edits and deletes)
+    # and the day rolling over produce a new key
     if cache:
-        # Get a data version indicator (e.g., max trip/employee update timestamp)
         try:
-            conn_temp = get_db()
-            c_temp = conn_temp.cursor()
-            # Get max timestamp from both tables in a single query
-            c_temp.execute('''
-                SELECT MAX(ts) as max_ts FROM (
-                    SELECT MAX(created_at) as ts FROM trips
-                    UNION ALL
-                    SELECT MAX(created_at) as ts FROM employees
+            with closing(get_db()) as conn_temp:
+                cache_key = versioned_cache_key(
+                    conn_temp, 'dashboard', sort_by, page, page_size, risk, name_prefix
                 )
-            ''')
-            result = c_temp.fetchone()
-            max_timestamp = result[0] if result and result[0] else 'default'
-            cache_key = f'dashboard:{sort_by}:{max_timestamp}'
             
             # Try to get cached response
             cached_response = cache.get(cache_key)
             if cached_response:
                 logger.debug("Dashboard response served from cache")
                 return cached_response
+            # Taken before rendering so an invalidation during the render still evicts it
+            cache_tokens = cache.tag_tokens((DASHBOARD_TAG,))
         except Exception as e:
             logger.warning(f"Cache check failed: {e}")
             cache = None  # Fall back to no caching
     
-    try:
-        conn = get_db()
-        c = conn.cursor()
-        
-        # Determine sort order based on parameter
-        if sort_by == 'last_name':
-            # Sort by last name (everything after the first space)
-            c.execute('SELECT id, name FROM employees ORDER BY SUBSTR(name, INSTR(name, " ") + 1), name')
-        else:
-            # Default: sort by first name (full name)
-            c.execute('SELECT id, name FROM employees ORDER BY name')
-        
-        employees = c.fetchall()
-        employee_data = []
-        at_risk_employees = []
-        today = datetime.now().date()
-        
-        # Get risk thresholds from config
-        risk_thresholds = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10})
-        warning_threshold = CONFIG.get('FUTURE_JOB_WARNING_THRESHOLD', 80)
-        
-        # Use fixed compliance start date (October 12, 2025)
-        from .services.rolling90 import COMPLIANCE_START_DATE
-        compliance_start_date = COMPLIANCE_START_DATE
-        
-        # Track future compliance alerts summary
-        future_alerts_red = 0
-        future_alerts_yellow = 0
-        future_alerts_green = 0
-
-        # OPTIMIZATION: Batch fetch all trips for all employees in a single query
-        # This eliminates N+1 query problem (was 4-6 queries per employee, now 1 query total)
-        if employees:
-            employee_ids = [emp['id'] for emp in employees]
-            placeholders = ','.join('?' * len(employee_ids))
-            
-            # Single query to get all trips for all employees
-            c.execute(f'''
-                SELECT 
-                    employee_id,
-                    entry_date,
-                    exit_date,
-                    country,
-                    is_private,
-                    id as trip_id
-                FROM trips
-                WHERE employee_id IN ({placeholders})
-                ORDER BY employee_id, entry_date DESC
-            ''', employee_ids)
-            all_trips_raw = c.fetchall()
-            
-            # Group trips by employee_id in Python (much faster than multiple DB queries)
-            trips_by_employee = {}
-            trip_counts_by_employee = {}
-            for trip in all_trips_raw:
-                emp_id = trip['employee_id']
-                if emp_id not in trips_by_employee:
-                    trips_by_employee[emp_id] = []
-                    trip_counts_by_employee[emp_id] = 0
-                trips_by_employee[emp_id].append({
-                    'entry_date': trip['entry_date'],
-                    'exit_date': trip['exit_date'],
-                    'country': trip['country'],
-                    'is_private': trip['is_private'],
-                    'trip_id': trip['trip_id']
-                })
-                trip_counts_by_employee[emp_id] += 1
-            
-            # Get next trips and recent trips in batch queries
-            today_str = today.strftime('%Y-%m-%d')
-            
-            # Batch query for next upcoming trips
-            # Use a simpler approach: fetch all future trips and filter in Python
-            c.execute(f'''
-                SELECT 
-                    employee_id,
-                    country,
-                    entry_date,
-                    is_private
-                FROM trips
-                WHERE entry_date > ? 
-                  AND employee_id IN ({placeholders})
-                ORDER BY employee_id, entry_date ASC
-            ''', [today_str] + employee_ids)
-            future_trips_raw = c.fetchall()
-            
-            # Group by employee and take first (earliest) trip per employee
-            next_trips_by_employee = {}
-            for trip in future_trips_raw:
-                emp_id = trip['employee_id']
-                if emp_id not in next_trips_by_employee:
-                    next_trips_by_employee[emp_id] = dict(trip)
-            
-            # Batch query for recent trips (top 5 per employee)
-            # Note: SQLite doesn't support window functions easily, so we'll handle this in Python
-            # for better performance, we'll fetch recent trips and filter in Python
-            c.execute(f'''
-                SELECT 
-                    employee_id,
-                    country,
-                    entry_date,
-                    exit_date,
-                    is_private
-                FROM trips
-                WHERE employee_id IN ({placeholders})
-                ORDER BY employee_id, exit_date DESC
-            ''', employee_ids)
-            all_recent_trips_raw = c.fetchall()
-            
-            # Group recent trips by employee (top 5 per employee)
-            recent_trips_by_employee = {}
-            for trip in all_recent_trips_raw:
-                emp_id = trip['employee_id']
-                if emp_id not in recent_trips_by_employee:
-                    recent_trips_by_employee[emp_id] = []
-                if len(recent_trips_by_employee[emp_id]) < 5:
-                    recent_trips_by_employee[emp_id].append(dict(trip))
-        else:
-            trips_by_employee = {}
-            trip_counts_by_employee = {}
-            next_trips_by_employee = {}
-            recent_trips_by_employee = {}
-
-        # Process each employee with pre-fetched data
-        for emp in employees:
-            emp_id = emp['id']
-            
-            # Get trips for this employee (already fetched in batch)
-            trips = trips_by_employee.get(emp_id, [])
-            
-            # Calculate presence days and usage using new rolling90 module
-            presence = presence_days(trips, compliance_start_date)
-            days_used = days_used_in_window(presence, today, compliance_start_date)
-            days_remaining = calculate_days_remaining(presence, today, compliance_start_date=compliance_start_date)
-            risk_level = get_risk_level(days_remaining, risk_thresholds)
-            
-            # Calculate earliest safe entry date
-            safe_entry = earliest_safe_entry(presence, today, compliance_start_date=compliance_start_date)
-            
-            # Calculate days until compliant for at-risk employees (days_remaining < 0)
-            days_until_compliant_val = None
-            compliance_date = None
-            if days_remaining < 0:
-                days_until_compliant_val, compliance_date = days_until_compliant(presence, today, compliance_start_date=compliance_start_date)
-
-            # Get total trip count (already calculated from batch query)
-            trip_count = trip_counts_by_employee.get(emp_id, 0)
-
-            # Get next upcoming trip (already fetched in batch)
-            next_trip_row = next_trips_by_employee.get(emp_id)
-            next_trip = redact_private_trip_data(next_trip_row) if next_trip_row else None
-
-            # Get recent trips (already fetched in batch)
-            recent_trips_raw = recent_trips_by_employee.get(emp_id, [])
-            recent_trips = [redact_private_trip_data(dict(trip)) for trip in recent_trips_raw]
-            
-            # Calculate future job forecasts for this employee
-            forecasts = get_all_future_jobs_for_employee(emp_id, trips, warning_threshold, compliance_start_date)
-            for forecast in forecasts:
-                if forecast['risk_level'] == 'red':
-                    future_alerts_red += 1
-                elif forecast['risk_level'] == 'yellow':
-                    future_alerts_yellow += 1
-                else:
-                    future_alerts_green += 1
-            
-            forecast_reference = forecasts[0] if forecasts else None
-            if forecast_reference:
-                projected_remaining = forecast_reference.get('days_remaining_after_job', days_remaining)
-                projected_risk = forecast_reference.get('risk_level', risk_level)
-            else:
-                projected_remaining = days_remaining
-                projected_risk = risk_level
-            
-            # Create employee data object
-            emp_data = {
-                'id': emp['id'],
-                'name': emp['name'],
-                'days_used': days_used,
-                'days_remaining': days_remaining,
-                'risk_level': risk_level,
-                'forecasted_days_remaining': projected_remaining,
-                'forecast_risk_level': projected_risk,
-                'forecast_reference': forecast_reference,
-                'safe_entry_date': safe_entry,
-                'trip_count': trip_count,
-                'next_trip': next_trip,
-                'recent_trips': recent_trips,
-                'days_until_compliant': days_until_compliant_val,
-                'compliance_date': compliance_date,
-                'forecasts': forecasts
-            }
-            
-            employee_data.append(emp_data)
-            
-            # Track at-risk employees (days_remaining < 0 or days_remaining < 10)
-            if days_remaining < 10:
-                at_risk_employees.append(emp_data)
-        
-        # Get future job alerts summary
-        future_alerts_summary = {
-            'red': future_alerts_red,
-            'yellow': future_alerts_yellow,
-            'green': future_alerts_green
-        }
-        
-        response = render_template('dashboard.html', 
-                             employees=employee_data, 
-                             at_risk_employees=at_risk_employees,
-                             future_alerts_summary=future_alerts_summary,
-                             sort_by=sort_by,
-                             risk_thresholds=risk_thresholds)
-        
-        # OPTIMIZATION (Phase 2): Cache the response for 60 seconds
-        if cache:
-            try:
-                cache.set(cache_key, response, timeout=60)
-                logger.debug("Dashboard response cached")
-            except Exception as e:
-                logger.warning(f"Failed to cache dashboard response: {e}")
-        
-        return response
+    # Get risk thresholds from config
+    risk_thresholds = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10})
+    warning_threshold = CONFIG.get('FUTURE_JOB_WARNING_THRESHOLD', 80)
     
+    try:
+        # One page of employees from the compliance snapshot; forecasts and
+        # extra stay rules are evaluated for that page only
+        view = dashboard_service.get_page_view(
+            current_app.config,
+            page=page,
+            page_size=page_size,
+            sort_by=sort_by,
+            risk=risk,
+            name_prefix=name_prefix,
+            warning_threshold=warning_threshold,
+            risk_thresholds=risk_thresholds,
+            rules=stay_rules.configured_rules(),
+        )
+    except dashboard_service.DashboardQueryError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('main.dashboard'))
     except Exception as e:
         logger.error(f"Dashboard error: {e}")
         logger.error(traceback.format_exc())
@@ -1207,10 +1064,92 @@ def dashboard():
         return render_template('dashboard.html', 
                              employees=[], 
                              at_risk_employees=[],
+                             at_risk_total=0,
                              future_alerts_summary={'red': 0, 'yellow': 0, 'green': 0},
                              sort_by='first_name',
-                             risk_thresholds={'green': 30, 'amber': 10})
-    # Connection managed by Flask teardown handler in models.py
+                             risk_thresholds={'green': 30, 'amber': 10},
+                             page=1,
+                             pages=0,
+                             total=0,
+                             page_size=dashboard_service.DEFAULT_PAGE_SIZE,
+                             risk='all',
+                             q='')
+    
+    _redact_dashboard_trips(view['employees'])
+    _redact_dashboard_trips(view['at_risk_employees'])
+    response = render_template('dashboard.html', 
+                         employees=view['employees'], 
+                         at_risk_employees=view['at_risk_employees'],
+                         at_risk_total=view['at_risk_total'],
+                         future_alerts_summary=view['future_alerts_summary'],
+                         sort_by=view['sort'],
+                         risk_thresholds=risk_thresholds,
+                         page=view['page'],
+                         pages=view['pages'],
+                         total=view['total'],
+                         page_size=view['page_size'],
+                         risk=view['risk'],
+                         q=view['q'])
+    
+    # OPTIMIZATION (Phase 2): Cache the response for 60 seconds
+    if cache:
+        try:
+            cache.set(cache_key, response, timeout=60, tags=(DASHBOARD_TAG,), tokens=cache_tokens)
+            logger.debug("Dashboard response cached")
+        except Exception as e:
+            logger.warning(f"Failed to cache dashboard response: {e}")
+    
+    return response
+
+
+def _redact_dashboard_trips(employees):
+    """Redact private next/recent trips on dashboard rows in place."""
+    for employee in employees:
+        if employee['next_trip']:
+            employee['next_trip'] = redact_private_trip_data(employee['next_trip'])
+        employee['recent_trips'] = [redact_private_trip_data(trip) for trip in employee['recent_trips']]
+
+@main_bp.route('/api/dashboard')
+@login_required
+def api_dashboard():
+    """One page of dashboard rows: ?page=&page_size=&sort=&risk=&q= (name prefix)."""
+    from flask import current_app
+    try:
+        result = dashboard_service.get_page(
+            current_app.config,
+            page=request.args.get('page'),
+            page_size=request.args.get('page_size'),
+            sort_by=request.args.get('sort'),
+            risk=request.args.get('risk'),
+            name_prefix=request.args.get('q'),
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Dashboard page error: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'Failed to load dashboard'}), 500
+    _redact_dashboard_trips(result['employees'])
+    return jsonify(result)
+
+@main_bp.route('/api/dashboard/<int:employee_id>/forecasts')
+@login_required
+def api_dashboard_forecasts(employee_id):
+    """Future-job forecasts for one dashboard row, fetched when the row is expanded."""
+    from flask import current_app
+    warning_threshold = current_app.config['CONFIG'].get('FUTURE_JOB_WARNING_THRESHOLD', 80)
+    try:
+        forecasts = dashboard_service.get_employee_forecasts(current_app.config, employee_id, warning_threshold)
+    except Exception as e:
+        logger.error(f"Dashboard forecast error for employee {employee_id}: {e}")
+        logger.error(traceback.format_exc())
+        return jsonify({'error': 'Failed to load forecasts'}), 500
+    if forecasts is None:
+        return jsonify({'error': 'Employee not found'}), 404
+    for forecast in forecasts:
+        if forecast['is_private']:
+            forecast['country'] = 'Personal Trip'
+    return jsonify({'employee_id': employee_id, 'forecasts': forecasts})
 
 @main_bp.route('/employee/<int:employee_id>')
 @login_required
@@ -1292,18 +1231,16 @@ def employee_detail(employee_id):
             # For compliance calculations, use original data (not redacted)
             simple_trips.append({'entry_date': entry_str, 'exit_date': exit_str, 'country': row['country']})
 
-        # Compute rolling 90/180 stats for this employee
-        presence = presence_days(simple_trips, compliance_start_date)
-        from datetime import datetime as _dt
+        # Compute rolling 90/180 stats for this employee (memoised per trip data version)
+        presence = compliance_cache.employee_presence(employee_id, lambda: simple_trips)
         ref_date = today
-        days_used = days_used_in_window(presence, ref_date, compliance_start_date)
-        days_remaining = calculate_days_remaining(presence, ref_date, compliance_start_date=compliance_start_date)
+        summary = compliance_cache.employee_compliance(employee_id, ref_date, lambda: simple_trips)
+        days_used = summary['days_used']
+        days_remaining = summary['days_remaining']
         risk_level = get_risk_level(days_remaining, risk_thresholds)
-        safe_entry = earliest_safe_entry(presence, ref_date, compliance_start_date=compliance_start_date)
-        days_until_safe = None
-        compliant_date = None
-        if days_remaining < 0:
-            days_until_safe, compliant_date = days_until_compliant(presence, ref_date, compliance_start_date=compliance_start_date)
+        safe_entry = summary['safe_entry_date']
+        days_until_safe = summary['days_until_compliant']
+        compliant_date = summary['compliance_date']
 
         # Calculate per-trip compliance snapshots so job context rows reflect accurate rolling totals.
         limit = 90
@@ -1401,6 +1338,7 @@ def delete_employee(employee_id):
         employee_deleted = c.rowcount
         
         conn.commit()
+        compliance_snapshot.refresh_snapshots_safely(conn, [employee_id])
         
         if employee_deleted > 0:
             flash(f'Employee and {trips_deleted} associated trip(s) deleted successfully.', 'success')
@@ -1462,19 +1400,16 @@ def add_trip():
     c = conn.cursor()
     
     try:
+        normalized = normalized_trip_columns(entry_date, exit_date, country)
         c.execute('''
-            INSERT INTO trips (employee_id, country, entry_date, exit_date, purpose, is_private)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (employee_id, country, entry_date, exit_date, purpose, is_private))
+            INSERT INTO trips (employee_id, country, entry_date, exit_date, purpose, is_private,
+                               entry_ord, exit_ord, country_code, is_schengen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (employee_id, country, entry_date, exit_date, purpose, is_private,
+              normalized['entry_ord'], normalized['exit_ord'], normalized['country_code'], normalized['is_schengen']))
         trip_id = c.lastrowid
         conn.commit()
-        
-        # OPTIMIZATION (Phase 2): Invalidate dashboard cache after trip addition
-        try:
-            from .utils.cache_invalidation import invalidate_dashboard_cache
-            invalidate_dashboard_cache()
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache after trip addition: {e}")
+        compliance_snapshot.refresh_snapshots_safely(conn, [employee_id])
         
         audit_action = 'private_trip_added' if is_private else 'trip_added'
         write_audit(CONFIG['AUDIT_LOG_PATH'], audit_action, 'admin', {
@@ -1530,13 +1465,7 @@ def delete_trip(trip_id):
         
         c.execute('DELETE FROM trips WHERE id = ?', (trip_id,))
         conn.commit()
-        
-        # OPTIMIZATION (Phase 2): Invalidate dashboard cache after trip deletion
-        try:
-            from .utils.cache_invalidation import invalidate_dashboard_cache
-            invalidate_dashboard_cache()
-        except Exception as e:
-            logger.warning(f"Failed to invalidate cache after trip deletion: {e}")
+        compliance_snapshot.refresh_snapshots_safely(conn, [trip['employee_id']])
         
         write_audit(CONFIG['AUDIT_LOG_PATH'], 'trip_deleted', 'admin', {
             'trip_id': trip_id,
@@ -1639,9 +1568,14 @@ def edit_trip(trip_id):
             return jsonify({'success': False, 'error': hard_errors[0]}), 400
 
         # Update trip (potentially with new employee)
-        c.execute('UPDATE trips SET employee_id = ?, country = ?, entry_date = ?, exit_date = ? WHERE id = ?',
-                 (target_employee_id, new_country, new_entry, new_exit, trip_id))
+        normalized = normalized_trip_columns(new_entry, new_exit, new_country)
+        c.execute('UPDATE trips SET employee_id = ?, country = ?, entry_date = ?, exit_date = ?, '
+                  'entry_ord = ?, exit_ord = ?, country_code = ?, is_schengen = ? WHERE id = ?',
+                 (target_employee_id, new_country, new_entry, new_exit,
+                  normalized['entry_ord'], normalized['exit_ord'], normalized['country_code'],
+                  normalized['is_schengen'], trip_id))
         conn.commit()
+        compliance_snapshot.refresh_snapshots_safely(conn, {current_trip['employee_id'], target_employee_id})
 
         try:
             write_audit(CONFIG['AUDIT_LOG_PATH'], 'trip_updated', 'admin', {
@@ -1866,6 +1800,80 @@ def export_future_alerts():
     resp.headers['Content-Disposition'] = 'attachment; filename=future_job_alerts.csv'
     return resp
 
+def _as_of_range_args():
+    """(start, end) from ?date= or ?start=&end= query parameters; raises ValueError."""
+    single = request.args.get('date')
+    start = request.args.get('start') or single
+    end = request.args.get('end') or start
+    if not start:
+        raise ValueError('date or start is required')
+    return date.fromisoformat(start), date.fromisoformat(end)
+
+@main_bp.route('/api/compliance/as_of')
+@login_required
+def api_compliance_as_of():
+    """Every employee's status on ?date=, or a daily status matrix over ?start=&end=."""
+    from flask import current_app
+    CONFIG = current_app.config['CONFIG']
+    risk_thresholds = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10})
+    db_path = current_app.config['DATABASE']
+    try:
+        start, end = _as_of_range_args()
+        if 'start' not in request.args and start == end:
+            return jsonify({
+                'date': start.isoformat(),
+                'employees': reports_service.compliance_as_of(db_path, start, risk_thresholds),
+            })
+        return jsonify(reports_service.compliance_as_of_range(db_path, start, end, risk_thresholds))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"As-of compliance error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@main_bp.route('/api/compliance/timeseries')
+@login_required
+def api_compliance_timeseries():
+    """Daily green/amber/red employee counts from a year ago to six months ahead, served with an ETag."""
+    from flask import current_app
+    CONFIG = current_app.config['CONFIG']
+    risk_thresholds = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10})
+    today = date.today()
+    conn = get_db()
+    try:
+        etag = compliance_timeseries.series_version(conn, today, risk_thresholds)
+        if request.if_none_match.contains(etag):
+            resp = make_response('', 304)
+        else:
+            resp = jsonify(compliance_timeseries.load_timeseries(conn, today, risk_thresholds))
+        resp.set_etag(etag)
+        resp.headers['Cache-Control'] = 'private, no-cache'
+        return resp
+    except Exception as e:
+        logger.error(f"Risk time series error: {e}")
+        return jsonify({'error': str(e)}), 500
+    finally:
+        conn.close()
+
+@main_bp.route('/export/compliance_as_of')
+@login_required
+def export_compliance_as_of():
+    """Export every employee's status on ?date= (or each day of ?start=&end=) to CSV"""
+    from flask import current_app
+    CONFIG = current_app.config['CONFIG']
+    risk_thresholds = CONFIG.get('RISK_THRESHOLDS', {'green': 30, 'amber': 10})
+    db_path = current_app.config['DATABASE']
+    try:
+        start, end = _as_of_range_args()
+        csv_data = reports_service.generate_as_of_csv(db_path, start, end, risk_thresholds)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    resp = make_response(csv_data)
+    resp.headers['Content-Type'] = 'text/csv'
+    suffix = start.isoformat() if start == end else f"{start.isoformat()}_{end.isoformat()}"
+    resp.headers['Content-Disposition'] = f'attachment; filename=compliance_as_of_{suffix}.csv'
+    return resp
+
 @main_bp.route('/export/trips/csv')
 @login_required
 def export_trips_csv_route():
@@ -1920,6 +1928,92 @@ def api_calculate_scenario():
         logger.error(f"Scenario calculation error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@main_bp.route('/api/max_stay', methods=['POST'])
+@login_required
+def api_max_stay():
+    """Longest compliant continuous stay for an employee entering on entry_date."""
+    from flask import current_app
+    data = request.get_json(force=True) or {}
+    try:
+        employee_id = int(data.get('employee_id') or 0)
+        entry_date = data.get('entry_date')
+        if not (employee_id and entry_date):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        db_path = current_app.config['DATABASE']
+        result = scenario_service.calculate_max_stay(db_path, employee_id, entry_date)
+        if result is None:
+            return jsonify({'error': 'Employee not found'}), 404
+        return jsonify(result)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Max stay calculation error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@main_bp.route('/api/planner/slots', methods=['POST'])
+@login_required
+def api_planner_slots():
+    """Start dates on which a job of the given duration fits for each employee."""
+    from flask import current_app
+    data = request.get_json(force=True) or {}
+    try:
+        employee_ids = data.get('employee_ids') or ([data['employee_id']] if data.get('employee_id') else [])
+        employee_ids = [int(emp_id) for emp_id in employee_ids]
+        duration = int(data.get('duration') or 0)
+        horizon_days = int(data.get('horizon_days') or 365)
+        max_results = int(data['max_results']) if data.get('max_results') else None
+        if not employee_ids or duration < 1:
+            return jsonify({'error': 'Missing required fields'}), 400
+        if not 1 <= horizon_days <= 731:
+            return jsonify({'error': 'horizon_days must be between 1 and 731'}), 400
+
+        db_path = current_app.config['DATABASE']
+        results = scenario_service.find_slots(
+            db_path,
+            employee_ids,
+            duration,
+            data.get('start_date'),
+            horizon_days,
+            max_results,
+        )
+        if not results:
+            return jsonify({'error': 'Employee not found'}), 404
+        return jsonify({'duration': duration, 'horizon_days': horizon_days, 'employees': results})
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Slot finder error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@main_bp.route('/api/staffing/rank', methods=['POST'])
+@login_required
+def api_staffing_rank():
+    """Rank all employees by projected days remaining after a prospective job."""
+    from flask import current_app
+    data = request.get_json(force=True) or {}
+    try:
+        start_date = data.get('start_date')
+        end_date = data.get('end_date')
+        country = (data.get('country') or '').strip()
+        if not (start_date and end_date and country):
+            return jsonify({'error': 'Missing required fields'}), 400
+
+        db_path = current_app.config['DATABASE']
+        candidates = scenario_service.rank_staffing(
+            db_path,
+            start_date,
+            end_date,
+            country,
+            current_app.config['CONFIG'].get('FUTURE_JOB_WARNING_THRESHOLD', 80)
+        )
+        return jsonify({'start_date': start_date, 'end_date': end_date, 'country': country, 'candidates': candidates})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Staffing rank error: {e}")
+        return jsonify({'error': str(e)}), 500
+
 @main_bp.route('/admin_privacy_tools')
 @login_required
 def admin_privacy_tools():
@@ -2147,6 +2241,10 @@ def admin_settings():
                 
                 with open('config.py', 'w') as f:
                     f.write(content)
+
+                if 'RISK_THRESHOLDS' in config_updates:
+                    # Stored risk levels depend on the thresholds
+                    compliance_snapshot.refresh_snapshots_safely(get_db())
                 
                 flash('Settings updated successfully!', 'success')
             else:
@@ -2215,22 +2313,28 @@ def test_calendar_data():
         from .services.rolling90 import COMPLIANCE_START_DATE
         compliance_start_date = COMPLIANCE_START_DATE
         
+        # Current usage for every employee from the materialised snapshot
+        snapshots = compliance_snapshot.load_snapshots(conn, today)
+
         # Calculate compliance for each employee
         resources = []
         for emp in employees:
-            # Get all trips for this employee (not just in date range)
-            c.execute('''
-                SELECT entry_date, exit_date, country, is_private
-                FROM trips 
-                WHERE employee_id = ? 
-                ORDER BY entry_date
-            ''', (emp['id'],))
-            emp_trips = [dict(row) for row in c.fetchall()]
-            
-            # Calculate compliance
-            presence = presence_days(emp_trips, compliance_start_date)
-            days_used = days_used_in_window(presence, today, compliance_start_date)
-            days_remaining = calculate_days_remaining(presence, today, compliance_start_date=compliance_start_date)
+            snapshot = snapshots.get(emp['id'])
+            if snapshot is None:
+                # Get all trips for this employee (not just in date range)
+                c.execute('''
+                    SELECT entry_date, exit_date, country, is_private
+                    FROM trips 
+                    WHERE employee_id = ? 
+                    ORDER BY entry_date
+                ''', (emp['id'],))
+                emp_trips = [dict(row) for row in c.fetchall()]
+                presence = presence_days(emp_trips, compliance_start_date)
+                days_used = days_used_in_window(presence, today, compliance_start_date)
+                days_remaining = calculate_days_remaining(presence, today, compliance_start_date=compliance_start_date)
+            else:
+                days_used = snapshot['days_used']
+                days_remaining = snapshot['days_remaining']
             
             # Determine risk level and color
             risk_thresholds = {'yellow': 80, 'red': 90}
@@ -2295,7 +2399,7 @@ def test_calendar_data():
 def api_calendar_data():
     """Return employees as resources and trips as events for FullCalendar resourceTimeline view"""
     from flask import current_app
-    from .services.rolling90 import presence_days, days_used_in_window, calculate_days_remaining, get_risk_level
+    from .services.rolling90 import get_risk_level
     from datetime import date, timedelta
     
     db_path = current_app.config['DATABASE']
@@ -2354,22 +2458,28 @@ def api_calendar_data():
         from .services.rolling90 import COMPLIANCE_START_DATE
         compliance_start_date = COMPLIANCE_START_DATE
         
+        # Current usage for every employee from the materialised snapshot
+        snapshots = compliance_snapshot.load_snapshots(conn, today)
+
         # Calculate compliance for each employee
         resources = []
         for emp in employees:
-            # Get all trips for this employee (not just in date range)
-            c.execute('''
-                SELECT entry_date, exit_date, country, is_private
-                FROM trips 
-                WHERE employee_id = ? 
-                ORDER BY entry_date
-            ''', (emp['id'],))
-            emp_trips = [dict(row) for row in c.fetchall()]
-            
-            # Calculate compliance
-            presence = presence_days(emp_trips, compliance_start_date)
-            days_used = days_used_in_window(presence, today, compliance_start_date)
-            days_remaining = calculate_days_remaining(presence, today, compliance_start_date=compliance_start_date)
+            snapshot = snapshots.get(emp['id'])
+            if snapshot is None:
+                # Get all trips for this employee (not just in date range)
+                c.execute('''
+                    SELECT entry_date, exit_date, country, is_private
+                    FROM trips 
+                    WHERE employee_id = ? 
+                    ORDER BY entry_date
+                ''', (emp['id'],))
+                emp_trips = [dict(row) for row in c.fetchall()]
+                presence = presence_days(emp_trips, compliance_start_date)
+                days_used = days_used_in_window(presence, today, compliance_start_date)
+                days_remaining = calculate_days_remaining(presence, today, compliance_start_date=compliance_start_date)
+            else:
+                days_used = snapshot['days_used']
+                days_remaining = snapshot['days_remaining']
             
             # Determine risk level and color
             risk_thresholds = {'yellow': 80, 'red': 90}
@@ -2477,7 +2587,7 @@ def global_calendar():
 def api_trip_details(trip_id):
     """Return detailed trip information for modal display"""
     from flask import current_app
-    from .services.rolling90 import presence_days, days_used_in_window, calculate_days_remaining, get_risk_level
+    from .services.rolling90 import get_risk_level
     from datetime import date, timedelta
     
     db_path = current_app.config['DATABASE']
@@ -2501,19 +2611,20 @@ def api_trip_details(trip_id):
         
         trip_dict = dict(trip)
         
-        # Calculate compliance impact
-        c.execute('''
-            SELECT entry_date, exit_date, country, is_private
-            FROM trips 
-            WHERE employee_id = ? 
-            ORDER BY entry_date
-        ''', (trip_dict['employee_id'],))
-        emp_trips = [dict(row) for row in c.fetchall()]
-        
-        presence = presence_days(emp_trips)
+        # Calculate compliance impact; the employee's trips are only read on a cache miss
+        def load_trips():
+            c.execute('''
+                SELECT entry_date, exit_date, country, is_private
+                FROM trips 
+                WHERE employee_id = ? 
+                ORDER BY entry_date
+            ''', (trip_dict['employee_id'],))
+            return [dict(row) for row in c.fetchall()]
+        
         today = date.today()
-        days_used = days_used_in_window(presence, today)
-        days_remaining = calculate_days_remaining(presence, today)
+        summary = compliance_cache.employee_compliance(trip_dict['employee_id'], today, load_trips)
+        days_used = summary['days_used']
+        days_remaining = summary['days_remaining']
         
         risk_thresholds = {'yellow': 80, 'red': 90}
         risk_level = get_risk_level(days_remaining, risk_thresholds)
@@ -2622,6 +2733,7 @@ def delete_all_data():
             pass
         try:
             conn.commit()
+            compliance_snapshot.refresh_snapshots_safely(conn)
         finally:
             try:
                 conn.close()
@@ -2789,10 +2901,12 @@ def api_trips_post():
                 return jsonify({'error': f'Missing required field: {field}'}), 400
         
         # Insert new trip
+        normalized = normalized_trip_columns(data['start_date'], data['end_date'], data['country'])
         c.execute('''
             INSERT INTO trips (employee_id, country, entry_date, exit_date, 
-                             is_private, job_ref, ghosted, travel_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                             is_private, job_ref, ghosted, travel_days,
+                             entry_ord, exit_ord, country_code, is_schengen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             data['employee_id'],
             data['country'],
@@ -2801,11 +2915,16 @@ def api_trips_post():
             data.get('is_private', False),
             data.get('job_ref', ''),
             data.get('ghosted', False),
-            data.get('travel_days', 0)
+            data.get('travel_days', 0),
+            normalized['entry_ord'],
+            normalized['exit_ord'],
+            normalized['country_code'],
+            normalized['is_schengen'],
         ))
         
         trip_id = c.lastrowid
         conn.commit()
+        compliance_snapshot.refresh_snapshots_safely(conn, [data['employee_id']])
         
         # Return the created trip
         c.execute('''
@@ -2831,6 +2950,7 @@ def api_trips_post():
 def api_trips_patch(trip_id):
     """Update an existing trip"""
     from flask import current_app, request
+    from .models import sync_trip_normalized_columns
     
     db_path = current_app.config['DATABASE']
     conn = sqlite3.connect(db_path)
@@ -2863,6 +2983,9 @@ def api_trips_patch(trip_id):
         
         update_values.append(trip_id)
         
+        c.execute('SELECT employee_id FROM trips WHERE id = ?', (trip_id,))
+        previous = c.fetchone()
+        
         c.execute(f'''
             UPDATE trips 
             SET {', '.join(update_fields)}
@@ -2872,7 +2995,12 @@ def api_trips_patch(trip_id):
         if c.rowcount == 0:
             return jsonify({'error': 'Trip not found'}), 404
         
+        sync_trip_normalized_columns(conn, [trip_id])
         conn.commit()
+        affected = {previous['employee_id']} if previous else set()
+        if 'employee_id' in data:
+            affected.add(data['employee_id'])
+        compliance_snapshot.refresh_snapshots_safely(conn, affected)
         
         # Return the updated trip
         c.execute('''
@@ -2905,12 +3033,15 @@ def api_trips_delete(trip_id):
     c = conn.cursor()
     
     try:
+        c.execute('SELECT employee_id FROM trips WHERE id = ?', (trip_id,))
+        previous = c.fetchone()
         c.execute('DELETE FROM trips WHERE id = ?', (trip_id,))
         
         if c.rowcount == 0:
             return jsonify({'error': 'Trip not found'}), 404
         
         conn.commit()
+        compliance_snapshot.refresh_snapshots_safely(conn, [previous['employee_id']])
         return jsonify({'id': trip_id})
         
     except Exception as e:
@@ -2950,10 +3081,12 @@ def api_trips_duplicate(trip_id):
             if key in new_trip:
                 new_trip[key] = value
         
+        normalized = normalized_trip_columns(new_trip['entry_date'], new_trip['exit_date'], new_trip['country'])
         c.execute('''
             INSERT INTO trips (employee_id, country, entry_date, exit_date, 
-                             is_private, job_ref, ghosted, travel_days)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                             is_private, job_ref, ghosted, travel_days,
+                             entry_ord, exit_ord, country_code, is_schengen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             new_trip['employee_id'],
             new_trip['country'],
@@ -2962,11 +3095,16 @@ def api_trips_duplicate(trip_id):
             new_trip['is_private'],
             new_trip['job_ref'],
             new_trip['ghosted'],
-            new_trip['travel_days']
+            new_trip['travel_days'],
+            normalized['entry_ord'],
+            normalized['exit_ord'],
+            normalized['country_code'],
+            normalized['is_schengen'],
         ))
         
         new_trip_id = c.lastrowid
         conn.commit()
+        compliance_snapshot.refresh_snapshots_safely(conn, [new_trip['employee_id']])
         
         # Return the new trip
         c.execute('''
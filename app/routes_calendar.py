@@ -4,18 +4,26 @@ from __future__ import annotations
 
 import logging
 from datetime import date, datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
-from flask import Blueprint, jsonify, request, session
+from flask import Blueprint, current_app, jsonify, request, session
 
-from .models import Trip, get_db
+from .models import Trip, get_db, sync_trip_normalized_columns
+from .repositories.data_version_repository import ALERTS_SCOPE, GLOBAL_SCOPE, employee_scope
+from .services import compliance_cache, compliance_timeseries
 from .services.alerts import check_alert_status, get_active_alerts, resolve_alert
+from .services.compliance_batch import DEFAULT_RISK_THRESHOLDS
+from .services.compliance_projection import load_projection
+from .services.compliance_snapshot import refresh_snapshots_safely
+from .services.presence_delta import record_trip_change
 from .services.rolling90 import (
-    days_used_in_window,
+    WINDOW_DAYS,
     is_schengen_country,
-    presence_days,
+    normalized_trip_columns,
 )
-from .utils.cache_invalidation import invalidate_dashboard_cache
+from .utils.cache_helpers import versioned_cache_key
+from .utils.cache_invalidation import invalidate_employees_cache, invalidate_tags
+from .utils.tagged_cache import ALERTS_TAG, CALENDAR_TAG, employee_tags
 
 
 logger = logging.getLogger(__name__)
@@ -25,6 +33,7 @@ bp = Blueprint("calendar_api", __name__, url_prefix="/api")
 
 MAX_FUTURE_YEARS = 10
 MIN_ALLOWED_YEAR = 1990
+FORECAST_DAYS = 180  # Days of projected usage returned for calendar colouring
 
 
 def _validate_year_range(candidate: date, field_name: str) -> None:
@@ -106,14 +115,138 @@ def _close_conn(conn) -> None:
         pass
 
 
-def _invalidate_dashboard_cache_safely() -> None:
-    """Best-effort cache invalidation so dashboard reflects latest trip data."""
+def _invalidate_dashboard_cache_safely(employee_ids) -> None:
+    """Best-effort eviction of the changed employees' cached fragments and the aggregates over them."""
     try:
-        invalidate_dashboard_cache()
+        invalidate_employees_cache(employee_ids)
     except Exception:  # pragma: no cover - defensive logging
         logger.exception("Failed to invalidate dashboard cache after calendar mutation")
 
 
+RESPONSE_CACHE_SECONDS = 60
+
+
+def _versioned_key(conn, namespace: str, *parts: Any, scopes=(GLOBAL_SCOPE,)) -> Optional[str]:
+    """Versioned response cache key, or None when caching is off or the versions cannot be read."""
+    if not current_app.config.get("CACHE"):
+        return None
+    try:
+        return versioned_cache_key(conn, namespace, *parts, scopes=scopes)
+    except Exception:  # pragma: no cover - caching is best effort
+        logger.warning("Failed to read data versions for %s cache key", namespace, exc_info=True)
+        return None
+
+
+def _cache_get(key: Optional[str]) -> Optional[Any]:
+    if key is None:
+        return None
+    try:
+        return current_app.config["CACHE"].get(key)
+    except Exception:  # pragma: no cover - caching is best effort
+        logger.warning("Cache read failed for %s", key, exc_info=True)
+        return None
+
+
+def _cache_tokens(key: Optional[str], tags: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    """Tag tokens to take on a miss, before the payload is computed (see TaggedCache.set)."""
+    if key is None:
+        return None
+    try:
+        return current_app.config["CACHE"].tag_tokens(tags)
+    except Exception:  # pragma: no cover - caching is best effort
+        logger.warning("Cache tag read failed for %s", key, exc_info=True)
+        return None
+
+
+def _cache_set(key: Optional[str], payload: Any, tags: Tuple[str, ...], tokens: Optional[Dict[str, Any]]) -> None:
+    if key is None or tokens is None:
+        return
+    try:
+        current_app.config["CACHE"].set(key, payload, timeout=RESPONSE_CACHE_SECONDS, tags=tags, tokens=tokens)
+    except Exception:  # pragma: no cover - caching is best effort
+        logger.warning("Cache write failed for %s", key, exc_info=True)
+
+
+TRIP_PRESENCE_COLUMNS = "employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen"
+
+
+def _fetch_trip_presence(trip_id: int) -> Optional[Dict[str, Any]]:
+    conn = get_db()
+    try:
+        row = conn.execute(f"SELECT {TRIP_PRESENCE_COLUMNS} FROM trips WHERE id = ?", (trip_id,)).fetchone()
+        return dict(row) if row else None
+    finally:
+        _close_conn(conn)
+
+
+def _risk_thresholds() -> Dict[str, int]:
+    from flask import current_app
+
+    return (current_app.config.get("CONFIG") or {}).get("RISK_THRESHOLDS", DEFAULT_RISK_THRESHOLDS)
+
+
+def _check_alert_status_safely(employee_id: int, days_used: Optional[int] = None) -> None:
+    try:
+        check_alert_status(employee_id, days_used)
+    except Exception:  # pragma: no cover - best effort
+        logger.exception("Failed to evaluate alert status for employee %s", employee_id)
+
+
+def _apply_trip_mutation(before: Optional[Dict[str, Any]], trip_id: Optional[int] = None) -> Set[int]:
+    """
+    Propagate a committed trip write to the compliance snapshot and alerts.
+
+    ``before`` is the trip row prior to the write (None for creates) and
+    ``trip_id`` identifies the row after it (None for deletes). The change is
+    applied to the persisted coverage counts as a delta, and the snapshot and
+    alert state are only recomputed for employees whose window totals moved on
+    the dates they depend on. Returns the ids of the employees the write touched.
+    """
+    after = _fetch_trip_presence(trip_id) if trip_id is not None else None
+    affected_ids = {
+        int(trip["employee_id"]) for trip in (before, after) if trip and trip.get("employee_id")
+    }
+    if not affected_ids:
+        return affected_ids
+    compliance_cache.invalidate(affected_ids)
+
+    conn = get_db()
+    try:
+        deltas = record_trip_change(conn, before, after)
+    except Exception:
+        logger.exception("Incremental presence update failed; recomputing employees %s", affected_ids)
+        try:
+            refresh_snapshots_safely(conn, affected_ids)
+        finally:
+            _close_conn(conn)
+        for employee_id in affected_ids:
+            _check_alert_status_safely(employee_id)
+        return affected_ids
+
+    today = date.today()
+    horizon = today + timedelta(days=WINDOW_DAYS)
+    try:
+        # Snapshot values depend on today's window and the next 180 days (safe entry, transitions)
+        stale_ids = [employee_id for employee_id, delta in deltas.items() if delta.affects(today, horizon)]
+        if stale_ids:
+            refresh_snapshots_safely(conn, stale_ids, keep_presence_counts=True)
+        # Past-only edits skip the snapshot but still move the charted history
+        series_start, series_end = compliance_timeseries.series_range(today)
+        series_ids = [
+            employee_id for employee_id, delta in deltas.items()
+            if employee_id not in stale_ids and delta.affects(series_start, series_end)
+        ]
+        if series_ids:
+            compliance_timeseries.refresh_employees_safely(conn, series_ids, _risk_thresholds())
+    finally:
+        _close_conn(conn)
+
+    for employee_id, delta in deltas.items():
+        if delta.affects(today):
+            _check_alert_status_safely(employee_id, delta.coverage.days_used(today))
+    return affected_ids
+
+
 def _trip_from_row(row: Dict[str, Any]) -> Dict[str, Any]:
     row_data = dict(row)
     employee_name = row_data.pop("employee_name", None)
@@ -198,6 +331,14 @@ def get_trips():
     conn = get_db()
     cursor = conn.cursor()
 
+    # The payload embeds active alerts, so it depends on both counters
+    cache_key = _versioned_key(conn, "calendar:trips", start or "", end or "", scopes=(GLOBAL_SCOPE, ALERTS_SCOPE))
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        _close_conn(conn)
+        return jsonify(cached)
+    cache_tokens = _cache_tokens(cache_key, (CALENDAR_TAG,))
+
     cursor.execute("SELECT id, name FROM employees ORDER BY name COLLATE NOCASE")
     employees = [dict(row) for row in cursor.fetchall()]
 
@@ -250,6 +391,8 @@ def get_trips():
     except Exception:  # pragma: no cover - defensive logging
         logger.exception("Failed to load active alerts for calendar payload")
         response["alerts"] = []
+    else:
+        _cache_set(cache_key, response, (CALENDAR_TAG,), cache_tokens)
 
     return jsonify(response)
 
@@ -326,13 +469,6 @@ def update_trip(trip_id: int):
         return jsonify({"error": "Trip not found"}), 404
 
     current = dict(row)
-    original_employee_id = current.get("employee_id")
-    if original_employee_id is not None:
-        try:
-            original_employee_id = int(original_employee_id)
-        except (TypeError, ValueError):
-            original_employee_id = None
-    updated_employee_id = original_employee_id
 
     entry_date = None
     exit_date = None
@@ -377,7 +513,6 @@ def update_trip(trip_id: int):
             return jsonify({"error": "Employee not found"}), 400
         updates.append("employee_id = ?")
         params.append(employee_id)
-        updated_employee_id = employee_id
 
     if "ghosted" in data:
         updates.append("ghosted = ?")
@@ -420,19 +555,14 @@ def update_trip(trip_id: int):
         if cursor.rowcount == 0:
             conn.rollback()
             return jsonify({"error": "Trip not found"}), 404
+        sync_trip_normalized_columns(conn, [trip_id])
         conn.commit()
     except Exception as exc:  # pragma: no cover - defensive
         conn.rollback()
         logger.exception("Trip update error: %s", exc)
         return jsonify({"error": str(exc)}), 500
 
-    affected_ids = {id_ for id_ in (updated_employee_id, original_employee_id) if id_}
-    for employee_id in affected_ids:
-        try:
-            check_alert_status(employee_id)
-        except Exception:  # pragma: no cover - best effort
-            logger.exception("Failed to evaluate alert status for employee %s", employee_id)
-    _invalidate_dashboard_cache_safely()
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(current, trip_id))
 
     payload = _get_trip_payload(trip_id)
     if payload is None:
@@ -467,11 +597,6 @@ def update_trip_with_payload():
         return jsonify({"error": "Trip not found"}), 404
 
     current = dict(row)
-    original_employee_id = current.get("employee_id")
-    try:
-        original_employee_id = int(original_employee_id)
-    except (TypeError, ValueError):
-        original_employee_id = None
 
     updates, error = _prepare_trip_updates(cursor, data, current=current)
     if error:
@@ -498,6 +623,7 @@ def update_trip_with_payload():
         if cursor.rowcount == 0:
             conn.rollback()
             return jsonify({"error": "Trip not found"}), 404
+        sync_trip_normalized_columns(conn, [trip_id])
         conn.commit()
     except Exception as exc:  # pragma: no cover - defensive logging
         conn.rollback()
@@ -506,23 +632,7 @@ def update_trip_with_payload():
     finally:
         _close_conn(conn)
 
-    updated_employee_id = updates.get("employee_id")
-    try:
-        updated_employee_id = int(updated_employee_id) if updated_employee_id is not None else None
-    except (TypeError, ValueError):
-        updated_employee_id = None
-
-    affected_ids = {
-        employee_id
-        for employee_id in (original_employee_id, updated_employee_id)
-        if isinstance(employee_id, int)
-    }
-    for employee_id in affected_ids:
-        try:
-            check_alert_status(employee_id)
-        except Exception:  # pragma: no cover - best effort
-            logger.exception("Failed to evaluate alert status for employee %s", employee_id)
-    _invalidate_dashboard_cache_safely()
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(current, trip_id))
 
     payload = _get_trip_payload(trip_id)
     if payload is None:
@@ -550,11 +660,6 @@ def update_trip_dates():
         return jsonify({"error": "Trip not found"}), 404
 
     current = dict(row)
-    employee_id = current.get("employee_id")
-    try:
-        employee_id = int(employee_id)
-    except (TypeError, ValueError):
-        employee_id = None
 
     payload = {
         "start_date": data.get("start_date"),
@@ -591,6 +696,7 @@ def update_trip_dates():
         if cursor.rowcount == 0:
             conn.rollback()
             return jsonify({"error": "Trip not found"}), 404
+        sync_trip_normalized_columns(conn, [trip_id])
         conn.commit()
     except Exception as exc:  # pragma: no cover - defensive
         conn.rollback()
@@ -599,11 +705,7 @@ def update_trip_dates():
     finally:
         _close_conn(conn)
 
-    if employee_id:
-        try:
-            check_alert_status(employee_id)
-        except Exception:  # pragma: no cover - best effort
-            logger.exception("Failed to refresh alert status for employee %s", employee_id)
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(current, trip_id))
 
     payload = _get_trip_payload(trip_id)
     if payload is None:
@@ -622,7 +724,7 @@ def create_trip():
 def delete_trip(trip_id: int):
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT employee_id FROM trips WHERE id = ?", (trip_id,))
+    cursor.execute(f"SELECT {TRIP_PRESENCE_COLUMNS} FROM trips WHERE id = ?", (trip_id,))
     row = cursor.fetchone()
     if row is None:
         _close_conn(conn)
@@ -632,12 +734,7 @@ def delete_trip(trip_id: int):
     conn.commit()
     _close_conn(conn)
 
-    employee_id = row["employee_id"] if row and "employee_id" in row.keys() else None
-    if employee_id:
-        try:
-            check_alert_status(int(employee_id))
-        except Exception:  # pragma: no cover - defensive logging
-            logger.exception("Failed to evaluate alert status after deleting trip %s", trip_id)
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(dict(row)))
 
     return jsonify({"success": True})
 
@@ -658,28 +755,17 @@ def delete_trip_with_payload():
 
     conn = get_db()
     cursor = conn.cursor()
-    cursor.execute("SELECT employee_id FROM trips WHERE id = ?", (trip_id,))
+    cursor.execute(f"SELECT {TRIP_PRESENCE_COLUMNS} FROM trips WHERE id = ?", (trip_id,))
     row = cursor.fetchone()
     if row is None:
         _close_conn(conn)
         return jsonify({"error": "Trip not found"}), 404
 
-    employee_id = row["employee_id"] if row and "employee_id" in row.keys() else None
-    try:
-        employee_id = int(employee_id)
-    except (TypeError, ValueError):
-        employee_id = None
-
     cursor.execute("DELETE FROM trips WHERE id = ?", (trip_id,))
     conn.commit()
     _close_conn(conn)
 
-    if employee_id:
-        try:
-            check_alert_status(employee_id)
-        except Exception:  # pragma: no cover - defensive logging
-            logger.exception("Failed to evaluate alert status after deleting trip %s", trip_id)
-    _invalidate_dashboard_cache_safely()
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(dict(row)))
 
     return jsonify({"success": True}), 200
 
@@ -734,6 +820,14 @@ def forecast_employee(employee_id: int):
     cursor = conn.cursor()
 
     try:
+        # Only this employee's counter matters: other employees' writes keep the entry warm
+        cache_key = _versioned_key(conn, "calendar:forecast", employee_id, scopes=(employee_scope(employee_id),))
+        cached = _cache_get(cache_key)
+        if cached is not None:
+            _close_conn(conn)
+            return jsonify(cached)
+        cache_tokens = _cache_tokens(cache_key, employee_tags(employee_id))
+
         cursor.execute("SELECT id, name FROM employees WHERE id = ?", (employee_id,))
         employee_row = cursor.fetchone()
         if not employee_row:
@@ -751,9 +845,8 @@ def forecast_employee(employee_id: int):
         )
         trips = [dict(row) for row in cursor.fetchall()]
 
-        presence = presence_days(trips)
         today = date.today()
-        used_days = days_used_in_window(presence, today)
+        used_days = compliance_cache.employee_compliance(employee_id, today, lambda: trips)["days_used"]
 
         upcoming_days = 0
         upcoming_trips: List[Dict[str, Any]] = []
@@ -808,7 +901,20 @@ def forecast_employee(employee_id: int):
             "generated_at": datetime.utcnow().isoformat() + "Z",
         }
 
+        # Day-by-day usage for the calendar colouring comes straight from the persisted projection
+        projection = load_projection(conn, employee_id, today)
+        if projection is not None:
+            horizon = today + timedelta(days=FORECAST_DAYS - 1)
+            peak_days_used, peak_date = projection.peak(today, horizon)
+            payload["projection"] = {
+                "start": today.isoformat(),
+                "days_used": projection.days_used_between(today, horizon).tolist(),
+                "peak_days_used": peak_days_used,
+                "peak_date": peak_date.isoformat(),
+            }
+
         _close_conn(conn)
+        _cache_set(cache_key, payload, employee_tags(employee_id), cache_tokens)
         return jsonify(payload)
 
     except Exception as exc:  # pragma: no cover - defensive logging
@@ -849,20 +955,27 @@ def _create_trip(payload: Dict[str, Any]):
         return jsonify({"error": "start_date must be on or before end_date"}), 400
 
     ghosted = 1 if bool(payload.get("ghosted")) else 0
+    country = str(payload["country"]).strip()
+    normalized = normalized_trip_columns(entry_date, exit_date, country)
 
     cursor.execute(
         """
-        INSERT INTO trips (employee_id, country, entry_date, exit_date, job_ref, ghosted, purpose)
-        VALUES (?, ?, ?, ?, ?, ?, ?)
+        INSERT INTO trips (employee_id, country, entry_date, exit_date, job_ref, ghosted, purpose,
+                           entry_ord, exit_ord, country_code, is_schengen)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """,
         (
             employee_id,
-            str(payload["country"]).strip(),
+            country,
             entry_date,
             exit_date,
             str(payload.get("job_ref", "")).strip() or None,
             ghosted,
             str(payload.get("purpose", "")).strip() or None,
+            normalized["entry_ord"],
+            normalized["exit_ord"],
+            normalized["country_code"],
+            normalized["is_schengen"],
         ),
     )
     conn.commit()
@@ -873,11 +986,7 @@ def _create_trip(payload: Dict[str, Any]):
     if created is None:
         return jsonify({"error": "Failed to load persisted trip"}), 500
 
-    try:
-        check_alert_status(employee_id)
-    except Exception:  # pragma: no cover - defensive logging
-        logger.exception("Failed to evaluate alert status after creating trip for employee %s", employee_id)
-    _invalidate_dashboard_cache_safely()
+    _invalidate_dashboard_cache_safely(_apply_trip_mutation(None, new_id))
 
     return jsonify(created), 201
 
@@ -885,6 +994,14 @@ def _create_trip(payload: Dict[str, Any]):
 @bp.route("/alerts", methods=["GET"])
 def list_alerts():
     risk_filter = (request.args.get("risk") or "").strip().lower()
+    conn = get_db()
+    cache_key = _versioned_key(conn, "alerts", risk_filter, scopes=(GLOBAL_SCOPE, ALERTS_SCOPE))
+    _close_conn(conn)
+    cached = _cache_get(cache_key)
+    if cached is not None:
+        return jsonify({"alerts": cached})
+    cache_tokens = _cache_tokens(cache_key, (ALERTS_TAG,))
+
     alerts = get_active_alerts()
 
     if risk_filter in {"critical", "red"}:
@@ -900,11 +1017,13 @@ def list_alerts():
     else:
         filtered = alerts
 
+    _cache_set(cache_key, filtered, (ALERTS_TAG,), cache_tokens)
     return jsonify({"alerts": filtered})
 
 
 @bp.route("/alerts/<int>alert_id>/resolve", methods=["POST"])
 def resolve_alert_endpoint(alert_id: int):
     if resolve_alert(alert_id):
+        invalidate_tags(ALERTS_TAG)
         return jsonify({"success": True})
     return jsonify({"error": "Alert not found"}), 404
@@ -7,9 +7,10 @@ the existing calendar API and main routes.
 from flask import Blueprint, request, jsonify, current_app
 
 from app.services import employees_service
-from app.services.employees_service import EmployeeValidationError
+from app.services.employees_service import EmployeeNotFoundError, EmployeeValidationError
 
 from .util_auth import login_required
+from .utils.cache_invalidation import invalidate_employee_cache
 
 employees_bp = Blueprint("employees", __name__)
 
@@ -35,4 +36,23 @@ def create_employee():
         employee = employees_service.create_employee(current_app.config, data)
     except EmployeeValidationError as exc:
         return _success({"error": str(exc)}, status_code=400)
+    invalidate_employee_cache(employee["id"])
     return _success(employee, status_code=201)
+
+
+@employees_bp.route("/employees/<int:employee_id>/usage_timeline", methods=["GET"])
+@login_required
+def usage_timeline(employee_id):
+    """Daily days-used / days-remaining for ?start=YYYY-MM-DD&end=YYYY-MM-DD."""
+    try:
+        timeline = employees_service.get_usage_timeline(
+            current_app.config,
+            employee_id,
+            request.args.get("start"),
+            request.args.get("end"),
+        )
+    except EmployeeValidationError as exc:
+        return _success({"error": str(exc)}, status_code=400)
+    except EmployeeNotFoundError as exc:
+        return _success({"error": str(exc)}, status_code=404)
+    return _success(timeline)
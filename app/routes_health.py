@@ -5,7 +5,10 @@ Phase 4: Network & Infrastructure Security
 
 from flask import Blueprint, jsonify, current_app
 
+from app.services.compliance_cache import compliance_cache
+from app.services.compliance_daemon import DaemonError, configured_client
 from app.services.health_status import build_health_payload, get_version_payload
+from .util_auth import login_required
 
 health_bp = Blueprint('health', __name__)
 
@@ -44,3 +47,16 @@ def api_version():
     """API version endpoint."""
     return _success(get_version_payload(current_app.config))
 
+
+@health_bp.route('/health/cache')
+@login_required
+def health_cache():
+    """Compliance memo counters (hits, misses, evictions) for this worker and the shared daemon."""
+    payload = {'compliance_cache': compliance_cache.stats()}
+    client = configured_client()
+    if client is not None:
+        try:
+            payload['compliance_daemon'] = client.stats()
+        except (OSError, DaemonError) as exc:
+            payload['compliance_daemon'] = {'error': str(exc)}
+    return _success(payload)
@@ -2,7 +2,7 @@
 Alert management service for Schengen compliance monitoring (Phase 3.6.4).
 
 Responsibilities:
-- Calculate rolling 90/180-day usage per employee.
+- Calculate rolling 90/180-day usage per employee, plus any configured stay rules.
 - Persist alert metadata to the SQLite `alerts` table.
 - Provide helper APIs for querying and resolving alerts.
 - Optional daily scheduler + email notifications.
@@ -14,14 +14,19 @@ import logging
 import os
 import smtplib
 from contextlib import contextmanager
-from datetime import date
+from datetime import date, timedelta
 from email.message import EmailMessage
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
 from flask import current_app, has_app_context
 
 from app.models import get_db
-from app.services.rolling90 import presence_days, days_used_in_window
+from app.repositories import compliance_repository
+from app.services import compliance_snapshot, stay_rules
+from app.services.compliance_batch import calculate_batch_compliance
+from app.services.compliance_projection import load_projections
+from app.services.presence_bitmap import load_bitmap
+from app.services.rolling90 import COMPLIANCE_START_DATE, days_used_in_window, presence_days
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +39,9 @@ ALERT_THRESHOLDS = {
 
 ALERT_PRIORITY = {"RED": 3, "ORANGE": 2, "YELLOW": 1}
 
+# Alerts report the highest projected usage over this many days, scheduled trips included.
+PROJECTION_PEAK_DAYS = 180
+
 
 @contextmanager
 def _db_conn(existing=None):
@@ -91,15 +99,21 @@ def _calculate_employee_usage(conn, employee_id: int) -> Optional[Dict[str, Any]
         return None
 
     employee_name = row["name"]
-    cursor.execute(
-        "SELECT entry_date, exit_date, country FROM trips WHERE employee_id = ?",
-        (employee_id,),
-    )
-    trips = [dict(r) for r in cursor.fetchall()]
+    bitmap = load_bitmap(conn, employee_id)
+    if bitmap is not None:
+        days_used = bitmap.days_used(date.today())
+    else:
+        # No bitmap to read (the employee changed between reads): count from trips, never assume zero
+        cursor.execute(
+            "SELECT entry_date, exit_date, country, entry_ord, exit_ord, is_schengen FROM trips WHERE employee_id = ?",
+            (employee_id,),
+        )
+        trips = [dict(r) for r in cursor.fetchall()]
+        days_used = days_used_in_window(presence_days(trips), date.today())
+    return _build_usage(employee_name, days_used)
+
 
-    today = date.today()
-    presence = presence_days(trips)
-    days_used = days_used_in_window(presence, today)
+def _build_usage(employee_name: str, days_used: int) -> Dict[str, Any]:
     summary, days_remaining = _format_usage_summary(days_used)
 
     risk = _determine_risk(days_used)
@@ -112,91 +126,117 @@ def _calculate_employee_usage(conn, employee_id: int) -> Optional[Dict[str, Any]
     }
 
 
-def check_alert_status(employee_id: int) -> Optional[str]:
+def check_alert_status(employee_id: int, days_used: Optional[int] = None) -> Optional[str]:
     """
     Recalculate alert state for the given employee.
 
+    ``days_used`` may be supplied when the caller already knows today's usage
+    (e.g. from presence_delta) to skip reloading the employee's trips.
+
     Returns the active risk level ("RED"/"ORANGE"/"YELLOW") or None when compliant.
     """
     with _db_conn() as conn:
-        usage = _calculate_employee_usage(conn, employee_id)
+        if days_used is None:
+            usage = _calculate_employee_usage(conn, employee_id)
+        else:
+            row = conn.execute("SELECT name FROM employees WHERE id = ?", (employee_id,)).fetchone()
+            usage = _build_usage(row["name"], days_used) if row else None
         if usage is None:
             logger.debug("No employee found for alert check (id=%s)", employee_id)
             return None
 
-        risk = usage["risk_level"]
-        cursor = conn.cursor()
+        return _apply_alert_state(conn, employee_id, usage)
 
-        cursor.execute(
-            "SELECT id, risk_level FROM alerts WHERE employee_id = ? AND resolved = 0",
-            (employee_id,),
-        )
-        existing = cursor.fetchone()
-
-        if risk is None:
-            if existing:
-                cursor.execute(
-                    "UPDATE alerts SET resolved = 1 WHERE id = ?",
-                    (existing["id"],),
-                )
-                logger.info(
-                    "Alert resolved for employee %s (%s)",
-                    employee_id,
-                    usage["employee_name"],
-                )
-            return None
 
-        message = usage["message"]
+def _apply_alert_state(conn, employee_id: int, usage: Dict[str, Any]) -> Optional[str]:
+    """Create, update or resolve the open alert row to match ``usage``."""
+    risk = usage["risk_level"]
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT id, risk_level FROM alerts WHERE employee_id = ? AND resolved = 0",
+        (employee_id,),
+    )
+    existing = cursor.fetchone()
+
+    if risk is None:
         if existing:
-            if existing["risk_level"] != risk:
-                cursor.execute(
-                    """
-                    UPDATE alerts
-                    SET risk_level = ?, message = ?, created_at = CURRENT_TIMESTAMP,
-                        resolved = 0, email_sent = 0
-                    WHERE id = ?
-                    """,
-                    (risk, message, existing["id"]),
-                )
-                logger.info(
-                    "Alert level updated for employee %s → %s",
-                    employee_id,
-                    risk,
-                )
-            else:
-                cursor.execute(
-                    "UPDATE alerts SET message = ? WHERE id = ?",
-                    (message, existing["id"]),
-                )
-        else:
+            cursor.execute(
+                "UPDATE alerts SET resolved = 1 WHERE id = ?",
+                (existing["id"],),
+            )
+            logger.info(
+                "Alert resolved for employee %s (%s)",
+                employee_id,
+                usage["employee_name"],
+            )
+        return None
+
+    message = usage["message"]
+    if existing:
+        if existing["risk_level"] != risk:
             cursor.execute(
                 """
-                INSERT INTO alerts (employee_id, risk_level, message, resolved, email_sent)
-                VALUES (?, ?, ?, 0, 0)
+                UPDATE alerts
+                SET risk_level = ?, message = ?, created_at = CURRENT_TIMESTAMP,
+                    resolved = 0, email_sent = 0
+                WHERE id = ?
                 """,
-                (employee_id, risk, message),
+                (risk, message, existing["id"]),
             )
             logger.info(
-                "Alert created for employee %s → %s",
+                "Alert level updated for employee %s → %s",
                 employee_id,
                 risk,
             )
+        else:
+            cursor.execute(
+                "UPDATE alerts SET message = ? WHERE id = ?",
+                (message, existing["id"]),
+            )
+    else:
+        cursor.execute(
+            """
+            INSERT INTO alerts (employee_id, risk_level, message, resolved, email_sent)
+            VALUES (?, ?, ?, 0, 0)
+            """,
+            (employee_id, risk, message),
+        )
+        logger.info(
+            "Alert created for employee %s → %s",
+            employee_id,
+            risk,
+        )
 
-        return risk
+    return risk
 
 
 def refresh_all_alerts() -> None:
     """Recalculate alert status for every employee."""
     with _db_conn() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT id FROM employees")
-        employee_ids = [row["id"] for row in cursor.fetchall()]
+        cursor.execute("SELECT id, name FROM employees")
+        employees = [dict(row) for row in cursor.fetchall()]
+        cursor.execute(
+            "SELECT employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen FROM trips"
+        )
+        trips_by_employee: Dict[int, List[Dict[str, Any]]] = {emp["id"]: [] for emp in employees}
+        for row in cursor.fetchall():
+            if row["employee_id"] in trips_by_employee:
+                trips_by_employee[row["employee_id"]].append(dict(row))
 
-    for employee_id in employee_ids:
-        try:
-            check_alert_status(employee_id)
-        except Exception:
-            logger.exception("Failed to refresh alert for employee %s", employee_id)
+    # Usage for the whole workforce in one batch pass; alert rows are still
+    # persisted per employee so one failure does not block the rest.
+    compliance = calculate_batch_compliance(trips_by_employee, date.today())
+
+    with _db_conn() as conn:
+        for emp in employees:
+            employee_id = emp["id"]
+            try:
+                usage = _build_usage(emp["name"], compliance[employee_id]["days_used"])
+                _apply_alert_state(conn, employee_id, usage)
+            except Exception:
+                logger.exception("Failed to refresh alert for employee %s", employee_id)
 
 
 def get_active_alerts(risk_filter: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -234,8 +274,32 @@ def get_active_alerts(risk_filter: Optional[str] = None) -> List[Dict[str, Any]]
 
     alerts: List[Dict[str, Any]] = []
     with _db_conn() as conn:
+        snapshots = compliance_snapshot.load_snapshots(conn) if rows else {}
+        today = date.today()
+        projections = load_projections(conn, [row["employee_id"] for row in rows], today) if rows else {}
+        rules = stay_rules.configured_rules()
+        rule_results: Dict[int, Dict[str, Dict[str, Any]]] = {}
+        if rows and len(rules) > 1:
+            rule_results = stay_rules.evaluate_workforce(
+                compliance_repository.fetch_trips_by_employee(
+                    conn, [row["employee_id"] for row in rows], schengen_only=False
+                ),
+                rules,
+                today,
+                compliance_start_date=COMPLIANCE_START_DATE,
+                risk_thresholds=compliance_snapshot.configured_risk_thresholds(),
+            )
         for row in rows:
-            usage = _calculate_employee_usage(conn, row["employee_id"])
+            snapshot = snapshots.get(row["employee_id"])
+            if snapshot is not None and row["employee_name"] is not None:
+                usage = _build_usage(row["employee_name"], snapshot["days_used"])
+            else:
+                usage = _calculate_employee_usage(conn, row["employee_id"])
+            peak_days_used = peak_date = None
+            projection = projections.get(row["employee_id"])
+            if projection is not None:
+                peak_days_used, peak_day = projection.peak(today, today + timedelta(days=PROJECTION_PEAK_DAYS - 1))
+                peak_date = peak_day.isoformat()
             alerts.append(
                 {
                     "id": row["id"],
@@ -247,6 +311,9 @@ def get_active_alerts(risk_filter: Optional[str] = None) -> List[Dict[str, Any]]
                     "email_sent": row["email_sent"],
                     "days_used": usage["days_used"] if usage else None,
                     "days_remaining": usage["days_remaining"] if usage else None,
+                    "stay_rules": stay_rules.extra_rule_results(rule_results.get(row["employee_id"], {})),
+                    "projected_peak_days_used": peak_days_used,
+                    "projected_peak_date": peak_date,
                 }
             )
     return alerts
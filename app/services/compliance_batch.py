@@ -0,0 +1,166 @@
+"""
+Batch 90/180-day compliance for a whole workforce.
+
+Computes days used, days remaining, risk level and earliest safe entry for every
+employee in one pass. When NumPy is available the presence of all employees is
+laid out as an employees x days occupancy matrix whose cumulative sum answers
+every window count with array slicing; otherwise each employee falls back to the
+interval-based PresenceCalendar from rolling90. Both paths return identical results.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import date, timedelta
+from typing import Any, Dict, Hashable, List, Mapping, Optional
+
+from .rolling90 import (
+    COMPLIANCE_START_DATE,
+    WINDOW_DAYS,
+    get_risk_level,
+    presence_days,
+)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RISK_THRESHOLDS = {'green': 30, 'amber': 10}
+
+
+def numpy_available() -> bool:
+    """Return True when the vectorised engine can be used."""
+    return np is not None
+
+
+def _result(days_used: int, limit: int, thresholds: Dict[str, int], today: date, safe_entry: Optional[date]) -> Dict[str, Any]:
+    days_remaining = limit - days_used
+    days_until = None
+    compliance_date = None
+    if days_remaining < 0:
+        if safe_entry is None:
+            days_until, compliance_date = 0, today
+        else:
+            days_until, compliance_date = (safe_entry - today).days, safe_entry
+    return {
+        'days_used': days_used,
+        'days_remaining': days_remaining,
+        'risk_level': get_risk_level(days_remaining, thresholds),
+        'safe_entry_date': safe_entry,
+        'days_until_compliant': days_until,
+        'compliance_date': compliance_date,
+    }
+
+
+def _batch_python(calendars, today, limit, thresholds, compliance_start_date):
+    results = {}
+    for emp_id, calendar in calendars.items():
+        used = calendar.days_used(today, compliance_start_date)
+        safe_entry = calendar.earliest_safe_entry(today, limit, compliance_start_date)
+        results[emp_id] = _result(used, limit, thresholds, today, safe_entry)
+    return results
+
+
+def _batch_numpy(calendars, today, limit, thresholds, compliance_start_date):
+    emp_ids = list(calendars)
+    today_ord = today.toordinal()
+    # Columns cover every window needed: today's and each of the next 180 days'.
+    axis_start = today_ord - WINDOW_DAYS
+    width = 2 * WINDOW_DAYS
+    floor = 0
+    if compliance_start_date:
+        floor = max(0, compliance_start_date.toordinal() - axis_start)
+
+    rows, starts, ends = [], [], []
+    for row, emp_id in enumerate(emp_ids):
+        for start, end in calendars[emp_id].intervals:
+            lo = max(start - axis_start, floor)
+            hi = min(end - axis_start, width - 1)
+            if lo <= hi:
+                rows.append(row)
+                starts.append(lo)
+                ends.append(hi + 1)
+
+    # Difference array -> occupancy (intervals are merged, so values are 0/1).
+    diff = np.zeros((len(emp_ids), width + 1), dtype=np.int32)
+    if rows:
+        np.add.at(diff, (np.asarray(rows), np.asarray(starts)), 1)
+        np.add.at(diff, (np.asarray(rows), np.asarray(ends)), -1)
+    occupancy = np.cumsum(diff[:, :width], axis=1)
+    prefix = np.zeros((len(emp_ids), width + 1), dtype=np.int32)
+    np.cumsum(occupancy, axis=1, out=prefix[:, 1:])
+
+    # used[:, k] is the window count for today + k, k = 0..180.
+    used = prefix[:, WINDOW_DAYS:width + 1] - prefix[:, 0:WINDOW_DAYS + 1]
+    eligible = used[:, 1:] <= limit - 1
+    first_eligible = np.argmax(eligible, axis=1)
+    any_eligible = eligible.any(axis=1)
+
+    # Window start used by earliest_safe_entry's "nothing relevant" early exit.
+    relevant_from = today_ord - (WINDOW_DAYS - 1)
+    if compliance_start_date:
+        relevant_from = max(relevant_from, compliance_start_date.toordinal())
+
+    results = {}
+    for row, emp_id in enumerate(emp_ids):
+        days_used = int(used[row, 0])
+        safe_entry = None
+        if days_used > limit - 1 and calendars[emp_id].first_on_or_after(relevant_from) is not None:
+            if any_eligible[row]:
+                safe_entry = today + timedelta(days=int(first_eligible[row]) + 1)
+            else:
+                # Continuous presence: defer to the scalar fallback rule.
+                safe_entry = calendars[emp_id].earliest_safe_entry(today, limit, compliance_start_date)
+        results[emp_id] = _result(days_used, limit, thresholds, today, safe_entry)
+    return results
+
+
+def calculate_batch_compliance(
+    trips_by_employee: Mapping[Hashable, List[Dict]],
+    today: Optional[date] = None,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+    use_numpy: Optional[bool] = None,
+) -> Dict[Hashable, Dict[str, Any]]:
+    """
+    Calculate current compliance for every employee in one pass.
+
+    Args:
+        trips_by_employee: Mapping of employee id -> list of trip dicts
+            ('entry_date', 'exit_date', 'country' or 'country_code')
+        today: Reference date (defaults to date.today())
+        limit: Maximum allowed days (default 90)
+        compliance_start_date: Days before this are excluded
+        risk_thresholds: Dict with 'green' and 'amber' keys for get_risk_level
+        use_numpy: Force (True) or disable (False) the vectorised engine;
+            None uses NumPy whenever it is installed
+
+    Returns:
+        Dict of employee id -> {'days_used', 'days_remaining', 'risk_level',
+        'safe_entry_date', 'days_until_compliant', 'compliance_date'}. The values
+        match days_used_in_window, calculate_days_remaining, get_risk_level,
+        earliest_safe_entry and days_until_compliant for the same inputs
+        ('days_until_compliant' and 'compliance_date' are None when not over the limit).
+    """
+    today = today or date.today()
+    thresholds = risk_thresholds or DEFAULT_RISK_THRESHOLDS
+    calendars = {
+        emp_id: presence_days(trips or [], compliance_start_date).calendar
+        for emp_id, trips in trips_by_employee.items()
+    }
+    if not calendars:
+        return {}
+
+    if use_numpy is None:
+        use_numpy = numpy_available()
+    if use_numpy and np is None:
+        logger.warning("NumPy not installed; using pure-Python batch compliance")
+        use_numpy = False
+
+    if use_numpy:
+        return _batch_numpy(calendars, today, limit, thresholds, compliance_start_date)
+    return _batch_python(calendars, today, limit, thresholds, compliance_start_date)
@@ -0,0 +1,222 @@
+"""
+Version-keyed per-employee compliance memo.
+
+Entries are keyed by (employee_id, data_version, local_version, ref_date):
+ref_date None holds the employee's presence calendar, a date holds the window
+figures for that reference date. data_version is the employee's counter in the
+trigger-maintained ``data_versions`` table (one primary-key read), so a trip
+or employee write made by any worker - or by retention, DSAR or a raw SQL
+edit - moves every worker's memo onto a new key. Trip write paths also call
+:func:`invalidate`, which bumps the local version and drops the employee's
+entries at once. Entries expire after ``ttl`` seconds as a backstop for
+figures computed from trips read just before a concurrent write. Memory is
+bounded by ``maxsize`` entries with least-recently-used eviction, and
+hit/miss/eviction counters are exposed through :meth:`ComplianceCache.stats`.
+
+When the optional compliance daemon is configured (see
+:mod:`compliance_daemon`), window figures come from its shared memo and
+invalidations are forwarded to it as well.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from flask import current_app, has_app_context
+
+from app.repositories import data_version_repository
+from app.repositories.data_version_repository import employee_scope
+from . import compliance_daemon
+from .rolling90 import COMPLIANCE_START_DATE, PresenceSet, presence_days
+
+DEFAULT_MAXSIZE = 4096
+DEFAULT_TTL_SECONDS = 60
+LIMIT = 90
+
+CacheKey = Tuple[int, Optional[int], int, Optional[date]]
+VersionSource = Callable[[int], Optional[int]]
+
+
+def app_data_version(employee_id: int) -> Optional[int]:
+    """The employee's data version in the current app's database, or None outside an app context."""
+    if not has_app_context():
+        return None
+    from app.models import get_db
+
+    scope = employee_scope(employee_id)
+    try:
+        return data_version_repository.fetch_versions(get_db(), [scope])[scope]
+    except sqlite3.ProgrammingError:
+        # The request's shared connection was already closed by a route
+        db_path = current_app.config['DATABASE']
+        with closing(sqlite3.connect(db_path, uri=str(db_path).startswith('file:'))) as conn:
+            return data_version_repository.fetch_versions(conn, [scope])[scope]
+
+
+class ComplianceCache:
+    """Thread-safe LRU memo of per-employee compliance values."""
+
+    def __init__(
+        self,
+        maxsize: int = DEFAULT_MAXSIZE,
+        ttl: Optional[float] = DEFAULT_TTL_SECONDS,
+        version_source: Optional[VersionSource] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.version_source = version_source
+        self._entries: 'OrderedDict[CacheKey, Tuple[Any, Optional[float]]]' = OrderedDict()
+        self._keys_by_employee: Dict[int, Set[CacheKey]] = {}
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def version(self, employee_id: int) -> int:
+        return self._versions.get(int(employee_id), 0)
+
+    def get_or_compute(self, employee_id: int, ref_date: Optional[date], compute: Callable[[], Any]) -> Any:
+        """Return the cached value for the employee's current version, computing it on a miss."""
+        employee_id = int(employee_id)
+        # Read before computing: a write that lands meanwhile moves the version past this key
+        data_version = self.version_source(employee_id) if self.version_source else None
+        with self._lock:
+            key = (employee_id, data_version, self.version(employee_id), ref_date)
+            entry = self._entries.get(key)
+            if entry is not None and (entry[1] is None or entry[1] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = compute()
+
+        with self._lock:
+            if key[2] != self.version(employee_id):
+                return value  # invalidated while computing; do not store a stale value
+            expires = time.monotonic() + self.ttl if self.ttl else None
+            keys = self._keys_by_employee.setdefault(employee_id, set())
+            for old_key in [k for k in keys if k[1] != data_version]:
+                # Superseded by a write another worker made; can never be hit again
+                keys.discard(old_key)
+                self._entries.pop(old_key, None)
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            keys.add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                self._forget(old_key)
+                self.evictions += 1
+        return value
+
+    def _forget(self, key: CacheKey) -> None:
+        keys = self._keys_by_employee.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_employee[key[0]]
+
+    def invalidate(self, employee_ids: Optional[Iterable[int]] = None) -> None:
+        """Bump the version of the given employees (every employee when None) and drop their entries."""
+        with self._lock:
+            if employee_ids is None:
+                for employee_id in set(self._versions) | set(self._keys_by_employee):
+                    self._versions[employee_id] = self.version(employee_id) + 1
+                self._entries.clear()
+                self._keys_by_employee.clear()
+                self.invalidations += 1
+                return
+            for employee_id in {int(employee_id) for employee_id in employee_ids}:
+                self._versions[employee_id] = self.version(employee_id) + 1
+                for key in self._keys_by_employee.pop(employee_id, ()):
+                    self._entries.pop(key, None)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self.invalidate()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+compliance_cache = ComplianceCache(version_source=app_data_version)
+
+
+def invalidate(employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Called by trip write paths for the employees whose trips changed (None for bulk writes)."""
+    employee_ids = None if employee_ids is None else list(employee_ids)
+    compliance_cache.invalidate(employee_ids)
+    compliance_daemon.forward_invalidate(employee_ids)
+
+
+def employee_presence(
+    employee_id: int,
+    load_trips: Callable[[], List[Mapping[str, Any]]],
+    cache: Optional[ComplianceCache] = None,
+) -> PresenceSet:
+    """
+    The employee's presence from COMPLIANCE_START_DATE.
+
+    ``load_trips`` is only called on a miss, so a hit skips the trip query too.
+    """
+    return (cache or compliance_cache).get_or_compute(
+        employee_id, None, lambda: presence_days(list(load_trips()), COMPLIANCE_START_DATE)
+    )
+
+
+def employee_compliance(
+    employee_id: int,
+    ref_date: date,
+    load_trips: Callable[[], List[Mapping[str, Any]]],
+    cache: Optional[ComplianceCache] = None,
+) -> Dict[str, Any]:
+    """
+    Threshold-independent 90/180 figures for the employee at ``ref_date``.
+
+    Returns days_used, days_remaining and, when over the limit, safe_entry_date,
+    days_until_compliant and compliance_date (None otherwise). Risk levels are
+    left to callers since thresholds differ between views. Without an explicit
+    ``cache`` the configured daemon is asked first.
+    """
+    if cache is None:
+        remote = compliance_daemon.remote_compliance(employee_id, ref_date)
+        if remote is not None:
+            return remote
+        cache = compliance_cache
+
+    def compute() -> Dict[str, Any]:
+        calendar = employee_presence(employee_id, load_trips, cache).calendar
+        days_used = calendar.days_used(ref_date, COMPLIANCE_START_DATE)
+        days_remaining = LIMIT - days_used
+        safe_entry = calendar.earliest_safe_entry(ref_date, LIMIT, COMPLIANCE_START_DATE)
+        days_until = compliance_date = None
+        if days_remaining < 0:
+            days_until, compliance_date = ((safe_entry - ref_date).days, safe_entry) if safe_entry else (0, ref_date)
+        return {
+            "days_used": days_used,
+            "days_remaining": days_remaining,
+            "safe_entry_date": safe_entry,
+            "days_until_compliant": days_until,
+            "compliance_date": compliance_date,
+        }
+
+    return dict(cache.get_or_compute(employee_id, ref_date, compute))
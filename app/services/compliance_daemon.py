@@ -0,0 +1,278 @@
+"""
+Optional shared compliance daemon on a local Unix socket.
+
+Each gunicorn worker otherwise keeps its own compliance memo, so the same
+employees are recomputed once per worker and every worker warms up again
+after a restart. When ``COMPLIANCE_DAEMON_SOCKET`` is set, one long-lived
+process (``flask compliance-daemon``) holds the memo for the whole host.
+Workers ask it for window figures and forward trip-write invalidations to it.
+The daemon's memo is keyed on each employee's ``data_versions`` counter (see
+compliance_cache), so a write is seen by every worker even when a forwarded
+invalidation times out or is lost.
+
+The protocol is framed binary: a request is ``!BI`` (opcode, payload length)
+followed by the payload, and a response is ``!BI`` (status, payload length)
+followed by the payload. All integers are network-order int32.
+
+* ``OP_PING``: empty payload, empty response.
+* ``OP_COMPLIANCE``: reference date ordinal then employee ids; the response
+  holds one ``(employee_id, days_used, days_remaining, safe_entry_ordinal)``
+  row per id, with ordinal 0 meaning no safe entry date.
+* ``OP_INVALIDATE``: employee ids, or an empty payload for everyone.
+* ``OP_STATS``: JSON of the daemon memo counters.
+
+The daemon is off by default. Workers fall back to their own memo whenever
+it is not configured or cannot be reached.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import socketserver
+import sqlite3
+import struct
+import threading
+from array import array
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional
+
+from flask import current_app, has_app_context
+
+logger = logging.getLogger(__name__)
+
+OP_PING = 0
+OP_COMPLIANCE = 1
+OP_INVALIDATE = 2
+OP_STATS = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+HEADER = struct.Struct('!BI')
+ROW = struct.Struct('!iiii')
+INT = struct.Struct('!i')
+
+DEFAULT_TIMEOUT = 0.5
+MAX_PAYLOAD = 16 * 1024 * 1024
+
+
+class DaemonError(Exception):
+    """The daemon answered with an error or broke the protocol."""
+
+
+def _pack_ints(values: Iterable[int]) -> bytes:
+    packed = array('i', (int(value) for value in values))
+    if packed.itemsize != 4:
+        raise DaemonError("int32 arrays are not available on this platform")
+    if struct.pack('=i', 1) != INT.pack(1):
+        packed.byteswap()  # network order on the wire
+    return packed.tobytes()
+
+
+def _unpack_ints(payload: bytes) -> List[int]:
+    return [value for (value,) in INT.iter_unpack(payload)]
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 65536))
+        if not chunk:
+            raise ConnectionError("compliance daemon closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+def _read_frame(sock: socket.socket):
+    code, length = HEADER.unpack(_recv_exact(sock, HEADER.size))
+    if length > MAX_PAYLOAD:
+        raise DaemonError(f"frame of {length} bytes exceeds the limit")
+    return code, _recv_exact(sock, length) if length else b''
+
+
+def _send_frame(sock: socket.socket, code: int, payload: bytes = b'') -> None:
+    sock.sendall(HEADER.pack(code, len(payload)) + payload)
+
+
+class ComplianceDaemonClient:
+    """Client for the compliance daemon; one short-lived connection per call."""
+
+    def __init__(self, socket_path: str, timeout: float = DEFAULT_TIMEOUT):
+        self.socket_path = socket_path
+        self.timeout = timeout
+
+    def _call(self, op: int, payload: bytes = b'') -> bytes:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            _send_frame(sock, op, payload)
+            status, response = _read_frame(sock)
+        if status != STATUS_OK:
+            raise DaemonError(response.decode('utf-8', 'replace'))
+        return response
+
+    def ping(self) -> None:
+        self._call(OP_PING)
+
+    def compliance(self, employee_ids: Iterable[int], ref_date: date) -> Dict[int, Dict[str, Any]]:
+        """Window figures keyed by employee id, in the shape of compliance_cache.employee_compliance."""
+        response = self._call(OP_COMPLIANCE, _pack_ints([ref_date.toordinal(), *employee_ids]))
+        results = {}
+        for employee_id, days_used, days_remaining, safe_ord in ROW.iter_unpack(response):
+            safe_entry = date.fromordinal(safe_ord) if safe_ord else None
+            days_until = compliance_date = None
+            if days_remaining < 0:
+                days_until, compliance_date = ((safe_entry - ref_date).days, safe_entry) if safe_entry else (0, ref_date)
+            results[employee_id] = {
+                'days_used': days_used,
+                'days_remaining': days_remaining,
+                'safe_entry_date': safe_entry,
+                'days_until_compliant': days_until,
+                'compliance_date': compliance_date,
+            }
+        return results
+
+    def invalidate(self, employee_ids: Optional[Iterable[int]] = None) -> None:
+        self._call(OP_INVALIDATE, b'' if employee_ids is None else _pack_ints(employee_ids))
+
+    def stats(self) -> Dict[str, int]:
+        return json.loads(self._call(OP_STATS).decode('utf-8'))
+
+
+def configured_client() -> Optional[ComplianceDaemonClient]:
+    """Client for the configured daemon, or None when COMPLIANCE_DAEMON_SOCKET is unset."""
+    if not has_app_context():
+        return None
+    config = current_app.config.get('CONFIG') or {}
+    socket_path = config.get('COMPLIANCE_DAEMON_SOCKET')
+    if not socket_path:
+        return None
+    return ComplianceDaemonClient(socket_path, float(config.get('COMPLIANCE_DAEMON_TIMEOUT') or DEFAULT_TIMEOUT))
+
+
+def remote_compliance(employee_id: int, ref_date: date) -> Optional[Dict[str, Any]]:
+    """The daemon's figures for one employee, or None to compute locally."""
+    client = configured_client()
+    if client is None:
+        return None
+    try:
+        return client.compliance([employee_id], ref_date).get(int(employee_id))
+    except (OSError, DaemonError) as exc:
+        logger.warning("Compliance daemon unavailable, computing in-process: %s", exc)
+        return None
+
+
+def forward_invalidate(employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Pass a trip-write invalidation on to the daemon when one is configured."""
+    client = configured_client()
+    if client is None:
+        return
+    try:
+        client.invalidate(employee_ids)
+    except (OSError, DaemonError) as exc:
+        logger.warning("Failed to forward invalidation to compliance daemon: %s", exc)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        while True:
+            try:
+                op, payload = _read_frame(self.request)
+            except (ConnectionError, DaemonError):
+                return
+            try:
+                response = self.server.dispatch(op, payload)
+            except Exception as exc:
+                logger.exception("Compliance daemon request failed")
+                _send_frame(self.request, STATUS_ERROR, str(exc).encode('utf-8'))
+            else:
+                _send_frame(self.request, STATUS_OK, response)
+
+
+class ComplianceDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Serves compliance figures from one shared memo, loading trips from ``db_path`` on a miss."""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, db_path: str, maxsize: Optional[int] = None):
+        from app.repositories import data_version_repository
+        from .compliance_cache import DEFAULT_MAXSIZE, ComplianceCache
+
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # left behind by a previous run
+        self.db_path = db_path
+        # Keyed on the database's data versions, so a write is seen even when its invalidation is lost
+        self.cache = ComplianceCache(maxsize or DEFAULT_MAXSIZE, version_source=self._data_version)
+        self._local = threading.local()
+        data_version_repository.ensure_schema(self._conn())
+        self._conn().commit()
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.db_path)
+        return conn
+
+    def _data_version(self, employee_id: int) -> int:
+        from app.repositories import data_version_repository
+
+        scope = data_version_repository.employee_scope(employee_id)
+        return data_version_repository.fetch_versions(self._conn(), [scope])[scope]
+
+    def _load_trips(self, employee_id: int) -> List[Dict[str, Any]]:
+        from app.repositories import compliance_repository
+
+        return compliance_repository.fetch_trips_by_employee(self._conn(), [employee_id]).get(employee_id, [])
+
+    def dispatch(self, op: int, payload: bytes) -> bytes:
+        from .compliance_cache import employee_compliance
+
+        if op == OP_PING:
+            return b''
+        if op == OP_COMPLIANCE:
+            values = _unpack_ints(payload)
+            if not values:
+                raise DaemonError("missing reference date")
+            ref_date = date.fromordinal(values[0])
+            rows = []
+            for employee_id in dict.fromkeys(values[1:]):
+                figures = employee_compliance(
+                    employee_id, ref_date, lambda: self._load_trips(employee_id), cache=self.cache
+                )
+                safe_entry = figures['safe_entry_date']
+                rows.append(ROW.pack(
+                    employee_id,
+                    figures['days_used'],
+                    figures['days_remaining'],
+                    safe_entry.toordinal() if safe_entry else 0,
+                ))
+            return b''.join(rows)
+        if op == OP_INVALIDATE:
+            self.cache.invalidate(_unpack_ints(payload) if payload else None)
+            return b''
+        if op == OP_STATS:
+            return json.dumps(self.cache.stats()).encode('utf-8')
+        raise DaemonError(f"unknown opcode {op}")
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def serve(socket_path: str, db_path: str, maxsize: Optional[int] = None) -> None:
+    """Run the daemon in the foreground until interrupted."""
+    server = ComplianceDaemon(socket_path, db_path, maxsize)
+    logger.info("Compliance daemon listening on %s", socket_path)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
@@ -8,7 +8,11 @@ scheduled future trips.
 Compliance tracking started on October 12, 2025. Trips before this date are excluded from all calculations.
 """
 
+from bisect import bisect_right
+from collections import deque
 from datetime import date, timedelta
+from heapq import heappop, heappush
+from itertools import accumulate
 from typing import List, Dict, Optional, Tuple
 from .rolling90 import (
     presence_days, 
@@ -181,45 +185,364 @@ def calculate_future_job_compliance(
     }
 
 
+def _as_date(value) -> date:
+    return date.fromisoformat(value if isinstance(value, str) else str(value))
+
+
+def _entry_ord(trip: Dict) -> int:
+    """Entry ordinal, taken from the trips.entry_ord column when the row carries it."""
+    ordinal = trip.get('entry_ord')
+    return ordinal if ordinal is not None else _as_date(trip['entry_date']).toordinal()
+
+
+def _exit_ord(trip: Dict) -> int:
+    ordinal = trip.get('exit_ord')
+    return ordinal if ordinal is not None else _as_date(trip['exit_date']).toordinal()
+
+
+def _trip_is_schengen(trip: Dict) -> bool:
+    flag = trip.get('is_schengen')
+    if flag is not None:
+        return bool(flag)
+    return is_schengen_country(trip.get('country', '') or trip.get('country_code', ''))
+
+
+class _RunningPresence:
+    """
+    Merged Schengen presence intervals that grow as trips are added in entry order.
+
+    Because trips arrive sorted by entry date, each new interval either extends
+    the last run or starts a new one, so adding is O(1) and counting a window is
+    a bisect over the run starts.
+    """
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.before: List[int] = []
+
+    def add(self, start: int, end: int) -> None:
+        if self.ends and start <= self.ends[-1] + 1:
+            if end > self.ends[-1]:
+                self.ends[-1] = end
+            return
+        previous = self.before[-1] + self.ends[-1] - self.starts[-1] + 1 if self.ends else 0
+        self.starts.append(start)
+        self.ends.append(end)
+        self.before.append(previous)
+
+    def _count_through(self, ordinal: int) -> int:
+        index = bisect_right(self.starts, ordinal) - 1
+        if index < 0:
+            return 0
+        return self.before[index] + min(ordinal, self.ends[index]) - self.starts[index] + 1
+
+    def days_used(self, ref_ord: int, floor_ord: Optional[int]) -> int:
+        """Same window as rolling90.days_used_in_window, on ordinals."""
+        window_start = ref_ord - 180
+        if floor_ord is not None:
+            window_start = max(window_start, floor_ord)
+        if ref_ord - 1 < window_start:
+            return 0
+        return self._count_through(ref_ord - 1) - self._count_through(window_start - 1)
+
+
+def _first_compliant_date(days_used_at, job_start_ord: int, job_duration: int, limit: int) -> date:
+    """
+    Same answer as calculate_compliant_from_date's day-by-day scan.
+
+    Usage drops by at most one day per day, so the scan jumps straight past
+    dates that cannot possibly have shed enough days yet.
+    """
+    check_ord = job_start_ord
+    max_check_ord = job_start_ord + 180
+    while check_ord <= max_check_ord:
+        excess = days_used_at(check_ord) + job_duration - limit
+        if excess <= 0:
+            return date.fromordinal(check_ord)
+        check_ord += excess
+    return date.fromordinal(max_check_ord)
+
+
 def get_all_future_jobs_for_employee(
     employee_id: int,
     all_trips: List[Dict],
     warning_threshold: int = 80,
-    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    limit: int = 90,
 ) -> List[Dict]:
     """
     Get compliance forecast for all future jobs for an employee.
     
+    Trips are sorted once and swept forward in entry order, keeping a running
+    set of merged presence intervals and of trips still inside the 180-day
+    window, so every forecast is produced in one pass instead of rebuilding
+    presence per job. Results match calculate_future_job_compliance for each job.
+    
     Args:
         employee_id: ID of the employee
         all_trips: List of all trips for this employee
         warning_threshold: Days threshold for yellow warning
+        compliance_start_date: Optional date when compliance tracking started. Trips before this are excluded.
+        limit: Maximum allowed days (default 90)
     
     Returns:
         List of compliance forecasts for each future job
     """
-    today = date.today()
+    today_ord = date.today().toordinal()
     
     # Separate future and past trips
-    future_trips = [t for t in all_trips if date.fromisoformat(t['entry_date'] if isinstance(t['entry_date'], str) else str(t['entry_date'])) > today]
+    future_trips = [t for t in all_trips if _entry_ord(t) > today_ord]
+    if not future_trips:
+        return []
     
     # Sort future trips by entry date
     future_trips.sort(key=lambda t: t['entry_date'])
     
+    floor_ord = compliance_start_date.toordinal() if compliance_start_date else None
+    ordered = sorted(
+        ((_entry_ord(t), index, t) for index, t in enumerate(all_trips)),
+        key=lambda item: (item[0], item[1]),
+    )
+    
+    presence = _RunningPresence()
+    in_window: Dict[int, Dict] = {}  # original index -> trip, for trips_in_window
+    expiring: List[Tuple[int, int]] = []  # (exit ordinal, original index)
+    cursor = 0
+    
     forecasts = []
     for future_job in future_trips:
-        forecast = calculate_future_job_compliance(
-            employee_id,
-            future_job,
-            all_trips,
-            warning_threshold,
-            compliance_start_date=compliance_start_date
-        )
-        forecasts.append(forecast)
+        job_start_ord = _entry_ord(future_job)
+        job_start = date.fromordinal(job_start_ord)
+        job_end = date.fromordinal(_exit_ord(future_job))
+        job_duration = (job_end - job_start).days + 1
+        is_job_schengen = _trip_is_schengen(future_job)
+        
+        # Admit every trip that starts before this job (the trips_before_job prefix)
+        while cursor < len(ordered) and ordered[cursor][0] < job_start_ord:
+            entry_ord, index, trip = ordered[cursor]
+            cursor += 1
+            exit_ord = _exit_ord(trip)
+            in_window[index] = trip
+            heappush(expiring, (exit_ord, index))
+            counted = floor_ord is None or entry_ord >= floor_ord
+            if counted and entry_ord <= exit_ord and _trip_is_schengen(trip):
+                presence.add(entry_ord, exit_ord)
+        
+        # Window starts only move forward, so expired trips can be dropped for good
+        window_start_ord = job_start_ord - 179
+        while expiring and expiring[0][0] < window_start_ord:
+            in_window.pop(heappop(expiring)[1], None)
+        
+        days_used_before = presence.days_used(job_start_ord, floor_ord)
+        days_after = days_used_before + (job_duration if is_job_schengen else 0)
+        is_compliant = days_after <= limit
+        
+        compliant_from = None
+        if not is_compliant and is_job_schengen:
+            compliant_from = _first_compliant_date(
+                lambda ordinal: presence.days_used(ordinal, floor_ord),
+                job_start_ord,
+                job_duration,
+                limit,
+            )
+        
+        forecasts.append({
+            'employee_id': employee_id,
+            'job': future_job,
+            'job_start_date': job_start,
+            'job_end_date': job_end,
+            'job_duration': job_duration,
+            'days_used_before_job': days_used_before,
+            'days_after_job': days_after,
+            'days_used_after_job': days_after,
+            'days_remaining_after_job': limit - days_after,
+            'risk_level': get_risk_level_for_forecast(days_after, warning_threshold),
+            'is_compliant': is_compliant,
+            'is_schengen': is_job_schengen,
+            'compliant_from_date': compliant_from,
+            'trips_in_window': [in_window[index] for index in sorted(in_window)],
+        })
     
     return forecasts
 
 
+def _sliding_max(values: List[int], width: int) -> List[int]:
+    """Maximum of every run of ``width`` consecutive values (monotonic deque)."""
+    window: deque = deque()
+    maxima: List[int] = []
+    for index, value in enumerate(values):
+        while window and values[window[-1]] <= value:
+            window.pop()
+        window.append(index)
+        if window[0] <= index - width:
+            window.popleft()
+        if index >= width - 1:
+            maxima.append(values[window[0]])
+    return maxima
+
+
+def find_job_slots(
+    all_trips: List[Dict],
+    duration: int,
+    horizon_start: date,
+    horizon_end: date,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    max_results: Optional[int] = None,
+) -> List[date]:
+    """
+    Return every start date in [horizon_start, horizon_end] where a Schengen job
+    of ``duration`` days fits the 90/180 rule alongside all existing trips.
+    
+    A slot fits when, on every day the job touches (the job itself and the 179
+    days after it), existing presence plus the job covers at most ``limit`` days
+    of the inclusive window [d - 179, d]. Those checks collapse to three
+    conditions per start date:
+    
+    - at the last job day: days before the job in its window + duration <= limit
+    - while the window still reaches back before the job: the existing window
+      count minus existing days inside the job <= limit - duration
+    - once the window starts inside the job: existing days after the job plus
+      the job days still in the window <= limit
+    
+    The last two are range maxima of fixed width, so one monotonic-deque sweep
+    per employee answers the whole horizon in O(horizon + trips).
+    
+    Args:
+        all_trips: List of all trips for the employee (past and scheduled)
+        duration: Job length in days
+        horizon_start: First candidate start date
+        horizon_end: Last candidate start date (inclusive)
+        limit: Maximum allowed days (default 90)
+        compliance_start_date: Optional date when compliance tracking started. Trips before this are excluded.
+        max_results: Stop after this many slots (None returns every slot)
+    
+    Returns:
+        Sorted list of feasible start dates
+    """
+    if duration < 1 or duration > limit or duration >= 180 or horizon_end < horizon_start:
+        return []
+    
+    calendar = presence_days(all_trips, compliance_start_date).calendar
+    starts = (horizon_end - horizon_start).days + 1
+    axis_start = horizon_start.toordinal() - 180
+    # Axis reaches the last day any candidate job can influence.
+    size = 180 + starts + duration + 179
+    floor = 0
+    if compliance_start_date:
+        floor = max(0, compliance_start_date.toordinal() - axis_start)
+    
+    occupied = bytearray(size)
+    for start, end in calendar.intervals:
+        lo = max(start - axis_start, floor)
+        hi = min(end - axis_start, size - 1)
+        if lo <= hi:
+            occupied[lo:hi + 1] = b'\x01' * (hi - lo + 1)
+    # through[i] = existing presence days on axis indices 0..i-1
+    through = [0]
+    through.extend(accumulate(occupied))
+    
+    def count_to(index: int) -> int:
+        """Existing presence days up to and including axis index ``index``."""
+        return through[index + 1] if index >= 0 else 0
+    
+    first = 180  # axis index of horizon_start
+    # window_used[i]: existing days in [i - 179, i]; lagged[i]: existing days after minus the day number
+    window_used = [count_to(i) - count_to(i - 180) for i in range(size)]
+    lagged = [count_to(i) - i for i in range(size)]
+    
+    tail_width = 179 - duration
+    tail_max = _sliding_max(window_used[first + duration:], tail_width) if tail_width > 0 else []
+    after_max = _sliding_max(lagged[first + 179:], duration)
+    
+    slots: List[date] = []
+    for offset in range(starts):
+        s_idx = first + offset
+        t_idx = s_idx + duration - 1
+        before_job = count_to(s_idx - 1)
+        if before_job - count_to(t_idx - 180) + duration > limit:
+            continue
+        if tail_width > 0:
+            in_job = count_to(t_idx) - before_job
+            if tail_max[offset] > limit - duration + in_job:
+                continue
+        if after_max[offset] > limit - 180 + count_to(t_idx) - t_idx:
+            continue
+        slots.append(horizon_start + timedelta(days=offset))
+        if max_results is not None and len(slots) >= max_results:
+            break
+    
+    return slots
+
+
+def rank_employees_for_job(
+    trips_by_employee: Dict[int, List[Dict]],
+    job_start: date,
+    job_end: date,
+    job_country: str,
+    warning_threshold: int = 80,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE
+) -> List[Dict]:
+    """
+    Forecast one prospective job for many employees and rank them by capacity.
+    
+    Each employee's figures match calculate_future_job_compliance for the same
+    job (trips entering before the job start count; the job counts only if the
+    country is Schengen). Results are sorted by days remaining after the job,
+    most capacity first.
+    
+    Args:
+        trips_by_employee: Mapping of employee id -> list of trip dicts
+        job_start: First day of the job
+        job_end: Last day of the job
+        job_country: Country code or name of the job
+        warning_threshold: Days threshold for yellow warning (default 80)
+        limit: Maximum allowed days (default 90)
+        compliance_start_date: Optional date when compliance tracking started. Trips before this are excluded.
+    
+    Returns:
+        List of dicts with employee_id, days_used_before_job, days_after_job,
+        days_remaining_after_job, risk_level, is_compliant and compliant_from_date
+    """
+    job_duration = (job_end - job_start).days + 1
+    is_job_schengen = is_schengen_country(job_country)
+    job_start_ord = job_start.toordinal()
+    
+    ranked = []
+    for employee_id, trips in trips_by_employee.items():
+        trips_before_job = [t for t in trips if _as_date(t['entry_date']) < job_start]
+        calendar = presence_days(trips_before_job, compliance_start_date).calendar
+        days_used_before = calendar.days_used(job_start, compliance_start_date)
+        days_after = days_used_before + (job_duration if is_job_schengen else 0)
+        is_compliant = days_after <= limit
+        
+        compliant_from = None
+        if not is_compliant and is_job_schengen:
+            compliant_from = _first_compliant_date(
+                lambda ordinal: calendar.days_used(date.fromordinal(ordinal), compliance_start_date),
+                job_start_ord,
+                job_duration,
+                limit,
+            )
+        
+        ranked.append({
+            'employee_id': employee_id,
+            'job_duration': job_duration,
+            'days_used_before_job': days_used_before,
+            'days_after_job': days_after,
+            'days_remaining_after_job': limit - days_after,
+            'risk_level': get_risk_level_for_forecast(days_after, warning_threshold),
+            'is_compliant': is_compliant,
+            'is_schengen': is_job_schengen,
+            'compliant_from_date': compliant_from,
+        })
+    
+    ranked.sort(key=lambda item: (-item['days_remaining_after_job'], item['employee_id']))
+    return ranked
+
+
 def calculate_what_if_scenario(
     employee_id: int,
     all_trips: List[Dict],
@@ -0,0 +1,154 @@
+"""
+Persisted per-employee forward projection of days used.
+
+``employee_projection`` holds, for each employee, days used in the 180-day
+window for each of the next 365 days, counting scheduled trips. The values are
+stored as a little-endian int16 array (730 bytes per employee) starting at the
+day the row was computed for. Planning views slice the array instead of
+simulating forward at request time.
+
+Rows are rebuilt with the snapshot refresh that follows trip writes and at
+midnight. Triggers on ``trips`` drop an employee's row on any raw trip write,
+and a row computed for an earlier day counts as stale. Both cases are rebuilt
+on the next load.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+
+from app.repositories import compliance_repository, projection_repository
+from .rolling90 import COMPLIANCE_START_DATE, presence_days, usage_timeline
+
+PROJECTION_DAYS = 365
+LIMIT = 90
+
+
+class Projection:
+    """Days used for ``len(days_used)`` consecutive days from ``start_ord``."""
+
+    __slots__ = ('start_ord', 'days_used')
+
+    def __init__(self, start_ord: int, days_used: array):
+        self.start_ord = start_ord
+        self.days_used = days_used
+
+    @classmethod
+    def from_trips(cls, trips: Iterable[Mapping[str, Any]], start: date, days: int = PROJECTION_DAYS) -> 'Projection':
+        timeline = usage_timeline(
+            presence_days(list(trips), COMPLIANCE_START_DATE), start, start + timedelta(days=days - 1), LIMIT
+        )
+        return cls(start.toordinal(), timeline['days_used'])
+
+    @classmethod
+    def from_blob(cls, start_ord: int, blob: bytes) -> 'Projection':
+        values = array('h')
+        values.frombytes(blob)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return cls(start_ord, values)
+
+    def to_blob(self) -> bytes:
+        values = array('h', self.days_used)
+        if sys.byteorder != 'little':
+            values.byteswap()
+        return values.tobytes()
+
+    @property
+    def start(self) -> date:
+        return date.fromordinal(self.start_ord)
+
+    @property
+    def end(self) -> date:
+        return date.fromordinal(self.start_ord + len(self.days_used) - 1)
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.start_ord <= start.toordinal() and end.toordinal() < self.start_ord + len(self.days_used)
+
+    def used_on(self, day: date) -> Optional[int]:
+        """Days used on ``day``, or None outside the projection."""
+        index = day.toordinal() - self.start_ord
+        return self.days_used[index] if 0 <= index < len(self.days_used) else None
+
+    def days_used_between(self, start: date, end: date) -> array:
+        """Days used for each day in [start, end]; the range must be covered."""
+        if not self.covers(start, end):
+            raise ValueError(f"{start}..{end} is outside the projection {self.start}..{self.end}")
+        offset = start.toordinal() - self.start_ord
+        return self.days_used[offset:offset + (end - start).days + 1]
+
+    def peak(self, start: date, end: date) -> Tuple[int, date]:
+        """Highest days used in [start, end] and the first day it is reached."""
+        values = self.days_used_between(start, end)
+        highest = max(values)
+        return highest, start + timedelta(days=values.index(highest))
+
+    def days_remaining_between(self, start: date, end: date, limit: int = LIMIT) -> array:
+        return array('h', (limit - value for value in self.days_used_between(start, end)))
+
+
+def store_projections(
+    conn: sqlite3.Connection,
+    trips_by_employee: Mapping[int, Iterable[Mapping[str, Any]]],
+    employee_ids: Optional[Iterable[int]] = None,
+    today: Optional[date] = None,
+) -> Dict[int, Projection]:
+    """
+    Rebuild and persist projections from already-loaded trips, without committing.
+
+    ``employee_ids`` are the ids that were requested (None for everyone); those
+    missing from ``trips_by_employee`` no longer exist and lose their row.
+    """
+    today = today or date.today()
+    projection_repository.ensure_schema(conn)
+    projections = {
+        employee_id: Projection.from_trips(trips, today) for employee_id, trips in trips_by_employee.items()
+    }
+    projection_repository.save_projections(
+        conn, [(employee_id, projection.start_ord, projection.to_blob()) for employee_id, projection in projections.items()]
+    )
+    if employee_ids is None:
+        projection_repository.delete_projections(conn)
+    else:
+        projection_repository.delete_projections(
+            conn, [employee_id for employee_id in employee_ids if int(employee_id) not in trips_by_employee]
+        )
+    return projections
+
+
+def load_projections(
+    conn: sqlite3.Connection,
+    employee_ids: Iterable[int],
+    today: Optional[date] = None,
+) -> Dict[int, Projection]:
+    """
+    Projections starting at ``today`` keyed by employee id, for existing employees.
+
+    Missing rows and rows computed for another day are rebuilt from trips and
+    stored, so the next load is a single row read.
+    """
+    today = today or date.today()
+    requested = [int(employee_id) for employee_id in employee_ids]
+    projection_repository.ensure_schema(conn)
+    start_ord = today.toordinal()
+    projections = {
+        employee_id: Projection.from_blob(row_start, blob)
+        for employee_id, (row_start, blob) in projection_repository.fetch_projections(conn, requested).items()
+        if row_start == start_ord and len(blob) == PROJECTION_DAYS * 2
+    }
+    missing = [employee_id for employee_id in requested if employee_id not in projections]
+    if missing:
+        trips_by_employee = compliance_repository.fetch_trips_by_employee(conn, missing)
+        if trips_by_employee:
+            projections.update(store_projections(conn, trips_by_employee, missing, today))
+            conn.commit()
+    return projections
+
+
+def load_projection(conn: sqlite3.Connection, employee_id: int, today: Optional[date] = None) -> Optional[Projection]:
+    """The employee's projection from ``today``, or None when the employee does not exist."""
+    return load_projections(conn, [employee_id], today).get(int(employee_id))
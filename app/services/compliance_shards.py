@@ -0,0 +1,196 @@
+"""
+Process-pool sharded compliance computation for large workforces.
+
+Above ``COMPLIANCE_SHARD_THRESHOLD`` employees the workforce is split into
+contiguous chunks and each chunk is computed in a ``ProcessPoolExecutor``
+worker, so report builds use every core instead of one. Trips cross the
+process boundary as compact arrays (entry/exit ordinals, a Schengen flag byte
+and the country) rather than lists of dicts. Shards are merged back in the
+original employee order, so results are identical to the in-process path.
+Per-shard timings are logged and returned with the results.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Hashable, List, Mapping, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+
+from .compliance_batch import calculate_batch_compliance
+from .compliance_forecast import get_all_future_jobs_for_employee
+from .rolling90 import COMPLIANCE_START_DATE, normalized_trip_columns
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SHARD_THRESHOLD = 2000
+
+# (employee ids, per-employee trip offsets, entry ordinals, exit ordinals, Schengen flags, countries)
+PackedShard = Tuple[List[Hashable], array, array, array, bytes, Tuple[str, ...]]
+
+
+@dataclass
+class ShardedResult:
+    """Merged per-employee results plus one timing entry per shard (empty when run in-process)."""
+
+    results: Dict[Hashable, Any]
+    shard_timings: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def sharded(self) -> bool:
+        return bool(self.shard_timings)
+
+
+def shard_settings() -> Tuple[int, int]:
+    """(employee threshold, worker count) from the app CONFIG, or the defaults outside a request."""
+    config = {}
+    if has_app_context():
+        config = current_app.config.get('CONFIG') or {}
+    threshold = int(config.get('COMPLIANCE_SHARD_THRESHOLD') or DEFAULT_SHARD_THRESHOLD)
+    workers = int(config.get('COMPLIANCE_SHARD_WORKERS') or os.cpu_count() or 1)
+    return threshold, workers
+
+
+def pack_shard(employees: Sequence[Tuple[Hashable, Sequence[Mapping[str, Any]]]]) -> PackedShard:
+    """Encode (employee_id, trips) pairs as flat arrays; trips with unparsable dates are dropped."""
+    ids: List[Hashable] = []
+    offsets = array('l', [0])
+    entries = array('l')
+    exits = array('l')
+    flags = bytearray()
+    countries: List[str] = []
+    for employee_id, trips in employees:
+        ids.append(employee_id)
+        for trip in trips or ():
+            country = trip.get('country') or trip.get('country_code') or ''
+            entry_ord, exit_ord, is_schengen = trip.get('entry_ord'), trip.get('exit_ord'), trip.get('is_schengen')
+            if entry_ord is None or exit_ord is None or is_schengen is None:
+                columns = normalized_trip_columns(trip.get('entry_date'), trip.get('exit_date'), country)
+                entry_ord, exit_ord, is_schengen = columns['entry_ord'], columns['exit_ord'], columns['is_schengen']
+            if entry_ord is None or exit_ord is None:
+                continue
+            entries.append(entry_ord)
+            exits.append(exit_ord)
+            flags.append(1 if is_schengen else 0)
+            countries.append(country)
+        offsets.append(len(entries))
+    return ids, offsets, entries, exits, bytes(flags), tuple(countries)
+
+
+def unpack_shard(shard: PackedShard) -> List[Tuple[Hashable, List[Dict[str, Any]]]]:
+    """Rebuild trip dicts (with the normalised columns set) from a packed shard."""
+    ids, offsets, entries, exits, flags, countries = shard
+    employees = []
+    for position, employee_id in enumerate(ids):
+        trips = []
+        for index in range(offsets[position], offsets[position + 1]):
+            trips.append({
+                'entry_date': date.fromordinal(entries[index]).isoformat(),
+                'exit_date': date.fromordinal(exits[index]).isoformat(),
+                'country': countries[index],
+                'entry_ord': entries[index],
+                'exit_ord': exits[index],
+                'is_schengen': flags[index],
+            })
+        employees.append((employee_id, trips))
+    return employees
+
+
+def _run_shard(kind: str, shard: PackedShard, params: Dict[str, Any]) -> Tuple[Dict[Hashable, Any], float]:
+    """Worker entry point: compute one shard and return (results, elapsed seconds)."""
+    started = time.perf_counter()
+    employees = unpack_shard(shard)
+    if kind == 'batch':
+        results = calculate_batch_compliance(dict(employees), **params)
+    elif kind == 'future_jobs':
+        results = {
+            employee_id: get_all_future_jobs_for_employee(employee_id, trips, **params)
+            for employee_id, trips in employees
+        }
+    else:
+        raise ValueError(f"Unknown shard kind: {kind}")
+    return results, time.perf_counter() - started
+
+
+def _chunks(items: Sequence[Any], count: int) -> List[Sequence[Any]]:
+    size = -(-len(items) // count)
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _run(
+    kind: str,
+    employees: Sequence[Tuple[Hashable, Sequence[Mapping[str, Any]]]],
+    params: Dict[str, Any],
+    threshold: Optional[int],
+    workers: Optional[int],
+) -> ShardedResult:
+    default_threshold, default_workers = shard_settings()
+    threshold = default_threshold if threshold is None else threshold
+    workers = default_workers if workers is None else workers
+
+    if len(employees) >= threshold and workers > 1 and len(employees) > 1:
+        shards = [pack_shard(chunk) for chunk in _chunks(employees, workers)]
+        try:
+            with ProcessPoolExecutor(max_workers=len(shards)) as pool:
+                outcomes = list(pool.map(_run_shard, [kind] * len(shards), shards, [params] * len(shards)))
+        except Exception:
+            logger.exception("Sharded %s compliance failed; computing in-process", kind)
+        else:
+            merged: Dict[Hashable, Any] = {}
+            timings = []
+            for index, (shard, (results, elapsed)) in enumerate(zip(shards, outcomes)):
+                # Shards are contiguous and map() preserves order, so insertion order matches the input
+                for employee_id in shard[0]:
+                    merged[employee_id] = results[employee_id]
+                timings.append({'shard': index, 'employees': len(shard[0]), 'seconds': round(elapsed, 4)})
+            logger.info("Sharded %s compliance for %d employees: %s", kind, len(employees), timings)
+            return ShardedResult(merged, timings)
+
+    if kind == 'batch':
+        return ShardedResult(calculate_batch_compliance(dict(employees), **params))
+    return ShardedResult({
+        employee_id: get_all_future_jobs_for_employee(employee_id, list(trips or []), **params)
+        for employee_id, trips in employees
+    })
+
+
+def sharded_batch_compliance(
+    trips_by_employee: Mapping[Hashable, Sequence[Mapping[str, Any]]],
+    today: Optional[date] = None,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+    threshold: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> ShardedResult:
+    """calculate_batch_compliance, sharded across processes for large workforces."""
+    params = {
+        'today': today or date.today(),
+        'limit': limit,
+        'compliance_start_date': compliance_start_date,
+        'risk_thresholds': risk_thresholds,
+    }
+    return _run('batch', list(trips_by_employee.items()), params, threshold, workers)
+
+
+def sharded_future_jobs(
+    trips_by_employee: Mapping[Hashable, Sequence[Mapping[str, Any]]],
+    warning_threshold: int = 80,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    limit: int = 90,
+    threshold: Optional[int] = None,
+    workers: Optional[int] = None,
+) -> ShardedResult:
+    """get_all_future_jobs_for_employee for every employee, sharded across processes for large workforces."""
+    params = {
+        'warning_threshold': warning_threshold,
+        'compliance_start_date': compliance_start_date,
+        'limit': limit,
+    }
+    return _run('future_jobs', list(trips_by_employee.items()), params, threshold, workers)
@@ -0,0 +1,244 @@
+"""
+Materialised per-employee compliance snapshot.
+
+The ``employee_compliance`` table holds today's days used / remaining, risk
+level, earliest safe entry and the next date the risk level changes for every
+employee. Trip and employee writes refresh only the affected employees; a
+midnight job (and a lazy staleness check on read) rolls every row forward to
+the new day. Read paths then need one indexed SELECT instead of recomputing
+from raw trips.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from flask import current_app, has_app_context
+
+from app.repositories import compliance_repository
+from app.utils.cache_invalidation import invalidate_dashboard_cache, invalidate_employees_cache
+from . import compliance_cache, compliance_timeseries
+from .compliance_batch import calculate_batch_compliance
+from .compliance_projection import store_projections
+from .presence_bitmap import store_bitmaps
+from .presence_delta import discard_presence_counts
+from .rolling90 import COMPLIANCE_START_DATE, WINDOW_DAYS, get_risk_level, presence_days, usage_timeline
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RISK_THRESHOLDS = {'green': 30, 'amber': 10}
+
+
+def configured_risk_thresholds() -> Dict[str, int]:
+    """RISK_THRESHOLDS from the app config, or the defaults outside an app context."""
+    if has_app_context():
+        config = current_app.config.get('CONFIG') or {}
+        return config.get('RISK_THRESHOLDS', DEFAULT_RISK_THRESHOLDS)
+    return DEFAULT_RISK_THRESHOLDS
+
+
+def _parse_date(value) -> Optional[date]:
+    if not value:
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value))
+
+
+def next_risk_transition(trips, today: date, thresholds: Dict[str, int], limit: int = 90) -> Optional[date]:
+    """First date in the next 180 days whose risk level differs from today's."""
+    presence = presence_days(trips, COMPLIANCE_START_DATE)
+    timeline = usage_timeline(presence, today, today + timedelta(days=WINDOW_DAYS), limit)
+    return _first_transition(timeline['days_remaining'], today, thresholds)
+
+
+def _first_transition(remaining, today: date, thresholds: Dict[str, int]) -> Optional[date]:
+    """First date after ``today`` whose risk level differs, given days remaining from today on."""
+    current = get_risk_level(remaining[0], thresholds)
+    for offset in range(1, len(remaining)):
+        if get_risk_level(remaining[offset], thresholds) != current:
+            return today + timedelta(days=offset)
+    return None
+
+
+def refresh_snapshots(
+    conn: sqlite3.Connection,
+    employee_ids: Optional[Iterable[int]] = None,
+    today: Optional[date] = None,
+) -> int:
+    """
+    Recompute snapshot rows for the given employees (all employees when None).
+
+    Rows for employees that no longer exist are removed, and the employees'
+    presence bitmaps, forward projections and risk time series rows are
+    rebuilt from the same trips. Commits on success and returns the number of rows written.
+    """
+    today = today or date.today()
+    thresholds = configured_risk_thresholds()
+    requested = None if employee_ids is None else list(employee_ids)
+
+    compliance_repository.ensure_schema(conn)
+    trips_by_employee = compliance_repository.fetch_trips_by_employee(conn, requested)
+    results = calculate_batch_compliance(
+        trips_by_employee,
+        today,
+        compliance_start_date=COMPLIANCE_START_DATE,
+        risk_thresholds=thresholds,
+    )
+    # The persisted forward projection also yields the next risk transition, so the timeline is built once
+    projections = store_projections(conn, trips_by_employee, requested, today)
+    window_end = today + timedelta(days=WINDOW_DAYS)
+    rows = []
+    for employee_id, result in results.items():
+        transition = _first_transition(
+            projections[employee_id].days_remaining_between(today, window_end), today, thresholds
+        )
+        rows.append({
+            'employee_id': employee_id,
+            'days_used': result['days_used'],
+            'days_remaining': result['days_remaining'],
+            'risk_level': result['risk_level'],
+            'safe_entry_date': result['safe_entry_date'].isoformat() if result['safe_entry_date'] else None,
+            'next_risk_transition_date': transition.isoformat() if transition else None,
+            'computed_for': today.isoformat(),
+        })
+    compliance_repository.upsert_snapshots(conn, rows)
+    if requested is None:
+        compliance_repository.delete_orphaned_snapshots(conn)
+    else:
+        compliance_repository.delete_snapshots(
+            conn, [employee_id for employee_id in requested if int(employee_id) not in trips_by_employee]
+        )
+    store_bitmaps(conn, trips_by_employee, requested)
+    try:
+        if requested is None:
+            compliance_timeseries.rebuild(conn, today, thresholds, trips_by_employee)
+        else:
+            compliance_timeseries.update_employees(conn, trips_by_employee, requested, today, thresholds)
+    except Exception:
+        logger.exception("Failed to update risk time series for employees %s", requested)
+    conn.commit()
+    return len(rows)
+
+
+def refresh_snapshots_safely(
+    conn: sqlite3.Connection,
+    employee_ids: Optional[Iterable[int]] = None,
+    keep_presence_counts: bool = False,
+) -> None:
+    """
+    Refresh after a write without letting a snapshot failure break the write.
+
+    The employees' compliance_cache entries are invalidated first. Unless the
+    caller already applied the write through presence_delta
+    (keep_presence_counts=True), their persisted coverage counts are dropped
+    so the next incremental edit rebuilds them from trips. Cached responses
+    tagged with the employees, and the aggregates over them, are evicted last.
+    """
+    employee_ids = None if employee_ids is None else list(employee_ids)
+    compliance_cache.invalidate(employee_ids)
+    try:
+        if not keep_presence_counts:
+            discard_presence_counts(conn, employee_ids)
+        refresh_snapshots(conn, employee_ids)
+    except Exception:
+        logger.exception("Failed to refresh compliance snapshot for employees %s", employee_ids)
+    if employee_ids is None:
+        invalidate_dashboard_cache()
+    else:
+        invalidate_employees_cache(employee_ids)
+
+
+def ensure_current(conn: sqlite3.Connection, today: Optional[date] = None) -> None:
+    """Refresh rows that are missing or were computed for an earlier day."""
+    today = today or date.today()
+    compliance_repository.ensure_schema(conn)
+    stale = compliance_repository.fetch_stale_employee_ids(conn, today.isoformat())
+    if stale:
+        refresh_snapshots(conn, stale, today)
+
+
+def load_snapshots(conn: sqlite3.Connection, today: Optional[date] = None) -> Dict[int, Dict[str, Any]]:
+    """Return current snapshot rows keyed by employee id, refreshing stale ones first."""
+    today = today or date.today()
+    ensure_current(conn, today)
+    snapshots = {}
+    for row in compliance_repository.fetch_snapshots(conn):
+        row['safe_entry_date'] = _parse_date(row['safe_entry_date'])
+        row['next_risk_transition_date'] = _parse_date(row['next_risk_transition_date'])
+        row['computed_for'] = _parse_date(row['computed_for'])
+        days_until = None
+        compliance_date = None
+        if row['days_remaining'] < 0:
+            safe_entry = row['safe_entry_date']
+            days_until, compliance_date = ((safe_entry - today).days, safe_entry) if safe_entry else (0, today)
+        row['days_until_compliant'] = days_until
+        row['compliance_date'] = compliance_date
+        snapshots[row['employee_id']] = row
+    return snapshots
+
+
+def at_risk_count(conn: sqlite3.Connection, below_remaining: int = 10, today: Optional[date] = None) -> int:
+    """Number of employees with fewer than ``below_remaining`` days left today."""
+    today = today or date.today()
+    ensure_current(conn, today)
+    return compliance_repository.count_at_risk(conn, today.isoformat(), below_remaining)
+
+
+def claim_daily_rollover(conn: sqlite3.Connection, today: Optional[date] = None) -> bool:
+    """
+    Claim today's roll-forward for this process.
+
+    Every worker runs the scheduler against the same database; the first to
+    claim the day refreshes and the others skip it.
+    """
+    today = today or date.today()
+    try:
+        return compliance_repository.claim_rollover(conn, today.isoformat())
+    finally:
+        conn.commit()
+
+
+def start_snapshot_scheduler(app) -> None:
+    """Roll every snapshot forward shortly after local midnight, once across all workers."""
+    if (
+        app.config.get("TESTING")
+        or app.config.get("CONFIG", {}).get("TEST_MODE")
+        or os.getenv("DISABLE_SNAPSHOT_SCHEDULER") == "1"
+    ):
+        logger.info("Compliance snapshot scheduler disabled (testing/test mode).")
+        return
+
+    try:
+        from apscheduler.schedulers.background import BackgroundScheduler
+    except Exception:
+        logger.warning("APScheduler not available; snapshots refresh lazily on read.")
+        return
+
+    def _rollover():
+        with app.app_context():
+            from app.models import get_db
+            try:
+                conn = get_db()
+                if not claim_daily_rollover(conn):
+                    logger.info("Compliance snapshot roll-forward already claimed by another worker")
+                    return
+                refresh_snapshots(conn)
+            except Exception:
+                logger.exception("Midnight compliance snapshot refresh failed")
+
+    scheduler = BackgroundScheduler()
+    scheduler.add_job(
+        _rollover,
+        trigger="cron",
+        hour=0,
+        minute=1,
+        id="compliance_snapshot_rollover",
+        replace_existing=True,
+    )
+    scheduler.start()
+    logger.info("Compliance snapshot scheduler started (daily at 00:01).")
@@ -0,0 +1,94 @@
+"""
+Workforce compliance computed inside SQLite.
+
+Days used only depends on how much of each Schengen trip overlaps the window
+[ref - 180, ref - 1], so the whole workforce can be summarised by one aggregate
+query over the trips' day ordinals (see compliance_repository.WINDOW_DAYS_USED_SQL)
+without loading trips into Python or expanding them into days. Only employees
+at or over the limit, who need an earliest safe entry date, fall back to the
+batch engine. Rows written before the normalised columns existed are backfilled
+once at startup by models.init_db.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from typing import Any, Dict, Optional
+
+from app.repositories import compliance_repository
+from .compliance_batch import DEFAULT_RISK_THRESHOLDS, calculate_batch_compliance
+from .rolling90 import COMPLIANCE_START_DATE, WINDOW_DAYS, get_risk_level
+
+
+def days_used_for_all(
+    conn: sqlite3.Connection,
+    today: Optional[date] = None,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> Dict[int, int]:
+    """Days used in today's window for every employee (0 for employees without trips)."""
+    today = today or date.today()
+    return compliance_repository.fetch_window_days_used(
+        conn,
+        today.toordinal(),
+        WINDOW_DAYS,
+        compliance_start_date.toordinal() if compliance_start_date else None,
+    )
+
+
+def calculate_sql_compliance(
+    conn: sqlite3.Connection,
+    today: Optional[date] = None,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Same result shape as calculate_batch_compliance, with usage aggregated in SQL.
+
+    Trips are only loaded for employees with no days left, to find their
+    earliest safe entry date.
+    """
+    today = today or date.today()
+    thresholds = risk_thresholds or DEFAULT_RISK_THRESHOLDS
+    usage = days_used_for_all(conn, today, compliance_start_date)
+    results = {
+        employee_id: {
+            'days_used': days_used,
+            'days_remaining': limit - days_used,
+            'risk_level': get_risk_level(limit - days_used, thresholds),
+            'safe_entry_date': None,
+            'days_until_compliant': None,
+            'compliance_date': None,
+        }
+        for employee_id, days_used in usage.items()
+    }
+    exhausted = [employee_id for employee_id, days_used in usage.items() if days_used > limit - 1]
+    if exhausted:
+        trips = compliance_repository.fetch_trips_by_employee(conn, exhausted)
+        results.update(calculate_batch_compliance(
+            trips,
+            today,
+            limit,
+            compliance_start_date=compliance_start_date,
+            risk_thresholds=thresholds,
+        ))
+    return results
+
+
+def at_risk_count(
+    conn: sqlite3.Connection,
+    below_remaining: int = 10,
+    today: Optional[date] = None,
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> int:
+    """Number of employees with fewer than ``below_remaining`` days left, counted in SQL."""
+    today = today or date.today()
+    return compliance_repository.count_window_days_used_at_least(
+        conn,
+        today.toordinal(),
+        WINDOW_DAYS,
+        limit - below_remaining + 1,
+        compliance_start_date.toordinal() if compliance_start_date else None,
+    )
@@ -0,0 +1,199 @@
+"""
+Company-wide daily risk time series.
+
+``compliance_risk_series`` holds, for every day from a year ago to six months
+ahead, how many employees are green, amber and red on that day. Each
+employee's daily levels are kept as one byte per day in
+``employee_risk_series``, so a trip write recomputes only that employee's row
+(one sliding-window pass) and adjusts the counts on the days whose level
+actually changed. The whole series is rebuilt in one pass over all trips when
+the day rolls over or the thresholds change. ``version`` bumps on every change
+and feeds the endpoint's ETag.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import sqlite3
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.repositories import compliance_repository, risk_series_repository
+from .rolling90 import COMPLIANCE_START_DATE, get_risk_level, presence_days, usage_timeline
+
+logger = logging.getLogger(__name__)
+
+PAST_DAYS = 365
+FUTURE_DAYS = 183
+LIMIT = 90
+
+LEVELS = ('green', 'amber', 'red')
+_LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+
+
+def series_range(today: date) -> Tuple[date, date]:
+    return today - timedelta(days=PAST_DAYS), today + timedelta(days=FUTURE_DAYS)
+
+
+def _settings(thresholds: Mapping[str, int]) -> str:
+    return json.dumps({'thresholds': dict(thresholds), 'limit': LIMIT}, sort_keys=True)
+
+
+def employee_levels(trips: Iterable[Mapping[str, Any]], start: date, end: date, thresholds: Mapping[str, int]) -> bytes:
+    """One risk code (index into LEVELS) per day in [start, end]."""
+    timeline = usage_timeline(presence_days(list(trips), COMPLIANCE_START_DATE), start, end, LIMIT)
+    return bytes(_LEVEL_CODES[get_risk_level(remaining, thresholds)] for remaining in timeline['days_remaining'])
+
+
+def rebuild(
+    conn: sqlite3.Connection,
+    today: date,
+    thresholds: Mapping[str, int],
+    trips_by_employee: Optional[Mapping[int, Iterable[Mapping[str, Any]]]] = None,
+) -> None:
+    """
+    Recompute the full series from every employee's trips, without committing.
+
+    ``trips_by_employee`` may be passed when the caller already loaded every
+    employee's trips.
+    """
+    risk_series_repository.ensure_schema(conn)
+    if trips_by_employee is None:
+        trips_by_employee = compliance_repository.fetch_trips_by_employee(conn)
+    start, end = series_range(today)
+    days = (end - start).days + 1
+    counts = [[0, 0, 0] for _ in range(days)]
+    employee_rows = []
+    for employee_id, trips in trips_by_employee.items():
+        levels = employee_levels(trips, start, end, thresholds)
+        for index, code in enumerate(levels):
+            counts[index][code] += 1
+        employee_rows.append((employee_id, levels))
+
+    start_ord = start.toordinal()
+    risk_series_repository.replace_risk_series(
+        conn,
+        start_ord,
+        end.toordinal(),
+        _settings(thresholds),
+        [(start_ord + index, *day_counts) for index, day_counts in enumerate(counts)],
+        employee_rows,
+    )
+
+
+def _current_meta(conn: sqlite3.Connection, today: date, thresholds: Mapping[str, int]) -> Dict[str, Any]:
+    """
+    Series metadata for today's range and thresholds, rebuilding first when out of date.
+
+    Employees created or deleted without a snapshot refresh are reconciled here
+    so the daily totals always cover exactly the current workforce.
+    """
+    risk_series_repository.ensure_schema(conn)
+    start, _ = series_range(today)
+    meta = risk_series_repository.fetch_series_meta(conn)
+    if meta is None or meta['start_ord'] != start.toordinal() or meta['settings'] != _settings(thresholds):
+        rebuild(conn, today, thresholds)
+        conn.commit()
+        return risk_series_repository.fetch_series_meta(conn)
+    unsynced = risk_series_repository.fetch_unsynced_series_employee_ids(conn)
+    if unsynced:
+        trips_by_employee = compliance_repository.fetch_trips_by_employee(conn, unsynced)
+        update_employees(conn, trips_by_employee, unsynced, today, thresholds)
+        conn.commit()
+        meta = risk_series_repository.fetch_series_meta(conn)
+    return meta
+
+
+def update_employees(
+    conn: sqlite3.Connection,
+    trips_by_employee: Mapping[int, Iterable[Mapping[str, Any]]],
+    employee_ids: Iterable[int],
+    today: date,
+    thresholds: Mapping[str, int],
+) -> None:
+    """
+    Apply the requested employees' current trips to the series, without committing.
+
+    ``trips_by_employee`` holds the trips of the requested employees that still
+    exist; requested ids missing from it are removed from the counts. Only days
+    whose level changed for an employee touch ``compliance_risk_series``.
+    """
+    risk_series_repository.ensure_schema(conn)
+    start, end = series_range(today)
+    meta = risk_series_repository.fetch_series_meta(conn)
+    if meta is None or meta['start_ord'] != start.toordinal() or meta['settings'] != _settings(thresholds):
+        return  # the next read rebuilds the whole series, which includes this write
+
+    requested = list(dict.fromkeys(int(employee_id) for employee_id in employee_ids))
+    previous = risk_series_repository.fetch_employee_risk_levels(conn, requested)
+    deltas: Dict[int, List[int]] = {}
+    saved = []
+    deleted = []
+    for employee_id in requested:
+        old = previous.get(employee_id)
+        new = None
+        if employee_id in trips_by_employee:
+            new = employee_levels(trips_by_employee[employee_id], start, end, thresholds)
+        if old == new:
+            continue
+        for index in range(max(len(old or b''), len(new or b''))):
+            old_code = old[index] if old else None
+            new_code = new[index] if new else None
+            if old_code != new_code:
+                day = deltas.setdefault(index, [0, 0, 0])
+                if old_code is not None:
+                    day[old_code] -= 1
+                if new_code is not None:
+                    day[new_code] += 1
+        if new is None:
+            deleted.append(employee_id)
+        else:
+            saved.append((employee_id, new))
+
+    if saved or deleted:
+        start_ord = start.toordinal()
+        risk_series_repository.apply_risk_series_changes(
+            conn,
+            [(*day, start_ord + index) for index, day in sorted(deltas.items()) if any(day)],
+            saved,
+            deleted,
+        )
+
+
+def refresh_employees_safely(
+    conn: sqlite3.Connection,
+    employee_ids: Iterable[int],
+    thresholds: Mapping[str, int],
+    today: Optional[date] = None,
+) -> None:
+    """Re-read the employees' trips and apply them to the series; failures are logged, not raised."""
+    employee_ids = list(employee_ids)
+    try:
+        trips_by_employee = compliance_repository.fetch_trips_by_employee(conn, employee_ids)
+        update_employees(conn, trips_by_employee, employee_ids, today or date.today(), thresholds)
+        conn.commit()
+    except Exception:
+        logger.exception("Failed to update risk time series for employees %s", employee_ids)
+
+
+def series_version(conn: sqlite3.Connection, today: date, thresholds: Mapping[str, int]) -> str:
+    """Opaque token that changes whenever the served series would change (used as ETag)."""
+    meta = _current_meta(conn, today, thresholds)
+    return f"{meta['start_ord']}-{meta['version']}"
+
+
+def load_timeseries(conn: sqlite3.Connection, today: date, thresholds: Mapping[str, int]) -> Dict[str, Any]:
+    """Daily green/amber/red employee counts from a year ago to six months ahead."""
+    meta = _current_meta(conn, today, thresholds)
+    rows = risk_series_repository.fetch_risk_series(conn)
+    return {
+        'start': date.fromordinal(meta['start_ord']).isoformat(),
+        'end': date.fromordinal(meta['end_ord']).isoformat(),
+        'today': today.isoformat(),
+        'version': f"{meta['start_ord']}-{meta['version']}",
+        'dates': [date.fromordinal(row[0]).isoformat() for row in rows],
+        'green': [row[1] for row in rows],
+        'amber': [row[2] for row in rows],
+        'red': [row[3] for row in rows],
+    }
@@ -0,0 +1,255 @@
+"""Paginated dashboard data for the JSON API and the HTML dashboard."""
+
+from __future__ import annotations
+
+from contextlib import closing
+from datetime import date
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from app.repositories import dashboard_repository, employees_repository
+from app.services import compliance_snapshot, stay_rules
+from app.services.compliance_forecast import get_all_future_jobs_for_employee
+from app.services.rolling90 import COMPLIANCE_START_DATE
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+RISK_FILTERS = ("green", "amber", "red")
+MAX_NAME_PREFIX = 100
+AT_RISK_BELOW = 10
+
+
+class DashboardQueryError(ValueError):
+    """Raised when page, sort or filter arguments are invalid."""
+
+
+def _positive_int(raw: Any, name: str, default: int) -> int:
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except (TypeError, ValueError) as exc:
+        raise DashboardQueryError(f"{name} must be an integer") from exc
+    if value < 1:
+        raise DashboardQueryError(f"{name} must be at least 1")
+    return value
+
+
+def _iso(value: Any) -> Optional[str]:
+    return value.isoformat() if isinstance(value, date) else value
+
+
+def _trip(employee_id: int, row) -> Dict[str, Any]:
+    country, entry_date, exit_date, is_private = row
+    return {
+        "employee_id": employee_id,
+        "country": country,
+        "entry_date": entry_date,
+        "exit_date": exit_date,
+        "is_private": bool(is_private),
+    }
+
+
+def _page_args(
+    page: Any, page_size: Any, sort_by: Optional[str], risk: Optional[str], name_prefix: Optional[str]
+) -> Tuple[int, int, str, Optional[str], Optional[str]]:
+    page = _positive_int(page, "page", 1)
+    page_size = _positive_int(page_size, "page_size", DEFAULT_PAGE_SIZE)
+    if page_size > MAX_PAGE_SIZE:
+        raise DashboardQueryError(f"page_size must not exceed {MAX_PAGE_SIZE}")
+    sort_by = sort_by or "first_name"
+    if sort_by not in dashboard_repository.PAGE_ORDER_SQL:
+        raise DashboardQueryError(f"sort must be one of {', '.join(dashboard_repository.PAGE_ORDER_SQL)}")
+    risk = (risk or "").strip().lower() or None
+    if risk == "all":
+        risk = None
+    if risk is not None and risk not in RISK_FILTERS:
+        raise DashboardQueryError(f"risk must be one of all, {', '.join(RISK_FILTERS)}")
+    name_prefix = (name_prefix or "").strip() or None
+    if name_prefix is not None and len(name_prefix) > MAX_NAME_PREFIX:
+        raise DashboardQueryError(f"q must not exceed {MAX_NAME_PREFIX} characters")
+    return page, page_size, sort_by, risk, name_prefix
+
+
+def _employee_rows(
+    rows: List[Tuple[Any, ...]], trips: dashboard_repository.DashboardTrips, today: date
+) -> List[Dict[str, Any]]:
+    employees: List[Dict[str, Any]] = []
+    for row in rows:
+        employee = dict(zip(dashboard_repository.PAGE_COLUMNS, row))
+        employee_id = employee["id"]
+        days_until = compliance_date = None
+        if employee["days_remaining"] is not None and employee["days_remaining"] < 0:
+            safe_entry = date.fromisoformat(employee["safe_entry_date"]) if employee["safe_entry_date"] else None
+            days_until, compliance_date = ((safe_entry - today).days, safe_entry) if safe_entry else (0, today)
+        next_trip = trips.next_trip.get(employee_id)
+        employee.update({
+            "days_until_compliant": days_until,
+            "compliance_date": _iso(compliance_date),
+            "trip_count": trips.trip_count(employee_id),
+            "next_trip": _trip(employee_id, next_trip) if next_trip else None,
+            "recent_trips": [_trip(employee_id, trip) for trip in trips.recent.get(employee_id, [])],
+        })
+        employees.append(employee)
+    return employees
+
+
+def get_page(
+    config: Mapping[str, Any],
+    page: Any = None,
+    page_size: Any = None,
+    sort_by: Optional[str] = None,
+    risk: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    One page of dashboard rows, sorted and filtered in SQL.
+
+    Current compliance comes from the ``employee_compliance`` snapshot and trips
+    are loaded only for the employees on the page, so the work per request
+    depends on ``page_size`` rather than headcount. Forecasts are not included;
+    see get_employee_forecasts. Trips are returned unredacted with ``is_private``
+    for the caller to redact.
+    """
+    today = today or date.today()
+    page, page_size, sort_by, risk, name_prefix = _page_args(page, page_size, sort_by, risk, name_prefix)
+
+    with closing(employees_repository.connect(config)) as conn:
+        compliance_snapshot.ensure_current(conn, today)
+        dashboard_repository.ensure_page_indexes(conn)
+        total, rows = dashboard_repository.fetch_dashboard_page(
+            conn, today.isoformat(), (page - 1) * page_size, page_size, sort_by, risk, name_prefix
+        )
+        trips = dashboard_repository.fetch_dashboard_trips(
+            conn, today.isoformat(), employee_ids=[row[0] for row in rows]
+        )
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": (total + page_size - 1) // page_size,
+        "sort": sort_by,
+        "risk": risk or "all",
+        "q": name_prefix or "",
+        "employees": _employee_rows(rows, trips, today),
+    }
+
+
+def get_page_view(
+    config: Mapping[str, Any],
+    page: Any = None,
+    page_size: Any = None,
+    sort_by: Optional[str] = None,
+    risk: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    warning_threshold: int = 80,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+    rules: Optional[Sequence[stay_rules.StayRule]] = None,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    """
+    get_page plus what the HTML dashboard renders for each row.
+
+    Forecasts and extra stay rules are evaluated only for the employees on the
+    page, and the at-risk panel reads at most MAX_PAGE_SIZE rows from the
+    snapshot, so the page costs the same at any headcount. The future alerts
+    summary covers the rows on the page.
+    """
+    today = today or date.today()
+    page, page_size, sort_by, risk, name_prefix = _page_args(page, page_size, sort_by, risk, name_prefix)
+
+    with closing(employees_repository.connect(config)) as conn:
+        compliance_snapshot.ensure_current(conn, today)
+        dashboard_repository.ensure_page_indexes(conn)
+        total, rows = dashboard_repository.fetch_dashboard_page(
+            conn, today.isoformat(), (page - 1) * page_size, page_size, sort_by, risk, name_prefix
+        )
+        at_risk_total, at_risk_rows = dashboard_repository.fetch_dashboard_page(
+            conn, today.isoformat(), 0, MAX_PAGE_SIZE, "days_remaining", below_remaining=AT_RISK_BELOW
+        )
+        trips = dashboard_repository.fetch_dashboard_trips(
+            conn, today.isoformat(), employee_ids=sorted({row[0] for row in rows} | {row[0] for row in at_risk_rows})
+        )
+
+    employees = _employee_rows(rows, trips, today)
+    trips_by_employee = {employee["id"]: trips.trip_dicts(employee["id"]) for employee in employees}
+    rule_results: Dict[int, Any] = {}
+    if rules and len(rules) > 1:
+        rule_results = stay_rules.evaluate_workforce(
+            trips_by_employee,
+            rules,
+            today,
+            compliance_start_date=COMPLIANCE_START_DATE,
+            risk_thresholds=risk_thresholds,
+        )
+
+    future_alerts = {"red": 0, "yellow": 0, "green": 0}
+    for employee in employees:
+        forecasts = get_all_future_jobs_for_employee(
+            employee["id"], trips_by_employee[employee["id"]], warning_threshold, COMPLIANCE_START_DATE
+        )
+        for forecast in forecasts:
+            level = forecast["risk_level"] if forecast["risk_level"] in ("red", "yellow") else "green"
+            future_alerts[level] += 1
+        reference = forecasts[0] if forecasts else None
+        employee.update({
+            "forecasts": forecasts,
+            "forecast_reference": reference,
+            "forecasted_days_remaining": (
+                reference.get("days_remaining_after_job", employee["days_remaining"])
+                if reference else employee["days_remaining"]
+            ),
+            "forecast_risk_level": (
+                reference.get("risk_level", employee["risk_level"]) if reference else employee["risk_level"]
+            ),
+            "stay_rules": stay_rules.extra_rule_results(rule_results.get(employee["id"], {})),
+        })
+
+    return {
+        "page": page,
+        "page_size": page_size,
+        "total": total,
+        "pages": (total + page_size - 1) // page_size,
+        "sort": sort_by,
+        "risk": risk or "all",
+        "q": name_prefix or "",
+        "employees": employees,
+        "at_risk_employees": _employee_rows(at_risk_rows, trips, today),
+        "at_risk_total": at_risk_total,
+        "future_alerts_summary": future_alerts,
+    }
+
+
+def get_employee_forecasts(
+    config: Mapping[str, Any],
+    employee_id: int,
+    warning_threshold: int = 80,
+    today: Optional[date] = None,
+) -> Optional[List[Dict[str, Any]]]:
+    """Future-job forecasts for one dashboard row, or None when the employee does not exist."""
+    today = today or date.today()
+    with closing(employees_repository.connect(config)) as conn:
+        if conn.execute("SELECT 1 FROM employees WHERE id = ?", (employee_id,)).fetchone() is None:
+            return None
+        trips = dashboard_repository.fetch_dashboard_trips(conn, today.isoformat(), employee_ids=[employee_id])
+    forecasts = get_all_future_jobs_for_employee(
+        employee_id, trips.trip_dicts(employee_id), warning_threshold, COMPLIANCE_START_DATE
+    )
+    return [
+        {
+            "trip_id": forecast["job"]["trip_id"],
+            "country": forecast["job"]["country"],
+            "is_private": bool(forecast["job"]["is_private"]),
+            "job_start_date": _iso(forecast["job_start_date"]),
+            "job_end_date": _iso(forecast["job_end_date"]),
+            "job_duration": forecast["job_duration"],
+            "days_used_before_job": forecast["days_used_before_job"],
+            "days_after_job": forecast["days_after_job"],
+            "days_remaining_after_job": forecast["days_remaining_after_job"],
+            "risk_level": forecast["risk_level"],
+            "is_compliant": forecast["is_compliant"],
+            "compliant_from_date": _iso(forecast.get("compliant_from_date")),
+        }
+        for forecast in forecasts
+    ]
@@ -3,10 +3,13 @@ import csv
 import zipfile
 import io
 import os
+import sqlite3
+from contextlib import closing
 from datetime import datetime
 from typing import Dict, Optional
 
 from app.repositories import dsar_repository
+from .compliance_snapshot import refresh_snapshots_safely
 
 
 def get_employee_data(db_path: str, employee_id: int) -> Optional[Dict]:
@@ -147,6 +150,9 @@ def delete_employee_data(db_path: str, employee_id: int) -> Dict:
     result = dsar_repository.delete_employee_and_trips(db_path, employee_id)
     if not result:
         return {'success': False, 'error': 'Employee not found'}
+    # Drop the employee's snapshot row, presence data and cached compliance
+    with closing(sqlite3.connect(db_path)) as conn:
+        refresh_snapshots_safely(conn, [employee_id])
     return {
         'success': True,
         'employee_id': employee_id,
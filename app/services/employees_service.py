@@ -2,15 +2,25 @@
 
 from __future__ import annotations
 
-from typing import Any, Dict, Mapping, Sequence
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Any, Dict, Mapping, Optional, Sequence
 
 from app.repositories import employees_repository
+from app.services.compliance_projection import LIMIT as PROJECTION_LIMIT, load_projection
+from app.services.rolling90 import COMPLIANCE_START_DATE, presence_days, usage_timeline
+
+MAX_TIMELINE_DAYS = 731
 
 
 class EmployeeValidationError(ValueError):
     """Raised when employee input fails validation."""
 
 
+class EmployeeNotFoundError(LookupError):
+    """Raised when an employee cannot be located."""
+
+
 def _validate_employee_name(raw_name: Any) -> str:
     """Normalize and validate employee names."""
     name = (str(raw_name or "")).strip()
@@ -29,3 +39,56 @@ def create_employee(config: Mapping[str, Any], payload: Mapping[str, Any]) -> Di
     name = _validate_employee_name(payload.get("name"))
     employee_id = employees_repository.insert_employee(config, name)
     return {"id": employee_id, "name": name}
+
+
+def _parse_timeline_date(raw: Optional[str], default: date) -> date:
+    if not raw:
+        return default
+    try:
+        return date.fromisoformat(str(raw))
+    except ValueError as exc:
+        raise EmployeeValidationError("dates must be YYYY-MM-DD") from exc
+
+
+def get_usage_timeline(
+    config: Mapping[str, Any],
+    employee_id: int,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    today: Optional[date] = None,
+) -> Dict[str, Any]:
+    """Return daily days-used / days-remaining for an employee over a date range."""
+    today = today or date.today()
+    start_date = _parse_timeline_date(start, today)
+    end_date = _parse_timeline_date(end, start_date + timedelta(days=179))
+    if end_date < start_date:
+        raise EmployeeValidationError("end must not be before start")
+    if (end_date - start_date).days + 1 > MAX_TIMELINE_DAYS:
+        raise EmployeeValidationError(f"range must not exceed {MAX_TIMELINE_DAYS} days")
+
+    # Ranges inside the persisted forward projection are a slice, not a simulation
+    with closing(employees_repository.connect(config)) as conn:
+        projection = load_projection(conn, employee_id, today)
+    if projection is not None and projection.covers(start_date, end_date):
+        return {
+            "employee_id": employee_id,
+            "start": start_date.isoformat(),
+            "end": end_date.isoformat(),
+            "limit": PROJECTION_LIMIT,
+            "days_used": projection.days_used_between(start_date, end_date).tolist(),
+            "days_remaining": projection.days_remaining_between(start_date, end_date).tolist(),
+        }
+
+    trips = employees_repository.fetch_trips(config, employee_id)
+    if trips is None:
+        raise EmployeeNotFoundError("employee not found")
+
+    timeline = usage_timeline(presence_days(trips, COMPLIANCE_START_DATE), start_date, end_date)
+    return {
+        "employee_id": employee_id,
+        "start": start_date.isoformat(),
+        "end": end_date.isoformat(),
+        "limit": timeline["limit"],
+        "days_used": timeline["days_used"].tolist(),
+        "days_remaining": timeline["days_remaining"].tolist(),
+    }
@@ -10,6 +10,7 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from app.repositories import reports_repository
 from .rolling90 import presence_days, days_used_in_window
+from .compliance_shards import sharded_batch_compliance
 
 
 def calculate_eu_days_from_trips(trips: List[Dict], reference_date: datetime.date) -> int:
@@ -151,10 +152,14 @@ def export_all_employees_report_pdf(db_path: str) -> bytes:
     employees = reports_repository.fetch_employees_with_trips(db_path)
     today = datetime.now().date()
     employee_data = []
+    compliance = sharded_batch_compliance(
+        {emp['id']: emp.get('trips', []) for emp in employees},
+        today,
+    ).results
     
     for emp in employees:
         trips = emp.get('trips', [])
-        days_used = calculate_eu_days_from_trips(trips, today)
+        days_used = compliance[emp['id']]['days_used']
         trip_count = len(trips)
         employee_data.append({
             'name': emp['name'],
@@ -0,0 +1,181 @@
+"""
+Persistent per-employee presence bitmap.
+
+Each employee's Schengen presence is stored in ``employee_presence_bitmap`` as
+one bit per day from ``COMPLIANCE_START_DATE`` (bit ``i`` of byte ``i // 8`` is
+day ``base_ord + i``), roughly 46 bytes per employee per year. Loading presence
+is a single row read, and a window count is a popcount over the byte slice
+covering the window. Triggers on ``trips`` drop an employee's bitmap on any
+trip write; it is rebuilt with the snapshot refresh or the incremental calendar
+delta that follows; until then loads build it from trips in memory.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.repositories import compliance_repository, presence_bitmap_repository
+from .rolling90 import COMPLIANCE_START_DATE, WINDOW_DAYS, PresenceCalendar, PresenceSet, presence_days
+
+BASE_ORD = COMPLIANCE_START_DATE.toordinal()
+
+
+class PresenceBitmap:
+    """Presence days from ``base_ord`` packed eight to a byte, least significant bit first."""
+
+    __slots__ = ('base_ord', 'bits')
+
+    def __init__(self, base_ord: int = BASE_ORD, bits: Optional[bytearray] = None):
+        self.base_ord = base_ord
+        self.bits = bits if bits is not None else bytearray()
+
+    @classmethod
+    def from_intervals(cls, intervals: Iterable[Tuple[int, int]], base_ord: int = BASE_ORD) -> 'PresenceBitmap':
+        bitmap = cls(base_ord)
+        for start, end in intervals:
+            bitmap.set_range(start, end)
+        return bitmap
+
+    @classmethod
+    def from_trips(cls, trips: Iterable[Mapping[str, Any]]) -> 'PresenceBitmap':
+        return cls.from_intervals(presence_days(list(trips), COMPLIANCE_START_DATE).calendar.intervals)
+
+    @classmethod
+    def from_blob(cls, base_ord: int, blob: Optional[bytes]) -> 'PresenceBitmap':
+        return cls(base_ord, bytearray(blob or b''))
+
+    def to_blob(self) -> bytes:
+        return bytes(self.bits)
+
+    def set_range(self, start: int, end: int) -> None:
+        """Mark the inclusive ordinal range present (days before base_ord are dropped)."""
+        lo = max(start, self.base_ord) - self.base_ord
+        hi = end - self.base_ord
+        if hi < lo:
+            return
+        needed = (hi >> 3) + 1
+        if needed > len(self.bits):
+            self.bits.extend(bytes(needed - len(self.bits)))
+        first, last = lo >> 3, hi >> 3
+        if first == last:
+            self.bits[first] |= ((1 << (hi - lo + 1)) - 1) << (lo & 7)
+            return
+        self.bits[first] |= (0xFF << (lo & 7)) & 0xFF
+        self.bits[first + 1:last] = b'\xff' * (last - first - 1)
+        self.bits[last] |= (1 << ((hi & 7) + 1)) - 1
+
+    def count(self, start_ord: int, end_ord: int) -> int:
+        """Number of presence days in the inclusive ordinal range."""
+        lo = max(start_ord, self.base_ord) - self.base_ord
+        hi = min(end_ord - self.base_ord, len(self.bits) * 8 - 1)
+        if hi < lo:
+            return 0
+        chunk = int.from_bytes(self.bits[lo >> 3:(hi >> 3) + 1], 'little') >> (lo & 7)
+        return (chunk & ((1 << (hi - lo + 1)) - 1)).bit_count()
+
+    def days_used(self, ref_date: date) -> int:
+        """Presence days in the 180 days before ref_date (same window as days_used_in_window)."""
+        ref = ref_date.toordinal()
+        return self.count(ref - WINDOW_DAYS, ref - 1)
+
+    def __contains__(self, ordinal: int) -> bool:
+        index = ordinal - self.base_ord
+        return 0 <= index < len(self.bits) * 8 and bool(self.bits[index >> 3] >> (index & 7) & 1)
+
+    def __len__(self) -> int:
+        return int.from_bytes(self.bits, 'little').bit_count()
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Merged inclusive (start_ordinal, end_ordinal) runs of set bits."""
+        runs: List[Tuple[int, int]] = []
+        start = None
+        for index, byte in enumerate(self.bits):
+            if byte in (0, 0xFF) and (start is None) == (byte == 0):
+                continue  # whole byte continues the current state
+            for bit in range(8):
+                present = byte >> bit & 1
+                if present and start is None:
+                    start = index * 8 + bit
+                elif not present and start is not None:
+                    runs.append((self.base_ord + start, self.base_ord + index * 8 + bit - 1))
+                    start = None
+        if start is not None:
+            runs.append((self.base_ord + start, self.base_ord + len(self.bits) * 8 - 1))
+        return runs
+
+    def calendar(self) -> PresenceCalendar:
+        return PresenceCalendar(self.intervals())
+
+    def presence(self) -> PresenceSet:
+        """Presence as the set type returned by presence_days, for the rolling90 helpers."""
+        return PresenceSet(self.calendar())
+
+
+def store_bitmaps(
+    conn: sqlite3.Connection,
+    trips_by_employee: Mapping[int, Iterable[Mapping[str, Any]]],
+    employee_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, PresenceBitmap]:
+    """
+    Rebuild and persist bitmaps from already-loaded trips, without committing.
+
+    ``employee_ids`` are the ids that were requested (None for everyone); those
+    missing from ``trips_by_employee`` no longer exist and lose their bitmap.
+    """
+    presence_bitmap_repository.ensure_schema(conn)
+    bitmaps = {employee_id: PresenceBitmap.from_trips(trips) for employee_id, trips in trips_by_employee.items()}
+    presence_bitmap_repository.save_presence_bitmaps(
+        conn, [(employee_id, bitmap.base_ord, bitmap.to_blob()) for employee_id, bitmap in bitmaps.items()]
+    )
+    if employee_ids is None:
+        presence_bitmap_repository.delete_presence_bitmaps(conn)
+    else:
+        presence_bitmap_repository.delete_presence_bitmaps(
+            conn, [employee_id for employee_id in employee_ids if int(employee_id) not in trips_by_employee]
+        )
+    return bitmaps
+
+
+def save_bitmap_intervals(conn: sqlite3.Connection, employee_id: int, intervals: Iterable[Tuple[int, int]]) -> None:
+    """Persist an employee's bitmap from merged presence intervals, without committing."""
+    presence_bitmap_repository.ensure_schema(conn)
+    bitmap = PresenceBitmap.from_intervals(intervals)
+    presence_bitmap_repository.save_presence_bitmaps(conn, [(employee_id, bitmap.base_ord, bitmap.to_blob())])
+
+
+def load_bitmaps(
+    conn: sqlite3.Connection,
+    employee_ids: Optional[Iterable[int]] = None,
+) -> Dict[int, PresenceBitmap]:
+    """
+    Bitmaps keyed by employee id for existing employees (all when ids is None).
+
+    Employees without a persisted bitmap are built from their trips in memory;
+    nothing is written, so the caller's transaction is left alone. The snapshot
+    refresh and the calendar delta persist them.
+    """
+    requested = None if employee_ids is None else list(employee_ids)
+    presence_bitmap_repository.ensure_schema(conn)
+    stored = presence_bitmap_repository.fetch_presence_bitmaps(conn, requested)
+    if requested is None:
+        requested = [row[0] for row in conn.execute("SELECT id FROM employees").fetchall()]
+        stored = {employee_id: stored[employee_id] for employee_id in requested if employee_id in stored}
+    bitmaps = {
+        employee_id: PresenceBitmap.from_blob(base_ord, blob)
+        for employee_id, (base_ord, blob) in stored.items()
+        if base_ord == BASE_ORD
+    }
+    missing = [int(employee_id) for employee_id in requested if int(employee_id) not in bitmaps]
+    if missing:
+        trips_by_employee = compliance_repository.fetch_trips_by_employee(conn, missing)
+        bitmaps.update(
+            (employee_id, PresenceBitmap.from_trips(trips)) for employee_id, trips in trips_by_employee.items()
+        )
+    return bitmaps
+
+
+def load_bitmap(conn: sqlite3.Connection, employee_id: int) -> Optional[PresenceBitmap]:
+    """The employee's bitmap, or None when the employee does not exist."""
+    return load_bitmaps(conn, [employee_id]).get(int(employee_id))
@@ -0,0 +1,335 @@
+"""
+Incremental presence maintenance for trip edits.
+
+Each employee's Schengen presence is persisted as a per-day coverage count (how
+many trips cover each day) in ``employee_presence_counts``. After a trip
+mutation only the days whose count crossed zero change presence. Those days map
+directly onto the reference dates whose 180-day window totals moved, so the
+snapshot, alerts and risk series are only recomputed where an edit actually
+changed something.
+"""
+
+from __future__ import annotations
+
+import sqlite3
+import sys
+from array import array
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.repositories import compliance_repository, data_version_repository, presence_repository
+from app.repositories.data_version_repository import employee_scope
+from .presence_bitmap import save_bitmap_intervals
+from .rolling90 import COMPLIANCE_START_DATE, WINDOW_DAYS, is_schengen_country
+
+
+def trip_interval(
+    trip: Optional[Mapping[str, Any]],
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive ordinal interval a trip contributes to presence, or None.
+
+    Mirrors presence_days: non-Schengen trips, unparsable or reversed dates and
+    trips entering before compliance_start_date contribute nothing.
+    """
+    if not trip:
+        return None
+    if trip.get('is_schengen') is not None and trip.get('entry_ord') is not None and trip.get('exit_ord') is not None:
+        # Normalised columns written with the trip
+        entry_ord, exit_ord = trip['entry_ord'], trip['exit_ord']
+        if not trip['is_schengen'] or entry_ord > exit_ord:
+            return None
+        if compliance_start_date and entry_ord < compliance_start_date.toordinal():
+            return None
+        return entry_ord, exit_ord
+    country = trip.get('country') or trip.get('country_code') or ''
+    if not is_schengen_country(country):
+        return None
+    try:
+        entry = trip['entry_date']
+        exit_d = trip['exit_date']
+        entry = entry if isinstance(entry, date) else date.fromisoformat(str(entry))
+        exit_d = exit_d if isinstance(exit_d, date) else date.fromisoformat(str(exit_d))
+    except (KeyError, TypeError, ValueError):
+        return None
+    if entry > exit_d:
+        return None
+    if compliance_start_date and entry < compliance_start_date:
+        return None
+    return entry.toordinal(), exit_d.toordinal()
+
+
+class CoverageCounts:
+    """Number of trips covering each day, stored densely from ``base_ord``."""
+
+    def __init__(self, base_ord: Optional[int] = None, counts: Optional[array] = None):
+        self.base_ord = base_ord
+        self.counts = counts if counts is not None else array('H')
+
+    @classmethod
+    def from_trips(
+        cls,
+        trips: Iterable[Mapping[str, Any]],
+        compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    ) -> 'CoverageCounts':
+        coverage = cls()
+        for trip in trips:
+            interval = trip_interval(trip, compliance_start_date)
+            if interval:
+                coverage.apply(interval, 1)
+        return coverage
+
+    @classmethod
+    def from_blob(cls, base_ord: Optional[int], blob: Optional[bytes]) -> 'CoverageCounts':
+        counts = array('H')
+        if blob:
+            counts.frombytes(blob)
+            if sys.byteorder != 'little':
+                counts.byteswap()
+        return cls(base_ord, counts)
+
+    def to_blob(self) -> bytes:
+        if sys.byteorder != 'little':
+            swapped = array('H', self.counts)
+            swapped.byteswap()
+            return swapped.tobytes()
+        return self.counts.tobytes()
+
+    def copy(self) -> 'CoverageCounts':
+        return CoverageCounts(self.base_ord, array('H', self.counts))
+
+    def _ensure_range(self, start: int, end: int) -> None:
+        if self.base_ord is None:
+            self.base_ord = start
+            self.counts = array('H', bytes(2 * (end - start + 1)))
+            return
+        if start < self.base_ord:
+            self.counts[0:0] = array('H', bytes(2 * (self.base_ord - start)))
+            self.base_ord = start
+        last = self.base_ord + len(self.counts) - 1
+        if end > last:
+            self.counts.extend(array('H', bytes(2 * (end - last))))
+
+    def apply(self, interval: Tuple[int, int], sign: int) -> List[int]:
+        """
+        Add (sign=1) or remove (sign=-1) one trip interval.
+
+        Returns the ordinals whose presence flipped (count crossed zero).
+        """
+        start, end = interval
+        if sign > 0:
+            self._ensure_range(start, end)
+        elif self.base_ord is None:
+            return []
+        counts = self.counts
+        base = self.base_ord
+        flipped = []
+        lo = max(start - base, 0)
+        hi = min(end - base, len(counts) - 1)
+        for index in range(lo, hi + 1):
+            if sign > 0:
+                counts[index] += 1
+                if counts[index] == 1:
+                    flipped.append(base + index)
+            elif counts[index]:
+                counts[index] -= 1
+                if counts[index] == 0:
+                    flipped.append(base + index)
+        return flipped
+
+    def __contains__(self, ordinal: int) -> bool:
+        if self.base_ord is None:
+            return False
+        index = ordinal - self.base_ord
+        return 0 <= index < len(self.counts) and self.counts[index] > 0
+
+    def days_used(self, ref_date: date) -> int:
+        """Presence days in the 180 days before ref_date (same window as days_used_in_window)."""
+        if self.base_ord is None:
+            return 0
+        ref = ref_date.toordinal()
+        lo = max(ref - WINDOW_DAYS - self.base_ord, 0)
+        hi = min(ref - 1 - self.base_ord, len(self.counts) - 1)
+        counts = self.counts
+        return sum(1 for index in range(lo, hi + 1) if counts[index])
+
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Merged presence intervals, for comparison with PresenceCalendar."""
+        runs: List[Tuple[int, int]] = []
+        if self.base_ord is None:
+            return runs
+        start = None
+        for index, value in enumerate(self.counts):
+            if value and start is None:
+                start = index
+            elif not value and start is not None:
+                runs.append((self.base_ord + start, self.base_ord + index - 1))
+                start = None
+        if start is not None:
+            runs.append((self.base_ord + start, self.base_ord + len(self.counts) - 1))
+        return runs
+
+
+def window_changes(presence_changes: Mapping[int, int]) -> List[Tuple[date, date, int]]:
+    """
+    Reference-date ranges whose window total changed, with the change.
+
+    ``presence_changes`` maps a day ordinal to +1 (became present) or -1 (no longer
+    present). A day d is counted by the windows of reference dates d+1 .. d+180, so
+    the result is a sorted list of maximal (first_ref, last_ref, delta) runs with
+    delta != 0.
+    """
+    events: Dict[int, int] = {}
+    for ordinal, sign in presence_changes.items():
+        if sign:
+            events[ordinal + 1] = events.get(ordinal + 1, 0) + sign
+            events[ordinal + WINDOW_DAYS + 1] = events.get(ordinal + WINDOW_DAYS + 1, 0) - sign
+
+    changes: List[Tuple[date, date, int]] = []
+    running = 0
+    points = sorted(events)
+    for position, point in enumerate(points):
+        running += events[point]
+        if running and position + 1 < len(points):
+            first, last = point, points[position + 1] - 1
+            if changes and changes[-1][2] == running and changes[-1][1].toordinal() == first - 1:
+                changes[-1] = (changes[-1][0], date.fromordinal(last), running)
+            else:
+                changes.append((date.fromordinal(first), date.fromordinal(last), running))
+    return changes
+
+
+@dataclass
+class PresenceDelta:
+    """Effect of one trip mutation on an employee's presence and window totals."""
+
+    employee_id: int
+    presence_changes: Dict[int, int] = field(default_factory=dict)
+    window_changes: List[Tuple[date, date, int]] = field(default_factory=list)
+    coverage: Optional[CoverageCounts] = None
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.window_changes)
+
+    def affects(self, start: date, end: Optional[date] = None) -> bool:
+        """True when any reference date in [start, end] had its window total changed."""
+        end = end or start
+        return any(first <= end and last >= start for first, last, _ in self.window_changes)
+
+
+def apply_trip_delta(
+    coverage: CoverageCounts,
+    old_interval: Optional[Tuple[int, int]],
+    new_interval: Optional[Tuple[int, int]],
+) -> Dict[int, int]:
+    """Replace old_interval with new_interval in ``coverage``; return net presence flips."""
+    net: Dict[int, int] = {}
+    if old_interval:
+        for ordinal in coverage.apply(old_interval, -1):
+            net[ordinal] = net.get(ordinal, 0) - 1
+    if new_interval:
+        for ordinal in coverage.apply(new_interval, 1):
+            net[ordinal] = net.get(ordinal, 0) + 1
+    return {ordinal: sign for ordinal, sign in net.items() if sign}
+
+
+def presence_changes(previous: CoverageCounts, current: CoverageCounts) -> Dict[int, int]:
+    """Days present in ``current`` but not ``previous`` (+1) and the reverse (-1)."""
+    spans = [(c.base_ord, c.base_ord + len(c.counts) - 1) for c in (previous, current) if c.base_ord is not None]
+    if not spans:
+        return {}
+    changes: Dict[int, int] = {}
+    for ordinal in range(min(lo for lo, _ in spans), max(hi for _, hi in spans) + 1):
+        was_present, is_present = ordinal in previous, ordinal in current
+        if was_present != is_present:
+            changes[ordinal] = 1 if is_present else -1
+    return changes
+
+
+def _employee_interval(
+    trip: Optional[Mapping[str, Any]],
+    employee_id: int,
+    compliance_start_date: Optional[date],
+) -> Optional[Tuple[int, int]]:
+    """The trip's interval when it belongs to employee_id (a trip may move between employees)."""
+    if not trip or trip.get('employee_id') is None or int(trip['employee_id']) != employee_id:
+        return None
+    return trip_interval(trip, compliance_start_date)
+
+
+def record_trip_change(
+    conn: sqlite3.Connection,
+    before: Optional[Mapping[str, Any]],
+    after: Optional[Mapping[str, Any]],
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> Dict[int, PresenceDelta]:
+    """
+    Bring the persisted coverage counts up to date after a committed trip write.
+
+    ``before``/``after`` are the trip rows (employee_id, entry_date, exit_date,
+    country) before and after the write; None for a create or delete. Call this
+    after the trip write has been committed. Returns a PresenceDelta per affected
+    employee and commits the updated counts and presence bitmaps.
+
+    Counts are stamped with the employee's data version (see
+    data_version_repository); each trip write bumps it by one. Under a write
+    lock, counts stamped one version behind are missing exactly this write, so
+    the old interval is swapped for the new one without reading the employee's
+    trips. Counts whose stamp matches already include the write (another worker
+    rebuilt them), so nothing changed. Any other stamp means a write was missed:
+    the counts are rebuilt from the employee's trips read in the same transaction
+    and the reported changes are the difference from the stored counts. Without
+    stored counts every present day is reported.
+    """
+    employee_ids = [
+        int(trip['employee_id']) for trip in (before, after) if trip and trip.get('employee_id') is not None
+    ]
+    employee_ids = list(dict.fromkeys(employee_ids))
+    if not employee_ids:
+        return {}
+
+    presence_repository.ensure_schema(conn)
+    data_version_repository.ensure_schema(conn)
+    deltas: Dict[int, PresenceDelta] = {}
+    # Hold the write lock from reading the stored counts until they are saved
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        versions = data_version_repository.fetch_versions(conn, [employee_scope(e) for e in employee_ids])
+        for employee_id in employee_ids:
+            version = versions[employee_scope(employee_id)]
+            stored = presence_repository.fetch_presence_counts(conn, employee_id)
+            previous = CoverageCounts.from_blob(stored[0], stored[1]) if stored is not None else None
+            if stored is not None and stored[2] == version:
+                deltas[employee_id] = PresenceDelta(employee_id, {}, [], previous)
+                continue
+            if stored is not None and stored[2] is not None and stored[2] == version - 1:
+                coverage = previous.copy()
+                flips = apply_trip_delta(
+                    coverage,
+                    _employee_interval(before, employee_id, compliance_start_date),
+                    _employee_interval(after, employee_id, compliance_start_date),
+                )
+            else:
+                trips = compliance_repository.fetch_trips_by_employee(conn, [employee_id]).get(employee_id, [])
+                coverage = CoverageCounts.from_trips(trips, compliance_start_date)
+                flips = presence_changes(previous or CoverageCounts(), coverage)
+            presence_repository.save_presence_counts(
+                conn, employee_id, coverage.base_ord, coverage.to_blob(), version
+            )
+            if compliance_start_date == COMPLIANCE_START_DATE:
+                save_bitmap_intervals(conn, employee_id, coverage.intervals())
+            deltas[employee_id] = PresenceDelta(employee_id, flips, window_changes(flips), coverage)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return deltas
+
+
+def discard_presence_counts(conn: sqlite3.Connection, employee_ids: Optional[Iterable[int]] = None) -> None:
+    """Drop persisted counts after a write whose delta is unknown; they rebuild on next use."""
+    presence_repository.ensure_schema(conn)
+    presence_repository.delete_presence_counts(conn, employee_ids)
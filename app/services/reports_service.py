@@ -4,11 +4,12 @@ from __future__ import annotations
 
 import csv
 import io
-from datetime import date
-from typing import Any, Dict, List, Sequence, Tuple
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from app.repositories import reports_repository
-from .compliance_forecast import get_all_future_jobs_for_employee
+from .compliance_shards import sharded_future_jobs
+from .rolling90 import COMPLIANCE_START_DATE, get_risk_level, presence_days, usage_timeline
 
 
 FUTURE_ALERT_HEADERS = [
@@ -24,6 +25,17 @@ FUTURE_ALERT_HEADERS = [
     'Compliant From',
 ]
 
+AS_OF_HEADERS = [
+    'Employee',
+    'Date',
+    'Days Used',
+    'Days Remaining',
+    'Risk Level',
+    'Over Limit',
+]
+
+MAX_AS_OF_RANGE_DAYS = 366
+
 
 def _format_date(value) -> str:
     if not value:
@@ -40,16 +52,14 @@ def get_future_alerts(
 ) -> List[Dict[str, Any]]:
     """Collect future job alerts for all employees."""
     employees = reports_repository.fetch_employees_with_trips(db_path)
+    future_jobs_by_employee = sharded_future_jobs(
+        {emp['id']: emp.get('trips', []) for emp in employees},
+        warning_threshold,
+        compliance_start_date,
+    ).results
     forecasts: List[Dict[str, Any]] = []
     for emp in employees:
-        trips = emp.get('trips', [])
-        future_jobs = get_all_future_jobs_for_employee(
-            emp['id'],
-            trips,
-            warning_threshold,
-            compliance_start_date,
-        )
-        for forecast in future_jobs:
+        for forecast in future_jobs_by_employee[emp['id']]:
             enriched = dict(forecast)
             enriched['employee_name'] = emp['name']
             forecasts.append(enriched)
@@ -117,3 +127,106 @@ def generate_future_alerts_csv(
     for forecast in forecasts:
         writer.writerow(_forecast_to_row(forecast))
     return output.getvalue()
+
+
+def _employee_calendars(db_path: str, compliance_start_date: Optional[date]):
+    """(id, name, PresenceCalendar) for every employee, from one trips query."""
+    return [
+        (emp['id'], emp['name'], presence_days(emp.get('trips', []), compliance_start_date).calendar)
+        for emp in reports_repository.fetch_employees_with_trips(db_path)
+    ]
+
+
+def compliance_as_of(
+    db_path: str,
+    as_of: date,
+    risk_thresholds: Dict[str, int],
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> List[Dict[str, Any]]:
+    """
+    Status of every employee at a past or future reference date.
+
+    Each employee's presence is indexed once (merged intervals with prefix
+    sums), so the window count is a pair of bisects however long the history.
+    """
+    results = []
+    for employee_id, name, calendar in _employee_calendars(db_path, compliance_start_date):
+        days_used = calendar.days_used(as_of, compliance_start_date)
+        days_remaining = limit - days_used
+        results.append({
+            'employee_id': employee_id,
+            'employee_name': name,
+            'date': as_of.isoformat(),
+            'days_used': days_used,
+            'days_remaining': days_remaining,
+            'risk_level': get_risk_level(days_remaining, risk_thresholds),
+            'over_limit': days_used > limit,
+        })
+    return results
+
+
+def compliance_as_of_range(
+    db_path: str,
+    start_date: date,
+    end_date: date,
+    risk_thresholds: Dict[str, int],
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> Dict[str, Any]:
+    """
+    Per-employee daily status matrix over [start_date, end_date].
+
+    Uses one sliding-window pass per employee (usage_timeline); column ``i`` of
+    every employee row is ``dates[i]``.
+    """
+    if end_date < start_date:
+        raise ValueError('end must not be before start')
+    if (end_date - start_date).days + 1 > MAX_AS_OF_RANGE_DAYS:
+        raise ValueError(f'range must not exceed {MAX_AS_OF_RANGE_DAYS} days')
+
+    employees = []
+    for employee_id, name, calendar in _employee_calendars(db_path, compliance_start_date):
+        timeline = usage_timeline(calendar, start_date, end_date, limit, compliance_start_date)
+        employees.append({
+            'employee_id': employee_id,
+            'employee_name': name,
+            'days_used': timeline['days_used'].tolist(),
+            'days_remaining': timeline['days_remaining'].tolist(),
+            'risk_level': [get_risk_level(value, risk_thresholds) for value in timeline['days_remaining']],
+        })
+    days = (end_date - start_date).days + 1
+    return {
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'limit': limit,
+        'dates': [(start_date + timedelta(days=offset)).isoformat() for offset in range(days)],
+        'employees': employees,
+    }
+
+
+def generate_as_of_csv(
+    db_path: str,
+    start_date: date,
+    end_date: date,
+    risk_thresholds: Dict[str, int],
+    limit: int = 90,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+) -> str:
+    """CSV of every employee's status for each date in the range (one row per employee and date)."""
+    matrix = compliance_as_of_range(db_path, start_date, end_date, risk_thresholds, limit, compliance_start_date)
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(AS_OF_HEADERS)
+    for employee in matrix['employees']:
+        for index, day in enumerate(matrix['dates']):
+            days_used = employee['days_used'][index]
+            writer.writerow([
+                employee['employee_name'],
+                _format_date(date.fromisoformat(day)),
+                days_used,
+                employee['days_remaining'][index],
+                employee['risk_level'][index],
+                'Yes' if days_used > limit else 'No',
+            ])
+    return output.getvalue()
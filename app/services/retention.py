@@ -2,6 +2,8 @@ import sqlite3
 from datetime import datetime, timedelta
 from typing import Dict, List
 
+from .compliance_snapshot import refresh_snapshots_safely
+
 
 def calculate_retention_cutoff(retention_months: int) -> str:
     """Calculate the cutoff date for retention policy.
@@ -57,6 +59,10 @@ def purge_expired_trips(db_path: str, retention_months: int) -> Dict[str, int]:
     employees_deleted = c.rowcount
     
     conn.commit()
+    # A purge can touch most of the workforce, so roll every snapshot forward
+    # (this also drops rows, counts and cached entries for deleted employees)
+    if affected_employees:
+        refresh_snapshots_safely(conn)
     conn.close()
     
     return {
@@ -6,12 +6,20 @@ This module provides functions to calculate:
 2. Days used within any rolling 180-day window
 3. The earliest safe re-entry date for an employee
 
+Window queries are answered by a PresenceCalendar, which stores presence as
+merged (start, end) day-ordinal intervals with cumulative lengths, so a
+180-day count is interval-overlap arithmetic rather than a walk over days.
+The set-based functions below remain as thin adapters over that engine.
+
 Compliance tracking started on October 12, 2025. Trips before this date are excluded from all calculations.
 """
 
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Set as AbstractSet
 from datetime import date, timedelta
-from typing import List, Dict, Optional, Set
-from functools import lru_cache
+from itertools import accumulate
+from typing import Iterable, List, Dict, Optional, Set, Tuple
 
 # Fixed compliance start date - when tracking began
 # Trips before this date are excluded from all calculations
@@ -98,20 +106,339 @@ def is_schengen_country(country_code_or_name: str) -> bool:
     return bool(code and code in SCHENGEN_COUNTRIES)
 
 
+def normalize_country_code(country_code_or_name: str) -> str:
+    """Upper-case two-letter code for a code or known country name; stripped upper-case input otherwise."""
+    country_str = str(country_code_or_name or '').strip()
+    if len(country_str) == 2:
+        return country_str.upper()
+    return SCHENGEN_NAME_LOOKUP.get(country_str.lower(), country_str.upper())
+
+
+def _to_ordinal(value) -> Optional[int]:
+    if isinstance(value, date):
+        return value.toordinal()
+    try:
+        return date.fromisoformat(str(value)).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+def normalized_trip_columns(entry_date, exit_date, country) -> Dict[str, object]:
+    """
+    Write-time values for the trips table's normalised columns.
+
+    Returns entry_ord/exit_ord (date ordinals, None when unparsable), the
+    normalised country_code and is_schengen (0/1) so readers can skip date
+    parsing and country lookups.
+    """
+    return {
+        'entry_ord': _to_ordinal(entry_date),
+        'exit_ord': _to_ordinal(exit_date),
+        'country_code': normalize_country_code(country),
+        'is_schengen': 1 if is_schengen_country(country) else 0,
+    }
+
+
+def _normalized_intervals(trips: List[Dict], compliance_start_date: Optional[date]) -> Optional[List[Tuple[int, int]]]:
+    """Intervals from pre-computed trip columns, or None if any trip lacks them."""
+    cs_ord = compliance_start_date.toordinal() if compliance_start_date else None
+    intervals = []
+    for trip in trips:
+        try:
+            is_schengen = trip['is_schengen']
+            entry_ord = trip['entry_ord']
+            exit_ord = trip['exit_ord']
+        except (KeyError, IndexError, TypeError):
+            return None
+        if is_schengen is None or entry_ord is None or exit_ord is None:
+            return None
+        if not is_schengen or entry_ord > exit_ord:
+            continue
+        if cs_ord is not None and entry_ord < cs_ord:
+            continue
+        intervals.append((entry_ord, exit_ord))
+    return intervals
+
+
+# Each window covers the 180 days before the reference date (the reference day itself is excluded).
+WINDOW_DAYS = 180
+
+
+def merge_intervals(intervals: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """
+    Merge inclusive ordinal intervals into a sorted, non-overlapping list.
+
+    Touching intervals (e.g. a trip ending on the day the next one starts, or the
+    day before) are coalesced so every presence day belongs to exactly one run.
+    """
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(intervals):
+        if end < start:
+            continue
+        if merged and start <= merged[-1][1] + 1:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class PresenceCalendar:
+    """
+    Presence held as merged inclusive (start_ordinal, end_ordinal) intervals.
+
+    ``_before[i]`` is the number of presence days in all intervals preceding
+    interval ``i``, so counting an ordinal range is a pair of bisects plus
+    overlap arithmetic on the boundary intervals. Memory and time scale with
+    the number of trips rather than the number of days travelled.
+
+    Example:
+        >>> calendar = PresenceCalendar([(date(2025, 11, 1).toordinal(), date(2025, 11, 2).toordinal())])
+        >>> calendar.days_used(date(2025, 11, 10))
+        2
+    """
+
+    __slots__ = ('_starts', '_ends', '_before')
+
+    def __init__(self, intervals: Iterable[Tuple[int, int]] = ()):
+        merged = merge_intervals(intervals)
+        self._starts = array('l', (start for start, _ in merged))
+        self._ends = array('l', (end for _, end in merged))
+        self._before = array('l', [0])
+        self._before.extend(accumulate(end - start + 1 for start, end in merged))
+
+    @classmethod
+    def from_dates(cls, days: Iterable[date]) -> 'PresenceCalendar':
+        """Build a calendar from an iterable of presence dates."""
+        return cls((ordinal, ordinal) for ordinal in {day.toordinal() for day in days})
+
+    @property
+    def intervals(self) -> List[Tuple[int, int]]:
+        """Merged (start_ordinal, end_ordinal) intervals, oldest first."""
+        return list(zip(self._starts, self._ends))
+
+    def __len__(self) -> int:
+        return self._before[-1]
+
+    def __contains__(self, ordinal: int) -> bool:
+        index = bisect_right(self._starts, ordinal) - 1
+        return index >= 0 and ordinal <= self._ends[index]
+
+    def _count_through(self, ordinal: int) -> int:
+        """Number of presence days on or before ``ordinal``."""
+        index = bisect_right(self._starts, ordinal) - 1
+        if index < 0:
+            return 0
+        return self._before[index] + min(ordinal, self._ends[index]) - self._starts[index] + 1
+
+    def count(self, start_ord: int, end_ord: int) -> int:
+        """Return the number of presence days in the inclusive ordinal range."""
+        if end_ord < start_ord:
+            return 0
+        return self._count_through(end_ord) - self._count_through(start_ord - 1)
+
+    def first_on_or_after(self, ordinal: int) -> Optional[int]:
+        """Return the first presence ordinal >= ``ordinal``, or None."""
+        index = bisect_left(self._ends, ordinal)
+        if index >= len(self._ends):
+            return None
+        return max(ordinal, self._starts[index])
+
+    def days_used(self, ref_date: date, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> int:
+        """Count presence days in the window [ref_date - 180, ref_date - 1]."""
+        ref = ref_date.toordinal()
+        window_start = ref - WINDOW_DAYS
+        if compliance_start_date:
+            window_start = max(window_start, compliance_start_date.toordinal())
+        return self.count(window_start, ref - 1)
+
+    def earliest_safe_entry(self, today: date, limit: int = 90, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> Optional[date]:
+        """Single forward sweep equivalent of :func:`earliest_safe_entry`."""
+        if self.days_used(today, compliance_start_date) <= limit - 1:
+            return None
+
+        window_start_today = today.toordinal() - (WINDOW_DAYS - 1)
+        if compliance_start_date:
+            window_start_today = max(window_start_today, compliance_start_date.toordinal())
+        oldest_relevant = self.first_on_or_after(window_start_today)
+        if oldest_relevant is None:
+            return None
+
+        # Each probe is O(log intervals), so scanning the next 180 days stays cheap.
+        for offset in range(1, WINDOW_DAYS + 1):
+            check_date = today + timedelta(days=offset)
+            if self.days_used(check_date, compliance_start_date) <= limit - 1:
+                return check_date
+
+        return date.fromordinal(oldest_relevant + WINDOW_DAYS)
+
+
+class PresenceSet(AbstractSet):
+    """
+    Read-only set of presence dates backed by a PresenceCalendar.
+
+    Returned by :func:`presence_days`. Membership and ``len`` are answered from
+    the merged intervals; individual ``date`` objects are only created if a
+    caller iterates the set.
+    """
+
+    __slots__ = ('calendar',)
+
+    def __init__(self, calendar: PresenceCalendar):
+        self.calendar = calendar
+
+    def __contains__(self, day) -> bool:
+        return isinstance(day, date) and day.toordinal() in self.calendar
+
+    def __len__(self) -> int:
+        return len(self.calendar)
+
+    def __iter__(self):
+        for start, end in self.calendar.intervals:
+            for ordinal in range(start, end + 1):
+                yield date.fromordinal(ordinal)
+
+    __hash__ = AbstractSet._hash
+
+    def __repr__(self) -> str:
+        return f"PresenceSet({self.calendar.intervals!r})"
+
+
+def presence_calendar(presence: Iterable[date]) -> PresenceCalendar:
+    """Return the PresenceCalendar for a presence set, reusing a cached one when available."""
+    if isinstance(presence, PresenceCalendar):
+        return presence
+    calendar = getattr(presence, 'calendar', None)
+    if isinstance(calendar, PresenceCalendar):
+        return calendar
+    return PresenceCalendar.from_dates(presence)
+
+
+def usage_timeline(presence: Iterable[date], start_date: date, end_date: date, limit: int = 90, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> Dict[str, object]:
+    """
+    Return days used / remaining for every date in [start_date, end_date] in one pass.
+
+    Presence is laid out once over [start_date - 180, end_date - 1] and the
+    180-day window slides a day at a time, so the cost is O(range + trips)
+    rather than one window count per date. Each entry matches
+    days_used_in_window / calculate_days_remaining for that date.
+
+    Args:
+        presence: Presence set (or PresenceCalendar) for the employee
+        start_date: First date in the timeline
+        end_date: Last date in the timeline (inclusive)
+        limit: Maximum allowed days (default 90)
+        compliance_start_date: Optional date when compliance tracking started. Days before this are excluded.
+
+    Returns:
+        Dict with 'start_date', 'end_date', 'limit' and compact ``array('h')``
+        columns 'days_used' and 'days_remaining' (index 0 is start_date).
+    """
+    used = array('h')
+    if end_date >= start_date:
+        calendar = presence_calendar(presence)
+        axis_start = start_date.toordinal() - WINDOW_DAYS
+        span = end_date.toordinal() - axis_start
+        floor = 0
+        if compliance_start_date:
+            floor = max(0, compliance_start_date.toordinal() - axis_start)
+
+        occupied = bytearray(span)
+        for start, end in calendar.intervals:
+            lo = max(start - axis_start, floor)
+            hi = min(end - axis_start, span - 1)
+            if lo <= hi:
+                occupied[lo:hi + 1] = b'\x01' * (hi - lo + 1)
+
+        # occupied[i] covers axis_start + i; the window for start_date + k is
+        # occupied[k:k + 180], so each step adds one day and drops one.
+        current = sum(occupied[:WINDOW_DAYS])
+        used.append(current)
+        for k in range(1, span - WINDOW_DAYS + 1):
+            current += occupied[k + WINDOW_DAYS - 1] - occupied[k - 1]
+            used.append(current)
+
+    return {
+        'start_date': start_date,
+        'end_date': end_date,
+        'limit': limit,
+        'days_used': used,
+        'days_remaining': array('h', (limit - value for value in used)),
+    }
+
+
+def max_permissible_stay(presence: Iterable[date], entry_date: date, limit: int = 90, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> Tuple[int, Optional[date]]:
+    """
+    Return the longest continuous stay starting on entry_date that is compliant every day.
+
+    A stay of L days is compliant when, for each day d of the stay, the
+    existing presence plus the stay itself covers at most ``limit`` days of
+    [d - 179, d]. Because any longer stay contains the first failing day, the
+    answer is found by sliding that window forward once from entry_date.
+
+    Args:
+        presence: Existing presence set (or PresenceCalendar) for the employee
+        entry_date: Proposed entry date
+        limit: Maximum allowed days (default 90)
+        compliance_start_date: Optional date when compliance tracking started. Days before this are excluded.
+
+    Returns:
+        Tuple of (max_days, last_day). ``last_day`` is the final permissible
+        day of the stay, or None when the employee cannot enter on entry_date.
+
+    Example:
+        >>> presence = {date(2026, 1, 1) + timedelta(days=i) for i in range(80)}
+        >>> max_permissible_stay(presence, date(2026, 4, 1))
+        (10, date(2026, 4, 10))
+    """
+    calendar = presence_calendar(presence)
+    # Axis covers [entry - 179, entry + 179]; the stay begins at index WINDOW_DAYS - 1.
+    axis_start = entry_date.toordinal() - (WINDOW_DAYS - 1)
+    stay_index = WINDOW_DAYS - 1
+    span = 2 * WINDOW_DAYS - 1
+    floor = 0
+    if compliance_start_date:
+        floor = max(0, compliance_start_date.toordinal() - axis_start)
+
+    # Combined occupancy: existing presence before the stay, then every stay day.
+    combined = bytearray(span)
+    for start, end in calendar.intervals:
+        lo = max(start - axis_start, floor)
+        hi = min(end - axis_start, stay_index - 1)
+        if lo <= hi:
+            combined[lo:hi + 1] = b'\x01' * (hi - lo + 1)
+    stay_from = max(stay_index, floor)
+    if stay_from < span:
+        combined[stay_from:] = b'\x01' * (span - stay_from)
+
+    # Window for stay day k is combined[k:k + 180].
+    count = sum(combined[:WINDOW_DAYS])
+    for k in range(WINDOW_DAYS):
+        if k:
+            count += combined[k + WINDOW_DAYS - 1] - combined[k - 1]
+        if count > limit:
+            if k == 0:
+                return 0, None
+            return k, entry_date + timedelta(days=k - 1)
+    return WINDOW_DAYS, entry_date + timedelta(days=WINDOW_DAYS - 1)
+
+
 def presence_days(trips: List[Dict], compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> Set[date]:
     """
     Return all individual days spent in Schengen from trip date ranges.
     Ireland (IE) trips are excluded from Schengen calculations.
     Trips before compliance_start_date (if provided) are excluded.
     
-    OPTIMIZATION: Uses memoization for repeated calculations (Phase 2).
+    Per-employee results are memoised by services.compliance_cache, keyed by
+    the employee's data version rather than by the trip contents.
     
     Args:
         trips: List of trip dicts with 'entry_date', 'exit_date' (YYYY-MM-DD strings), and 'country' or 'country_code'
         compliance_start_date: Optional date when compliance tracking started. Trips before this date are excluded.
     
     Returns:
-        Set of date objects representing all days present in Schengen
+        Read-only set of date objects representing all days present in Schengen,
+        backed by merged intervals (see PresenceSet)
     
     Example:
         >>> trips = [
@@ -122,6 +449,11 @@ def presence_days(trips: List[Dict], compliance_start_date: Optional[date] = COM
         >>> len(days)
         5  # Only France trip counts (Ireland excluded)
     """
+    # Rows carrying the write-time normalised columns need no parsing or lookups
+    normalized = _normalized_intervals(trips, compliance_start_date) if trips else None
+    if normalized is not None:
+        return PresenceSet(PresenceCalendar(merge_intervals(normalized)))
+
     # Filter trips by compliance start date if provided
     filtered_trips = trips
     if compliance_start_date:
@@ -137,53 +469,37 @@ def presence_days(trips: List[Dict], compliance_start_date: Optional[date] = COM
                 # If we can't parse the date, include it (conservative approach)
                 filtered_trips.append(trip)
     
-    # Create a hashable key from trips for caching
-    # Use a simple tuple of (entry, exit, country) for each trip
-    trips_key = tuple(
-        (
-            str(trip.get('entry_date', '')),
-            str(trip.get('exit_date', '')),
-            str(trip.get('country', '') or trip.get('country_code', ''))
-        )
-        for trip in filtered_trips
-    )
-    
-    # Check cache (use memoized version)
-    # Note: Cache key doesn't include compliance_start_date, so cache may include older trips
-    # This is acceptable as the filtering happens before caching
-    return _presence_days_impl(trips_key)
+    return PresenceSet(PresenceCalendar(_parsed_intervals(filtered_trips)))
 
 
-@lru_cache(maxsize=512)
-def _presence_days_impl(trips_key: tuple) -> Set[date]:
+def _parsed_intervals(trips: Iterable[Dict]) -> List[Tuple[int, int]]:
     """
-    Internal implementation of presence_days with caching.
+    Merged Schengen (start_ordinal, end_ordinal) intervals parsed from trip dates.
+
+    Used for rows without the normalised columns; callers that compute the same
+    employee repeatedly memoise the result through services.compliance_cache.
     """
-    days = set()
-    
-    for trip_tuple in trips_key:
-        entry_str, exit_str, country = trip_tuple
-        
+    intervals = []
+
+    for trip in trips:
+        country = str(trip.get('country', '') or trip.get('country_code', ''))
+
         # Check if this is a Schengen country (exclude Ireland)
         if not is_schengen_country(country):
             continue  # Skip non-Schengen countries (like Ireland)
-        
-        # Parse dates from YYYY-MM-DD strings
-        try:
-            entry = date.fromisoformat(entry_str) if entry_str else None
-            exit_d = date.fromisoformat(exit_str) if exit_str else None
-            if not entry or not exit_d:
-                continue
-        except (ValueError, AttributeError):
+
+        # Parse dates from YYYY-MM-DD strings (date objects pass through)
+        entry_ord = _to_ordinal(trip.get('entry_date'))
+        exit_ord = _to_ordinal(trip.get('exit_date'))
+        if entry_ord is None or exit_ord is None:
             continue
-        
-        # Add all days in the range (inclusive)
-        current = entry
-        while current <= exit_d:
-            days.add(current)
-            current += timedelta(days=1)
-    
-    return days
+
+        # Inclusive range; reversed dates contribute nothing, as before
+        if entry_ord <= exit_ord:
+            intervals.append((entry_ord, exit_ord))
+
+    return merge_intervals(intervals)
+
 
 
 def days_used_in_window(presence: Set[date], ref_date: date, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> int:
@@ -208,19 +524,8 @@ def days_used_in_window(presence: Set[date], ref_date: date, compliance_start_da
         3
     """
     # Tests expect a 180-day window not counting the reference day itself.
-    # Use (ref_date - 180, ref_date - 1) inclusive.
-    window_start = ref_date - timedelta(days=180)
-    window_end = ref_date - timedelta(days=1)
-    
-    # Adjust window_start to not be before compliance_start_date
-    if compliance_start_date:
-        window_start = max(window_start, compliance_start_date)
-    
-    count = 0
-    for day in presence:
-        if window_start <= day <= window_end:
-            count += 1
-    return count
+    # Use (ref_date - 180, ref_date - 1) inclusive; the calendar clamps to compliance_start_date.
+    return presence_calendar(presence).days_used(ref_date, compliance_start_date)
 
 
 def earliest_safe_entry(presence: Set[date], today: date, limit: int = 90, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> Optional[date]:
@@ -247,44 +552,7 @@ def earliest_safe_entry(presence: Set[date], today: date, limit: int = 90, compl
         >>> earliest_safe_entry(presence, date(2024, 1, 1))
         date(2024, 6, 30)  # When oldest days fall out of window
     """
-    # Check if already eligible today
-    used_today = days_used_in_window(presence, today, compliance_start_date)
-    if used_today <= limit - 1:
-        return None  # Already eligible
-    
-    # Search for the earliest safe date
-    # We need to check up to 180 days in the future (when oldest trips fall out)
-    # But realistically, we only need to check up to when the rolling window changes
-    
-    # Find the oldest presence day that affects today's window
-    window_start_today = today - timedelta(days=179)
-    if compliance_start_date:
-        window_start_today = max(window_start_today, compliance_start_date)
-    relevant_days = sorted([d for d in presence if d >= window_start_today])
-    
-    if not relevant_days:
-        return None  # No days in window, already safe
-    
-    # The earliest safe date is when enough old days have fallen out of the window
-    # We need to find when days_used_in_window(presence, check_date) <= 89
-    
-    # Start checking from tomorrow
-    check_date = today + timedelta(days=1)
-    max_check = today + timedelta(days=180)  # Don't check beyond 180 days
-    
-    while check_date <= max_check:
-        used = days_used_in_window(presence, check_date, compliance_start_date)
-        if used <= limit - 1:
-            return check_date
-        check_date += timedelta(days=1)
-    
-    # If we get here, something is wrong or they have continuous presence
-    # Return the theoretical date when the oldest day falls out
-    if relevant_days:
-        oldest_day = min(relevant_days)
-        return oldest_day + timedelta(days=180)
-    
-    return None
+    return presence_calendar(presence).earliest_safe_entry(today, limit, compliance_start_date)
 
 
 def calculate_days_remaining(presence: Set[date], ref_date: date, limit: int = 90, compliance_start_date: Optional[date] = COMPLIANCE_START_DATE) -> int:
@@ -300,7 +568,7 @@ def calculate_days_remaining(presence: Set[date], ref_date: date, limit: int = 9
     Returns:
         Number of days remaining (can be negative if over limit)
     """
-    used = days_used_in_window(presence, ref_date, compliance_start_date)
+    used = presence_calendar(presence).days_used(ref_date, compliance_start_date)
     return limit - used
 
 
@@ -357,14 +625,15 @@ def days_until_compliant(presence: Set[date], today: date, limit: int = 90, comp
         >>> days  # Should be positive number of days
         >>> date  # The exact date they become compliant
     """
-    days_remaining = calculate_days_remaining(presence, today, limit, compliance_start_date)
+    calendar = presence_calendar(presence)
+    days_remaining = limit - calendar.days_used(today, compliance_start_date)
     
     # If already compliant, return 0 days
     if days_remaining >= 0:
         return 0, today
     
     # Find the earliest safe entry date (when they become compliant)
-    safe_entry = earliest_safe_entry(presence, today, limit, compliance_start_date)
+    safe_entry = calendar.earliest_safe_entry(today, limit, compliance_start_date)
     
     if safe_entry is None:
         # This shouldn't happen if days_remaining < 0, but handle gracefully
@@ -2,11 +2,13 @@
 
 from __future__ import annotations
 
-from datetime import date as date_cls
-from typing import Any, Dict, List
+from datetime import date as date_cls, timedelta
+from typing import Any, Dict, List, Optional, Sequence
 
 from app.repositories import scenario_repository
-from .compliance_forecast import calculate_what_if_scenario
+from . import compliance_cache
+from .compliance_forecast import calculate_what_if_scenario, find_job_slots, rank_employees_for_job
+from .rolling90 import COMPLIANCE_START_DATE, max_permissible_stay
 
 
 def list_employees(db_path: str) -> List[Dict[str, Any]]:
@@ -48,3 +50,103 @@ def calculate_scenario(
     if employee_name:
         response["employee_name"] = employee_name
     return response
+
+
+def calculate_max_stay(
+    db_path: str,
+    employee_id: int,
+    entry_iso: str,
+    limit: int = 90,
+) -> Optional[Dict[str, Any]]:
+    """Return the longest compliant continuous stay for an entry date, or None for an unknown employee."""
+    entry_date = date_cls.fromisoformat(entry_iso)
+    employee_name = scenario_repository.fetch_employee_name(db_path, employee_id)
+    if employee_name is None:
+        return None
+    presence = compliance_cache.employee_presence(
+        employee_id, lambda: scenario_repository.fetch_employee_trips(db_path, employee_id)
+    )
+    max_days, last_day = max_permissible_stay(presence, entry_date, limit, COMPLIANCE_START_DATE)
+    return {
+        "employee_id": employee_id,
+        "employee_name": employee_name,
+        "entry_date": entry_date.isoformat(),
+        "max_stay_days": max_days,
+        "last_permissible_day": last_day.isoformat() if last_day else None,
+        "can_enter": max_days > 0,
+    }
+
+
+def find_slots(
+    db_path: str,
+    employee_ids: Sequence[int],
+    duration: int,
+    start_iso: Optional[str] = None,
+    horizon_days: int = 365,
+    max_results: Optional[int] = None,
+    limit: int = 90,
+) -> List[Dict[str, Any]]:
+    """Return feasible job start dates per employee over the planning horizon (unknown ids are skipped)."""
+    horizon_start = date_cls.fromisoformat(start_iso) if start_iso else date_cls.today()
+    horizon_end = horizon_start + timedelta(days=horizon_days - 1)
+    trips_by_employee = scenario_repository.fetch_trips_for_employees(db_path, employee_ids)
+    names = {emp["id"]: emp["name"] for emp in scenario_repository.fetch_employees(db_path)}
+    results = []
+    for employee_id, trips in trips_by_employee.items():
+        slots = find_job_slots(
+            trips,
+            duration,
+            horizon_start,
+            horizon_end,
+            limit,
+            COMPLIANCE_START_DATE,
+            max_results,
+        )
+        results.append(
+            {
+                "employee_id": employee_id,
+                "employee_name": names.get(employee_id, ""),
+                "earliest_start": slots[0].isoformat() if slots else None,
+                "slots": [slot.isoformat() for slot in slots],
+            }
+        )
+    return results
+
+
+def rank_staffing(
+    db_path: str,
+    start_iso: str,
+    end_iso: str,
+    country: str,
+    warning_threshold: int,
+) -> List[Dict[str, Any]]:
+    """Rank every employee by days remaining after a prospective job."""
+    start_date = date_cls.fromisoformat(start_iso)
+    end_date = date_cls.fromisoformat(end_iso)
+    if end_date < start_date:
+        raise ValueError("end_date must not be before start_date")
+    employees = scenario_repository.fetch_employees_with_trips(db_path)
+    names = {emp["id"]: emp["name"] for emp in employees}
+    ranked = rank_employees_for_job(
+        {emp["id"]: emp["trips"] for emp in employees},
+        start_date,
+        end_date,
+        country,
+        warning_threshold,
+    )
+    return [
+        {
+            "rank": position,
+            "employee_id": item["employee_id"],
+            "employee_name": names.get(item["employee_id"], ""),
+            "days_used_before": item["days_used_before_job"],
+            "days_after": item["days_after_job"],
+            "days_remaining": item["days_remaining_after_job"],
+            "risk_level": item["risk_level"],
+            "is_compliant": item["is_compliant"],
+            "compliant_from_date": item["compliant_from_date"].isoformat()
+            if item["compliant_from_date"]
+            else None,
+        }
+        for position, item in enumerate(ranked, start=1)
+    ]
@@ -0,0 +1,195 @@
+"""
+Rolling-window stay rules evaluated together in one pass.
+
+Each :class:`StayRule` declares which countries it counts (``None`` means the
+Schengen area as classified by rolling90), the window length and the day
+limit. :func:`evaluate_rules` sorts an employee's trips once and sweeps them
+in entry order, feeding every matching rule's accumulator as it goes. Each
+accumulator clips the trip to its rule's window and adds only the days beyond
+the furthest day it has already counted, so overlapping trips are not counted
+twice and no rule needs its own presence loop.
+
+The Schengen 90/180 rule is always evaluated first, with the same window and
+compliance start as rolling90. Extra rules come from the ``STAY_RULES``
+setting, for example::
+
+    "STAY_RULES": [
+        {"key": "fr_cap", "label": "France 60/365", "countries": ["FR"], "window_days": 365, "limit": 60},
+        {"key": "de_residency", "label": "Germany 183-day", "countries": ["DE"], "window_days": 365, "limit": 183}
+    ]
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from flask import current_app, has_app_context
+
+from .rolling90 import COMPLIANCE_START_DATE, WINDOW_DAYS, get_risk_level, normalized_trip_columns, normalize_country_code
+
+logger = logging.getLogger(__name__)
+
+SCHENGEN_RULE_KEY = 'schengen_90_180'
+
+
+@dataclass(frozen=True)
+class StayRule:
+    """A limit of ``limit`` days in any ``window_days`` window, counted over ``countries``."""
+
+    key: str
+    label: str
+    window_days: int
+    limit: int
+    countries: Optional[FrozenSet[str]] = None  # None = Schengen area (Ireland excluded)
+
+    def counts(self, country_code: str, is_schengen: bool) -> bool:
+        if self.countries is None:
+            return is_schengen
+        return country_code in self.countries
+
+
+SCHENGEN_RULE = StayRule(SCHENGEN_RULE_KEY, 'Schengen 90/180', WINDOW_DAYS, 90)
+
+
+def parse_rule(spec: Mapping[str, Any]) -> StayRule:
+    """Build a rule from a STAY_RULES entry; raises ValueError when it is malformed."""
+    try:
+        key = str(spec['key']).strip()
+        window_days = int(spec['window_days'])
+        limit = int(spec['limit'])
+    except (KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid stay rule {spec!r}: {exc}") from exc
+    if not key or window_days <= 0 or limit < 0:
+        raise ValueError(f"Invalid stay rule {spec!r}: key, window_days > 0 and limit >= 0 are required")
+
+    countries = spec.get('countries')
+    if countries in (None, 'SCHENGEN'):
+        country_set = None
+    elif isinstance(countries, str):
+        country_set = frozenset({normalize_country_code(countries)})
+    else:
+        country_set = frozenset(normalize_country_code(country) for country in countries)
+        if not country_set:
+            raise ValueError(f"Invalid stay rule {spec!r}: countries is empty")
+    return StayRule(key, str(spec.get('label') or key), window_days, limit, country_set)
+
+
+def rules_from_config(specs: Optional[Iterable[Mapping[str, Any]]]) -> Tuple[StayRule, ...]:
+    """The Schengen rule followed by every valid configured rule; invalid entries are logged and skipped."""
+    rules = [SCHENGEN_RULE]
+    seen = {SCHENGEN_RULE_KEY}
+    for spec in specs or ():
+        try:
+            rule = parse_rule(spec)
+        except ValueError as exc:
+            logger.warning("%s", exc)
+            continue
+        if rule.key in seen:
+            logger.warning("Duplicate stay rule key %r ignored", rule.key)
+            continue
+        seen.add(rule.key)
+        rules.append(rule)
+    return tuple(rules)
+
+
+def configured_rules() -> Tuple[StayRule, ...]:
+    """Rules from the app CONFIG (just the Schengen rule outside an app context)."""
+    if not has_app_context():
+        return (SCHENGEN_RULE,)
+    config = current_app.config.get('CONFIG') or {}
+    return rules_from_config(config.get('STAY_RULES'))
+
+
+def _trip_rows(trips: Iterable[Mapping[str, Any]]) -> List[Tuple[int, int, str, bool]]:
+    """(entry_ord, exit_ord, country_code, is_schengen) per valid trip, sorted by entry."""
+    rows = []
+    for trip in trips:
+        country = trip.get('country') or trip.get('country_code') or ''
+        entry_ord, exit_ord, is_schengen = trip.get('entry_ord'), trip.get('exit_ord'), trip.get('is_schengen')
+        columns = None
+        if entry_ord is None or exit_ord is None or is_schengen is None:
+            columns = normalized_trip_columns(trip.get('entry_date'), trip.get('exit_date'), country)
+            entry_ord, exit_ord, is_schengen = columns['entry_ord'], columns['exit_ord'], columns['is_schengen']
+        if entry_ord is None or exit_ord is None or entry_ord > exit_ord:
+            continue
+        country_code = columns['country_code'] if columns else normalize_country_code(country)
+        rows.append((entry_ord, exit_ord, country_code, bool(is_schengen)))
+    rows.sort()
+    return rows
+
+
+def evaluate_rules(
+    trips: Iterable[Mapping[str, Any]],
+    rules: Sequence[StayRule],
+    ref_date: date,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Usage of every rule at ``ref_date``, keyed by rule key in rule order.
+
+    Like rolling90, each window covers the ``window_days`` days before
+    ``ref_date``, and trips entering before ``compliance_start_date`` are
+    ignored.
+    """
+    ref_ord = ref_date.toordinal()
+    floor_ord = compliance_start_date.toordinal() if compliance_start_date else None
+    window_starts = [
+        ref_ord - rule.window_days if floor_ord is None else max(ref_ord - rule.window_days, floor_ord)
+        for rule in rules
+    ]
+    window_end = ref_ord - 1
+    used = [0] * len(rules)
+    counted_to = [start - 1 for start in window_starts]
+
+    for entry_ord, exit_ord, country_code, is_schengen in _trip_rows(trips):
+        if entry_ord > window_end:
+            break  # sorted by entry, so no later trip reaches into any window
+        if floor_ord is not None and entry_ord < floor_ord:
+            continue
+        for index, rule in enumerate(rules):
+            if exit_ord <= counted_to[index] or not rule.counts(country_code, is_schengen):
+                continue
+            start = max(entry_ord, counted_to[index] + 1)
+            end = min(exit_ord, window_end)
+            if end >= start:
+                used[index] += end - start + 1
+                counted_to[index] = end
+
+    thresholds = risk_thresholds or {'green': 30, 'amber': 10}
+    results: Dict[str, Dict[str, Any]] = {}
+    for index, rule in enumerate(rules):
+        days_remaining = rule.limit - used[index]
+        results[rule.key] = {
+            'key': rule.key,
+            'label': rule.label,
+            'window_days': rule.window_days,
+            'limit': rule.limit,
+            'days_used': used[index],
+            'days_remaining': days_remaining,
+            'over_limit': days_remaining < 0,
+            'risk_level': get_risk_level(days_remaining, thresholds),
+        }
+    return results
+
+
+def evaluate_workforce(
+    trips_by_employee: Mapping[int, Iterable[Mapping[str, Any]]],
+    rules: Sequence[StayRule],
+    ref_date: date,
+    compliance_start_date: Optional[date] = COMPLIANCE_START_DATE,
+    risk_thresholds: Optional[Dict[str, int]] = None,
+) -> Dict[int, Dict[str, Dict[str, Any]]]:
+    """evaluate_rules for every employee."""
+    return {
+        employee_id: evaluate_rules(trips, rules, ref_date, compliance_start_date, risk_thresholds)
+        for employee_id, trips in trips_by_employee.items()
+    }
+
+
+def extra_rule_results(results: Mapping[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Results of the configured rules, without the Schengen rule already shown on its own."""
+    return [result for key, result in results.items() if key != SCHENGEN_RULE_KEY]
@@ -4,7 +4,9 @@ from __future__ import annotations
 
 from typing import Any, Dict, Mapping, MutableMapping
 
+from app.models import get_db
 from app.repositories import trips_repository
+from app.services.compliance_snapshot import refresh_snapshots_safely
 
 
 class TripValidationError(ValueError):
@@ -38,6 +40,7 @@ def create_trip(payload: Mapping[str, Any]) -> Dict[str, Any]:
     """Create a trip after validation."""
     validated = _validate_create_payload(payload)
     trip_id = trips_repository.insert_trip(validated)
+    refresh_snapshots_safely(get_db(), [validated["employee_id"]])
     return {"id": trip_id}
 
 
@@ -58,16 +61,24 @@ def update_trip(trip_id: int, payload: Mapping[str, Any]) -> Dict[str, Any]:
     updates = _build_update_columns(payload)
     if not updates:
         raise TripValidationError("No fields to update")
+    previous = trips_repository.fetch_by_id(trip_id)
     updated_rows = trips_repository.update_trip(trip_id, updates)
     if not updated_rows:
         raise TripNotFoundError("Trip not found")
     trip = trips_repository.fetch_by_id(trip_id)
     if trip is None or not trip.get("id"):
         raise TripNotFoundError("Trip not found")
+    affected = {trip["employee_id"]}
+    if previous:
+        affected.add(previous["employee_id"])
+    refresh_snapshots_safely(get_db(), affected)
     return trip
 
 
 def delete_trip(trip_id: int) -> None:
+    existing = trips_repository.fetch_by_id(trip_id)
     deleted = trips_repository.delete_trip(trip_id)
     if not deleted:
         raise TripNotFoundError("Trip not found")
+    if existing:
+        refresh_snapshots_safely(get_db(), [existing["employee_id"]])
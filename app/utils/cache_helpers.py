@@ -5,11 +5,14 @@ Provides helper functions for caching expensive operations like compliance calcu
 """
 
 from functools import lru_cache, wraps
-from typing import Callable, Any, Tuple
+from typing import Callable, Any, Iterable, Optional, Tuple
 from datetime import date
 import hashlib
 import json
 
+from app.repositories import data_version_repository
+from app.repositories.data_version_repository import GLOBAL_SCOPE
+
 
 def cache_key_for_trips(trips: list, ref_date: date) -> str:
     """
@@ -36,6 +39,35 @@ def cache_key_for_trips(trips: list, ref_date: date) -> str:
     return hashlib.md5(key_data.encode()).hexdigest()
 
 
+def versioned_cache_key(
+    conn,
+    namespace: str,
+    *parts: Any,
+    scopes: Iterable[str] = (GLOBAL_SCOPE,),
+    today: Optional[date] = None,
+) -> str:
+    """
+    Build a response cache key from the data versions of ``scopes`` and today's date.
+
+    The versions are bumped by triggers on every write to the underlying tables,
+    so a key changes exactly when its data does (or the day rolls over).
+
+    Args:
+        conn: SQLite connection to read the versions from
+        namespace: Endpoint prefix, e.g. 'dashboard'
+        parts: Request-specific key parts (sort order, filters, ids)
+        scopes: Data version scopes the response depends on
+        today: Reference date (defaults to today)
+
+    Returns:
+        Cache key string
+    """
+    versions = data_version_repository.fetch_versions(conn, scopes)
+    today = today or date.today()
+    version = ".".join(str(versions[scope]) for scope in versions)
+    return ":".join([namespace, *(str(part) for part in parts), today.isoformat(), f"v{version}"])
+
+
 def memoize_compliance_calc(func: Callable) -> Callable:
     """
     Decorator to memoize expensive compliance calculations.
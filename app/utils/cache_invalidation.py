@@ -1,50 +1,67 @@
 """
 Cache invalidation utilities for ComplyEur.
 
-Provides functions to invalidate cached responses when data changes.
+Provides functions to invalidate cached responses when data changes. Entries
+are evicted by tag (see utils/tagged_cache.py), so unrelated cached pages such
+as news and entry requirements survive trip and employee writes.
 """
 
 import logging
-from flask import current_app
+from typing import Iterable
+
+from flask import current_app, has_app_context
+
+from .tagged_cache import AGGREGATE_TAGS, EMPLOYEES_TAG, employee_tag
 
 logger = logging.getLogger(__name__)
 
 
-def invalidate_dashboard_cache():
+def invalidate_tags(*tags: str) -> None:
     """
-    Invalidate all dashboard cache entries.
-    
-    Called when trips or employees are added/updated/deleted.
+    Invalidate every cache entry carrying any of ``tags``.
+
+    Args:
+        tags: Cache tags such as 'dashboard' or 'employee:<id>'
     """
+    if not has_app_context():
+        return
     cache = current_app.config.get('CACHE')
     if not cache:
         return
-    
+
     try:
-        # Clear all dashboard cache entries
-        # Flask-Caching SimpleCache doesn't support pattern-based clearing,
-        # so we'll need to track keys or clear all
-        cache.clear()
-        logger.info("Dashboard cache invalidated")
+        cache.invalidate(*tags)
+        logger.info(f"Cache invalidated for tags {', '.join(tags)}")
     except Exception as e:
-        logger.warning(f"Failed to invalidate dashboard cache: {e}")
+        logger.warning(f"Failed to invalidate cache tags {tags}: {e}")
+
+
+def invalidate_dashboard_cache():
+    """
+    Invalidate every employee's cached fragments and the views that summarise them.
+
+    Called when trips or employees change and the affected employees are unknown.
+    """
+    invalidate_tags(EMPLOYEES_TAG, *AGGREGATE_TAGS)
+
+
+def invalidate_employees_cache(employee_ids: Iterable[int]):
+    """
+    Invalidate cache entries for specific employees and the aggregates that include them.
+
+    Args:
+        employee_ids: IDs of the employees whose data changed
+    """
+    tags = [employee_tag(employee_id) for employee_id in employee_ids]
+    if tags:
+        invalidate_tags(*tags, *AGGREGATE_TAGS)
 
 
 def invalidate_employee_cache(employee_id: int):
     """
     Invalidate cache entries related to a specific employee.
-    
+
     Args:
         employee_id: ID of the employee whose cache should be invalidated
     """
-    cache = current_app.config.get('CACHE')
-    if not cache:
-        return
-    
-    try:
-        # For SimpleCache, we clear all (could be optimized with key tracking)
-        cache.clear()
-        logger.info(f"Cache invalidated for employee {employee_id}")
-    except Exception as e:
-        logger.warning(f"Failed to invalidate employee cache: {e}")
-
+    invalidate_employees_cache([employee_id])
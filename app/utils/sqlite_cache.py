@@ -0,0 +1,205 @@
+"""
+Response cache shared by every worker on a host, stored in a local SQLite file.
+
+Flask-Caching's SimpleCache lives in one process, so under gunicorn each
+worker computes and caches the dashboard separately and an invalidation in one
+worker never reaches the others. SQLiteCache keeps entries, expiry times and
+tags in one WAL-mode database next to the application data, so a value stored
+or a tag invalidated by any worker is seen by all of them. It exposes the same
+interface as TaggedCache (get/set with tags/tag_tokens/delete/invalidate/clear)
+and needs no external service.
+
+The file must be on local storage: SQLite's WAL mode relies on shared memory
+that network filesystems do not provide.
+"""
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+SCHEMA_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS cache_entries (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires REAL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cache_tags (
+        key TEXT NOT NULL,
+        tag TEXT NOT NULL,
+        PRIMARY KEY (key, tag)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_cache_tags_tag ON cache_tags (tag)",
+    # Bumped by invalidate, so a value computed before an invalidation is not stored after it
+    """
+    CREATE TABLE IF NOT EXISTS cache_tag_generations (
+        tag TEXT PRIMARY KEY,
+        generation INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_cache_entries_delete AFTER DELETE ON cache_entries
+    BEGIN
+        DELETE FROM cache_tags WHERE key = OLD.key;
+    END
+    """,
+)
+
+# Expired rows are swept every this many writes per process
+PRUNE_EVERY = 256
+
+
+class SQLiteCache:
+    """
+    Cross-process cache with TTLs and tag invalidation.
+
+    Every write runs in its own transaction, so readers in other workers see
+    either the old entry or the new one, never a partial write. Reads are a
+    single primary-key lookup on a per-thread connection.
+
+    Args:
+        path: SQLite file for the cache (created if missing)
+        default_timeout: Seconds an entry lives when set() is given no timeout;
+            0 means entries never expire
+        busy_timeout: Seconds a writer waits for another worker's write
+    """
+
+    def __init__(self, path: str, default_timeout: int = 300, busy_timeout: float = 5.0):
+        self.path = str(path)
+        self.default_timeout = default_timeout
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._writes = 0
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            for statement in SCHEMA_SQL:
+                conn.execute(statement)
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork so workers never share a handle
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+    def _expires(self, timeout: Optional[int]) -> Optional[float]:
+        if timeout is None:
+            timeout = self.default_timeout
+        return time.time() + timeout if timeout > 0 else None
+
+    def get(self, key: str) -> Any:
+        row = self._connect().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def get_many(self, *keys: str) -> List[Any]:
+        return [self.get(key) for key in keys]
+
+    def has(self, key: str) -> bool:
+        return self._connect().execute(
+            'SELECT 1 FROM cache_entries WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def _generations(self, conn: sqlite3.Connection, tags: List[str]) -> Dict[str, int]:
+        if not tags:
+            return {}
+        placeholders = ', '.join('?' for _ in tags)
+        stored = dict(conn.execute(
+            f'SELECT tag, generation FROM cache_tag_generations WHERE tag IN ({placeholders})', tags
+        ).fetchall())
+        return {tag: stored.get(tag, 0) for tag in tags}
+
+    def tag_tokens(self, tags: Iterable[str]) -> Dict[str, int]:
+        """Current generation of each tag; take it before computing a value and pass it to set()."""
+        return self._generations(self._connect(), list(dict.fromkeys(tags)))
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[int] = None,
+        tags: Iterable[str] = (),
+        tokens: Optional[Mapping[str, Any]] = None,
+    ) -> bool:
+        """
+        Store ``value`` under ``key``.
+
+        ``tokens`` are the tag_tokens() taken before the value was computed;
+        when any of its tags has been invalidated since, nothing is stored and
+        False is returned.
+        """
+        tags = list(dict.fromkeys(tags))
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._connect()
+        with conn:
+            # Delete-then-insert (rather than REPLACE) so the trigger drops the old entry's tags;
+            # the delete also takes the write lock before the generations are compared
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            if tokens is not None and self._generations(conn, tags) != {tag: tokens.get(tag) for tag in tags}:
+                return False
+            conn.execute(
+                'INSERT INTO cache_entries (key, value, expires) VALUES (?, ?, ?)',
+                (key, blob, self._expires(timeout)),
+            )
+            conn.executemany(
+                'INSERT OR IGNORE INTO cache_tags (key, tag) VALUES (?, ?)',
+                [(key, tag) for tag in tags],
+            )
+        self._writes += 1
+        if self._writes % PRUNE_EVERY == 0:
+            self.prune()
+        return True
+
+    def delete(self, key: str) -> bool:
+        conn = self._connect()
+        with conn:
+            deleted = conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,)).rowcount
+        return deleted > 0
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of ``tags``, in every worker."""
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return
+        placeholders = ', '.join('?' for _ in tags)
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                'INSERT INTO cache_tag_generations (tag, generation) VALUES (?, 1) '
+                'ON CONFLICT (tag) DO UPDATE SET generation = generation + 1',
+                [(tag,) for tag in tags],
+            )
+            conn.execute(
+                f'DELETE FROM cache_entries WHERE key IN (SELECT key FROM cache_tags WHERE tag IN ({placeholders}))',
+                tags,
+            )
+
+    def prune(self) -> int:
+        """Delete expired entries and return how many were removed."""
+        conn = self._connect()
+        with conn:
+            return conn.execute(
+                'DELETE FROM cache_entries WHERE expires IS NOT NULL AND expires <= ?', (time.time(),)
+            ).rowcount
+
+    def clear(self) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM cache_entries')
+        return True
@@ -0,0 +1,127 @@
+"""
+Tag-aware wrapper for the response cache.
+
+Entries are stored with the tags they depend on (``employee:<id>``,
+``dashboard``, ``calendar``, ``alerts``, ``news``, ...) and evicted by tag, so
+a change to one employee's trips only drops that employee's fragments and the
+aggregates that include them.
+"""
+
+import uuid
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional
+
+DASHBOARD_TAG = 'dashboard'
+CALENDAR_TAG = 'calendar'
+ALERTS_TAG = 'alerts'
+NEWS_TAG = 'news'
+ENTRY_REQUIREMENTS_TAG = 'entry_requirements'
+
+# Cached views that summarise every employee and so depend on any employee's data
+AGGREGATE_TAGS = (DASHBOARD_TAG, CALENDAR_TAG, ALERTS_TAG)
+
+# Carried by every per-employee fragment, for writes whose employees are unknown
+EMPLOYEES_TAG = 'employees'
+
+TAG_KEY_PREFIX = '_tag:'
+
+
+def employee_tag(employee_id: int) -> str:
+    return f'employee:{int(employee_id)}'
+
+
+def employee_tags(employee_id: int) -> tuple:
+    """Tags for a fragment that depends on one employee's data."""
+    return (employee_tag(employee_id), EMPLOYEES_TAG)
+
+
+class TaggedEntry(NamedTuple):
+    """A cached value with the generation token of each of its tags when it was stored."""
+
+    value: Any
+    tokens: Dict[str, str]
+
+
+class TaggedCache:
+    """
+    Cache wrapper adding tag invalidation to any get/set/delete backend.
+
+    Each tag has a generation token stored in the backend itself. A tagged
+    entry records its tags' tokens (as of set, or as of tag_tokens when the
+    caller took them before computing the value), and reading it compares them
+    with the current tokens: any mismatch (or a missing token) is a miss.
+    Invalidating a tag replaces its token, which costs one write per tag
+    however many entries carry it. Untagged entries behave exactly as in the
+    backend.
+
+    Args:
+        backend: Flask-Caching ``Cache`` or any object with get, set, delete,
+            get_many and clear
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        return f'{TAG_KEY_PREFIX}{tag}'
+
+    def _current_tokens(self, tags: Iterable[str]) -> Dict[str, Optional[str]]:
+        tags = list(tags)
+        if not tags:
+            return {}
+        return dict(zip(tags, self.backend.get_many(*(self._tag_key(tag) for tag in tags))))
+
+    def get(self, key: str) -> Any:
+        entry = self.backend.get(key)
+        if not isinstance(entry, TaggedEntry):
+            return entry
+        if self._current_tokens(entry.tokens) != entry.tokens:
+            self.backend.delete(key)
+            return None
+        return entry.value
+
+    def tag_tokens(self, tags: Iterable[str]) -> Dict[str, str]:
+        """Current token of each tag; take it before computing a value and pass it to set()."""
+        tokens = self._current_tokens(dict.fromkeys(tags))
+        for tag, token in tokens.items():
+            if token is None:
+                # First use (or evicted): start a generation; tag tokens never expire
+                token = uuid.uuid4().hex
+                self.backend.set(self._tag_key(tag), token, timeout=0)
+                tokens[tag] = token
+        return tokens
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        timeout: Optional[int] = None,
+        tags: Iterable[str] = (),
+        tokens: Optional[Mapping[str, str]] = None,
+    ) -> bool:
+        """
+        Store ``value`` under ``key``.
+
+        ``tokens`` are the tag_tokens() taken before the value was computed, so
+        an invalidation that lands while it is computed still evicts it. Without
+        them the tokens current at store time are used.
+        """
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return self.backend.set(key, value, timeout=timeout)
+        if tokens is None:
+            tokens = self.tag_tokens(tags)
+        else:
+            tokens = {tag: tokens.get(tag) for tag in tags}
+        return self.backend.set(key, TaggedEntry(value, tokens), timeout=timeout)
+
+    def delete(self, key: str) -> bool:
+        return self.backend.delete(key)
+
+    def invalidate(self, *tags: str) -> None:
+        """Drop every entry carrying any of ``tags``."""
+        for tag in dict.fromkeys(tags):
+            self.backend.set(self._tag_key(tag), uuid.uuid4().hex, timeout=0)
+
+    def clear(self) -> bool:
+        return self.backend.clear()
@@ -20,6 +20,14 @@ DEFAULTS = {
         'amber': 10   # 10-29 days remaining = amber, < 10 = red
     },
     'FUTURE_JOB_WARNING_THRESHOLD': 80,  # Warn when future trips would use 80+ days
+    'COMPLIANCE_SUMMARY_SOURCE': 'snapshot',  # Home at-risk count: 'snapshot' table or 'sql' aggregate (the paged dashboard reads the snapshot)
+    'COMPLIANCE_SHARD_THRESHOLD': 2000,  # Employees above which reports compute in a process pool
+    'COMPLIANCE_SHARD_WORKERS': None,  # Process pool size; None = one per CPU
+    'COMPLIANCE_DAEMON_SOCKET': os.getenv('COMPLIANCE_DAEMON_SOCKET') or None,  # Shared compliance daemon; None = per-worker memo
+    'COMPLIANCE_DAEMON_TIMEOUT': 0.5,  # Seconds before falling back to the local memo
+    'RESPONSE_CACHE_BACKEND': os.getenv('RESPONSE_CACHE_BACKEND') or 'sqlite',  # 'sqlite' (shared by all workers) or 'memory' (per process)
+    'RESPONSE_CACHE_PATH': os.getenv('RESPONSE_CACHE_PATH') or None,  # SQLite cache file; None = response_cache.db in the persistent dir
+    'STAY_RULES': [],  # Extra rolling-window limits alongside Schengen 90/180 (see services/stay_rules.py)
     'NEWS_FILTER_REGION': 'EU_ONLY',  # News filtering: EU_ONLY or ALL
     'ADMIN_EMAIL': None
 }
@@ -239,20 +239,43 @@ def trip_exists(conn: sqlite3.Connection, employee_id: int, country: str, entry_
     return c.fetchone()[0] > 0
 
 
+def trips_have_normalized_columns(conn: sqlite3.Connection) -> bool:
+    """True when the trips table carries the write-time normalised columns."""
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(trips)')}
+    return {'entry_ord', 'exit_ord', 'country_code', 'is_schengen'} <= columns
+
+
 def save_trip(conn: sqlite3.Connection, employee_id: int, country: str, entry_date: date, 
-               exit_date: date, travel_days: int) -> bool:
+               exit_date: date, travel_days: int, normalized_columns: Optional[bool] = None) -> bool:
     """
     Save a trip to the database if it doesn't already exist.
     Returns True if saved, False if duplicate.
+
+    normalized_columns says whether to write entry_ord/exit_ord/country_code/
+    is_schengen; None checks the table (pass it explicitly when saving in bulk).
     """
     if trip_exists(conn, employee_id, country, entry_date, exit_date):
         return False
     
+    if normalized_columns is None:
+        normalized_columns = trips_have_normalized_columns(conn)
+
     c = conn.cursor()
-    c.execute('''
-        INSERT INTO trips (employee_id, country, entry_date, exit_date, travel_days)
-        VALUES (?, ?, ?, ?, ?)
-    ''', (employee_id, country, entry_date.isoformat(), exit_date.isoformat(), travel_days))
+    if normalized_columns:
+        from app.services.rolling90 import normalized_trip_columns
+
+        normalized = normalized_trip_columns(entry_date, exit_date, country)
+        c.execute('''
+            INSERT INTO trips (employee_id, country, entry_date, exit_date, travel_days,
+                               entry_ord, exit_ord, country_code, is_schengen)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (employee_id, country, entry_date.isoformat(), exit_date.isoformat(), travel_days,
+              normalized['entry_ord'], normalized['exit_ord'], normalized['country_code'], normalized['is_schengen']))
+    else:
+        c.execute('''
+            INSERT INTO trips (employee_id, country, entry_date, exit_date, travel_days)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (employee_id, country, entry_date.isoformat(), exit_date.isoformat(), travel_days))
     conn.commit()
     return True
 
@@ -397,6 +420,7 @@ def import_excel(
         if header_warning:
             warnings.append(header_warning)
         duplicates_skipped = 0
+        normalized_columns = trips_have_normalized_columns(conn)
 
         for employee_name, country, entry_date, exit_date, travel_days in trips:
             try:
@@ -409,7 +433,7 @@ def import_excel(
             employees_processed.add(employee_id)
 
             try:
-                if save_trip(conn, employee_id, country, entry_date, exit_date, travel_days):
+                if save_trip(conn, employee_id, country, entry_date, exit_date, travel_days, normalized_columns):
                     trips_added += 1
                 else:
                     duplicates_skipped += 1
@@ -427,6 +451,11 @@ def import_excel(
                     },
                 ) from exc
 
+        if employees_processed:
+            from app.services.compliance_snapshot import refresh_snapshots_safely
+
+            refresh_snapshots_safely(conn, employees_processed)
+
         result = {
             'success': True,
             'trips_added': trips_added,
@@ -9,6 +9,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app import create_app
 from app.runtime_env import refresh_runtime_state
 
+# Apps are built before TESTING is set, so keep the midnight snapshot job off explicitly
+os.environ.setdefault("DISABLE_SNAPSHOT_SCHEDULER", "1")
+
 TEST_SECRET_KEY = "test-secret-key"
 TEST_ADMIN_HASH = "$argon2id$v=19$m=65536,t=3,p=4$G+a2uq+3hZbq90yZ/zsJkA$uVC0ZCQ0gcrnlEP4vqzQYCMEJTB64euXGsRuMXALuvs"
 
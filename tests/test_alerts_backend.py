@@ -1,3 +1,4 @@
+import sqlite3
 from datetime import date, timedelta
 
 import pytest
@@ -136,3 +137,68 @@ def test_send_pending_alert_emails_marks_flag(alert_app, monkeypatch):
 
         refreshed = alerts_service.get_active_alerts()[0]
         assert refreshed['email_sent'] == 1
+
+
+def test_refresh_all_alerts_uses_batch_usage(alert_app):
+    with alert_app.app_context():
+        conn = get_db()
+        yellow_id = _create_employee(conn, 'Batch Yellow')
+        _create_trip(conn, yellow_id, 76)
+        red_id = _create_employee(conn, 'Batch Red')
+        _create_trip(conn, red_id, 91)
+        clear_id = _create_employee(conn, 'Batch Clear')
+
+        alerts_service.refresh_all_alerts()
+
+        cursor = conn.cursor()
+        cursor.execute('SELECT employee_id, risk_level FROM alerts WHERE resolved = 0')
+        levels = {row['employee_id']: row['risk_level'] for row in cursor.fetchall()}
+        assert levels[yellow_id] == 'YELLOW'
+        assert levels[red_id] == 'RED'
+        assert clear_id not in levels
+
+
+
+def test_alert_stay_rules_use_configured_risk_thresholds(test_app, auth_client, monkeypatch):
+    monkeypatch.setitem(test_app.config['CONFIG'], 'STAY_RULES', [
+        {'key': 'fr', 'label': 'France 100/180', 'countries': ['FR'], 'window_days': 180, 'limit': 100},
+    ])
+    monkeypatch.setitem(test_app.config['CONFIG'], 'RISK_THRESHOLDS', {'green': 20, 'amber': 5})
+    employee_id = auth_client.post('/api/employees', json={'name': 'Rule Thresholds'}).get_json()['id']
+    end_date = date.today() - timedelta(days=1)
+    auth_client.post('/api/trips', json={
+        'employee_id': employee_id, 'country': 'FR',
+        'start_date': (end_date - timedelta(days=75)).isoformat(), 'end_date': end_date.isoformat(),
+    })
+
+    with test_app.app_context():
+        alerts_service.check_alert_status(employee_id)
+        alert = next(a for a in alerts_service.get_active_alerts() if a['employee_id'] == employee_id)
+
+    rule = alert['stay_rules'][0]
+    # 24 days left: amber under the 30/10 defaults, green under the configured thresholds
+    assert rule['days_remaining'] == 24
+    assert rule['risk_level'] == 'green'
+
+
+def test_usage_without_persisted_bitmap_counts_trips():
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY, employee_id INTEGER NOT NULL, country TEXT NOT NULL,
+            entry_date DATE NOT NULL, exit_date DATE NOT NULL,
+            entry_ord INTEGER, exit_ord INTEGER, country_code TEXT, is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Ana');
+    ''')
+    entry = date.today() - timedelta(days=20)
+    conn.execute(
+        "INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (1, 'FR', ?, ?)",
+        (entry.isoformat(), (entry + timedelta(days=9)).isoformat()),
+    )
+    usage = alerts_service._calculate_employee_usage(conn, 1)
+    assert usage['days_used'] == 10
+    assert conn.execute('SELECT COUNT(*) FROM employee_presence_bitmap').fetchone()[0] == 0
+    conn.close()
@@ -17,3 +17,22 @@ def test_employee_crud_list_create(auth_client):
     r = auth_client.get("/api/employees")
     names = [e["name"] for e in r.get_json()]
     assert "Alice" in names
+
+
+def test_employee_usage_timeline(auth_client):
+    """Test the per-employee daily usage timeline endpoint."""
+    r = auth_client.post("/api/employees", json={"name": "Timeline Tester"})
+    eid = r.get_json()["id"]
+
+    r = auth_client.get(f"/api/employees/{eid}/usage_timeline?start=2026-01-01&end=2026-01-10")
+    assert r.status_code == 200
+    data = r.get_json()
+    assert data["start"] == "2026-01-01"
+    assert len(data["days_used"]) == 10
+    assert all(used + remaining == data["limit"] for used, remaining in zip(data["days_used"], data["days_remaining"]))
+
+    r = auth_client.get(f"/api/employees/{eid}/usage_timeline?start=2026-01-10&end=2026-01-01")
+    assert r.status_code == 400
+
+    r = auth_client.get("/api/employees/999999/usage_timeline")
+    assert r.status_code == 404
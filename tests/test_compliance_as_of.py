@@ -0,0 +1,103 @@
+"""
+Tests for as-of (historical / future reference date) compliance reports
+"""
+
+import csv
+import io
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import reports_service
+from app.services.rolling90 import days_used_in_window, presence_days
+
+THRESHOLDS = {'green': 30, 'amber': 10}
+TRIPS = {
+    1: [('FR', '2025-11-01', '2026-01-29'), ('DE', '2026-02-10', '2026-02-20')],
+    2: [('IE', '2026-01-01', '2026-03-01'), ('IT', '2025-09-01', '2025-12-01')],
+    3: [],
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = tmp_path / 'as_of.db'
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+    ''')
+    for employee_id, trips in TRIPS.items():
+        conn.execute('INSERT INTO employees (id, name) VALUES (?, ?)', (employee_id, f'Employee {employee_id}'))
+        conn.executemany(
+            'INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (?, ?, ?, ?)',
+            [(employee_id, *trip) for trip in trips],
+        )
+    conn.commit()
+    conn.close()
+    return str(path)
+
+
+def _expected_days_used(employee_id, ref):
+    trips = [{'country': c, 'entry_date': e, 'exit_date': x} for c, e, x in TRIPS[employee_id]]
+    return days_used_in_window(presence_days(trips), ref)
+
+
+def test_as_of_matches_window_count(db_path):
+    as_of = date(2026, 2, 25)
+    rows = {row['employee_id']: row for row in reports_service.compliance_as_of(db_path, as_of, THRESHOLDS)}
+
+    assert set(rows) == {1, 2, 3}
+    for employee_id, row in rows.items():
+        assert row['days_used'] == _expected_days_used(employee_id, as_of)
+    assert rows[1]['days_used'] == 101 and rows[1]['over_limit'] and rows[1]['risk_level'] == 'red'
+    assert rows[2]['days_used'] == 0  # IE excluded, IT trip predates the compliance start
+
+
+def test_range_matrix_matches_single_dates(db_path):
+    start, end = date(2026, 1, 1), date(2026, 4, 30)
+    matrix = reports_service.compliance_as_of_range(db_path, start, end, THRESHOLDS)
+
+    assert matrix['dates'][0] == '2026-01-01' and matrix['dates'][-1] == '2026-04-30'
+    for employee in matrix['employees']:
+        for index, day in enumerate(matrix['dates']):
+            assert employee['days_used'][index] == _expected_days_used(employee['employee_id'], date.fromisoformat(day))
+
+    with pytest.raises(ValueError):
+        reports_service.compliance_as_of_range(db_path, start, start + timedelta(days=400), THRESHOLDS)
+
+
+def test_as_of_csv_has_row_per_employee_and_day(db_path):
+    data = reports_service.generate_as_of_csv(db_path, date(2026, 2, 24), date(2026, 2, 25), THRESHOLDS)
+    rows = list(csv.reader(io.StringIO(data)))
+
+    assert rows[0] == reports_service.AS_OF_HEADERS
+    assert len(rows) == 1 + 3 * 2
+    assert ['Employee 1', '25-02-2026', '101', '-11', 'red', 'Yes'] in rows
+
+
+def test_as_of_endpoints(auth_client):
+    response = auth_client.get('/api/compliance/as_of?date=2026-03-01')
+    assert response.status_code == 200
+    assert response.get_json()['date'] == '2026-03-01'
+
+    response = auth_client.get('/api/compliance/as_of?start=2026-03-01&end=2026-03-03')
+    assert response.status_code == 200
+    assert len(response.get_json()['dates']) == 3
+
+    assert auth_client.get('/api/compliance/as_of?date=not-a-date').status_code == 400
+
+    response = auth_client.get('/export/compliance_as_of?date=2026-03-01')
+    assert response.status_code == 200
+    assert response.headers['Content-Type'].startswith('text/csv')
@@ -0,0 +1,67 @@
+"""
+Unit tests for the batch compliance engine
+"""
+
+import pytest
+from datetime import date, timedelta
+from app.services import compliance_batch
+from app.services.compliance_batch import calculate_batch_compliance
+from app.services.rolling90 import (
+    presence_days, days_used_in_window, calculate_days_remaining,
+    earliest_safe_entry, days_until_compliant, get_risk_level
+)
+
+TODAY = date(2026, 3, 1)
+
+WORKFORCE = {
+    1: [],
+    2: [{'entry_date': '2025-11-01', 'exit_date': '2025-11-20', 'country': 'FR'}],
+    3: [{'entry_date': '2025-10-20', 'exit_date': '2026-02-10', 'country': 'DE'}],
+    4: [
+        {'entry_date': '2025-12-01', 'exit_date': '2026-01-15', 'country': 'IT'},
+        {'entry_date': '2026-01-10', 'exit_date': '2026-02-27', 'country': 'ES'},
+        {'entry_date': '2026-03-05', 'exit_date': '2026-03-20', 'country': 'FR'},
+    ],
+    5: [{'entry_date': '2025-10-12', 'exit_date': '2026-06-30', 'country': 'NL'}],
+    6: [{'entry_date': '2025-11-01', 'exit_date': '2026-02-28', 'country': 'IE'}],
+    7: [{'entry_date': '2025-01-01', 'exit_date': '2025-12-31', 'country': 'AT'}],
+}
+
+
+def _expected(trips, thresholds):
+    presence = presence_days(trips)
+    remaining = calculate_days_remaining(presence, TODAY)
+    until, when = (None, None)
+    if remaining < 0:
+        until, when = days_until_compliant(presence, TODAY)
+    return {
+        'days_used': days_used_in_window(presence, TODAY),
+        'days_remaining': remaining,
+        'risk_level': get_risk_level(remaining, thresholds),
+        'safe_entry_date': earliest_safe_entry(presence, TODAY),
+        'days_until_compliant': until,
+        'compliance_date': when,
+    }
+
+
+@pytest.mark.parametrize('use_numpy', [False, pytest.param(True, marks=pytest.mark.skipif(
+    not compliance_batch.numpy_available(), reason='numpy not installed'))])
+def test_batch_matches_per_employee_functions(use_numpy):
+    thresholds = {'green': 30, 'amber': 10}
+    results = calculate_batch_compliance(WORKFORCE, TODAY, risk_thresholds=thresholds, use_numpy=use_numpy)
+    assert set(results) == set(WORKFORCE)
+    for emp_id, trips in WORKFORCE.items():
+        assert results[emp_id] == _expected(trips, thresholds), emp_id
+
+
+def test_engines_agree_across_reference_dates():
+    if not compliance_batch.numpy_available():
+        pytest.skip('numpy not installed')
+    for offset in range(0, 300, 7):
+        today = date(2025, 10, 1) + timedelta(days=offset)
+        assert calculate_batch_compliance(WORKFORCE, today, use_numpy=True) == \
+            calculate_batch_compliance(WORKFORCE, today, use_numpy=False)
+
+
+def test_empty_workforce():
+    assert calculate_batch_compliance({}, TODAY) == {}
@@ -0,0 +1,125 @@
+"""
+Tests for the version-keyed compliance memo
+"""
+
+from datetime import date, timedelta
+
+from app.services import compliance_cache
+from app.services.compliance_cache import ComplianceCache
+from app.services.rolling90 import (
+    calculate_days_remaining, days_until_compliant, days_used_in_window, earliest_safe_entry, presence_days
+)
+
+TODAY = date(2026, 3, 1)
+
+
+def test_lru_eviction_and_counters():
+    cache = ComplianceCache(maxsize=2)
+    calls = []
+
+    def compute(value):
+        calls.append(value)
+        return value
+
+    assert cache.get_or_compute(1, TODAY, lambda: compute('a')) == 'a'
+    assert cache.get_or_compute(1, TODAY, lambda: compute('stale')) == 'a'
+    cache.get_or_compute(2, TODAY, lambda: compute('b'))
+    cache.get_or_compute(1, TODAY, lambda: compute('stale'))  # refresh 1 so 2 is least recent
+    cache.get_or_compute(3, TODAY, lambda: compute('c'))
+
+    assert calls == ['a', 'b', 'c']
+    assert cache.stats() == {'size': 2, 'maxsize': 2, 'hits': 2, 'misses': 3, 'evictions': 1, 'invalidations': 0}
+    assert cache.get_or_compute(2, TODAY, lambda: compute('b2')) == 'b2'
+
+
+def test_invalidate_bumps_only_that_employee():
+    cache = ComplianceCache()
+    cache.get_or_compute(1, TODAY, lambda: 'one')
+    cache.get_or_compute(2, TODAY, lambda: 'two')
+
+    cache.invalidate([1])
+
+    assert cache.version(1) == 1 and cache.version(2) == 0
+    assert cache.get_or_compute(1, TODAY, lambda: 'one-new') == 'one-new'
+    assert cache.get_or_compute(2, TODAY, lambda: 'two-new') == 'two'
+
+    cache.invalidate()
+    assert cache.get_or_compute(2, TODAY, lambda: 'two-new') == 'two-new'
+
+
+def test_employee_compliance_matches_rolling90_and_skips_loader_on_hit():
+    compliance_cache.compliance_cache.clear()
+    trips = [
+        {'entry_date': '2025-11-01', 'exit_date': '2026-02-10', 'country': 'FR'},
+        {'entry_date': '2026-02-15', 'exit_date': '2026-02-20', 'country': 'IE'},
+    ]
+    loads = []
+
+    def load_trips():
+        loads.append(1)
+        return trips
+
+    summary = compliance_cache.employee_compliance(7, TODAY, load_trips)
+    presence = presence_days(trips)
+    assert summary['days_used'] == days_used_in_window(presence, TODAY)
+    assert summary['days_remaining'] == calculate_days_remaining(presence, TODAY)
+    assert summary['safe_entry_date'] == earliest_safe_entry(presence, TODAY)
+    assert (summary['days_until_compliant'], summary['compliance_date']) == days_until_compliant(presence, TODAY)
+
+    compliance_cache.employee_compliance(7, TODAY, load_trips)
+    compliance_cache.employee_compliance(7, TODAY + timedelta(days=1), load_trips)
+    assert len(loads) == 1
+
+    compliance_cache.invalidate([7])
+    compliance_cache.employee_compliance(7, TODAY, load_trips)
+    assert len(loads) == 2
+
+
+def test_trip_write_invalidates_employee(auth_client):
+    employee = auth_client.post('/api/employees', json={'name': 'Cache Cleo'})
+    emp_id = employee.get_json()['id']
+    version = compliance_cache.compliance_cache.version(emp_id)
+
+    today = date.today()
+    trip = auth_client.post('/api/trips', json={
+        'employee_id': emp_id,
+        'country': 'DE',
+        'start_date': (today - timedelta(days=4)).isoformat(),
+        'end_date': today.isoformat(),
+    })
+    assert trip.status_code == 201
+    assert compliance_cache.compliance_cache.version(emp_id) > version
+
+
+def test_writes_from_another_worker_move_the_key(monkeypatch):
+    versions = {5: 0}
+    workers = [ComplianceCache(version_source=versions.get) for _ in range(2)]
+    assert [cache.get_or_compute(5, TODAY, lambda: 'old') for cache in workers] == ['old', 'old']
+
+    versions[5] = 1  # a trip write committed by any worker bumps the employee's data version
+    assert [cache.get_or_compute(5, TODAY, lambda: 'new') for cache in workers] == ['new', 'new']
+    assert workers[0].stats()['size'] == 1  # the superseded entry is dropped
+
+    # Entries also expire, bounding figures built from trips read before a concurrent write
+    now = compliance_cache.time.monotonic()
+    monkeypatch.setattr(compliance_cache.time, 'monotonic', lambda: now + compliance_cache.DEFAULT_TTL_SECONDS + 1)
+    assert workers[0].get_or_compute(5, TODAY, lambda: 'recomputed') == 'recomputed'
+
+
+def test_raw_trip_write_is_seen_without_invalidate(auth_client):
+    from app.models import get_db
+
+    emp_id = auth_client.post('/api/employees', json={'name': 'Raw Rory'}).get_json()['id']
+    today = date.today()
+    trip = {'entry_date': (today - timedelta(days=4)).isoformat(), 'exit_date': today.isoformat(), 'country': 'DE'}
+
+    with auth_client.application.app_context():
+        assert compliance_cache.employee_compliance(emp_id, today, lambda: [])['days_used'] == 0
+        conn = get_db()
+        # e.g. retention, DSAR or another worker: no invalidate() call in this process
+        conn.execute(
+            'INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (?, ?, ?, ?)',
+            (emp_id, trip['country'], trip['entry_date'], trip['exit_date']),
+        )
+        conn.commit()
+        assert compliance_cache.employee_compliance(emp_id, today, lambda: [trip])['days_used'] == 4
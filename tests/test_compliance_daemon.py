@@ -0,0 +1,127 @@
+"""
+Tests for the shared compliance daemon and its client fallback
+"""
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+from datetime import date
+
+import pytest
+
+from app.services import compliance_cache
+from app.services.compliance_daemon import ComplianceDaemon, ComplianceDaemonClient
+from app.services.rolling90 import normalized_trip_columns
+
+TODAY = date(2026, 3, 1)
+TRIPS = {
+    1: [('2025-11-01', '2026-02-10', 'FR'), ('2026-02-15', '2026-02-20', 'IE')],
+    2: [('2026-01-05', '2026-01-20', 'DE')],
+    3: [],
+}
+
+
+def _trip_dicts(employee_id):
+    return [
+        {'entry_date': entry, 'exit_date': exit_, 'country': country}
+        for entry, exit_, country in TRIPS[employee_id]
+    ]
+
+
+@pytest.fixture
+def daemon():
+    # Unix socket paths are limited to ~100 bytes, so stay out of pytest's deep tmp dirs
+    workdir = tempfile.mkdtemp(prefix='cd-')
+    db_path = os.path.join(workdir, 'daemon.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT)")
+    conn.execute(
+        "CREATE TABLE trips (id INTEGER PRIMARY KEY, employee_id INTEGER, entry_date TEXT, exit_date TEXT, "
+        "country TEXT, entry_ord INTEGER, exit_ord INTEGER, is_schengen INTEGER)"
+    )
+    for employee_id, trips in TRIPS.items():
+        conn.execute("INSERT INTO employees (id, name) VALUES (?, ?)", (employee_id, f"Employee {employee_id}"))
+        for entry, exit_, country in trips:
+            columns = normalized_trip_columns(entry, exit_, country)
+            conn.execute(
+                "INSERT INTO trips (employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (employee_id, entry, exit_, country, columns['entry_ord'], columns['exit_ord'], columns['is_schengen']),
+            )
+    conn.commit()
+    conn.close()
+
+    server = ComplianceDaemon(os.path.join(workdir, 'compliance.sock'), db_path)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, db_path
+    finally:
+        server.shutdown()
+        server.server_close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def test_daemon_figures_match_local_memo(daemon):
+    server, _ = daemon
+    client = ComplianceDaemonClient(server.server_address)
+    client.ping()
+
+    remote = client.compliance([1, 2, 3, 99], TODAY)
+
+    for employee_id in TRIPS:
+        expected = compliance_cache.employee_compliance(
+            employee_id, TODAY, lambda: _trip_dicts(employee_id), cache=compliance_cache.ComplianceCache()
+        )
+        assert remote[employee_id] == expected
+    assert remote[99]['days_used'] == 0
+    assert remote[1]['days_remaining'] < 0 and remote[1]['compliance_date'] is not None
+
+
+def test_writes_are_visible_without_invalidate(daemon):
+    server, db_path = daemon
+    client = ComplianceDaemonClient(server.server_address)
+    before = client.compliance([3], TODAY)[3]
+
+    conn = sqlite3.connect(db_path)
+    columns = normalized_trip_columns('2026-02-01', '2026-02-10', 'ES')
+    conn.execute(
+        "INSERT INTO trips (employee_id, entry_date, exit_date, country, entry_ord, exit_ord, is_schengen) "
+        "VALUES (3, '2026-02-01', '2026-02-10', 'ES', ?, ?, ?)",
+        (columns['entry_ord'], columns['exit_ord'], columns['is_schengen']),
+    )
+    conn.commit()
+    conn.close()
+
+    # No invalidation reached the daemon: the data version check alone picks up the write
+    assert client.compliance([3], TODAY)[3]['days_used'] == before['days_used'] + 10
+    assert client.stats()['invalidations'] == 0
+    client.invalidate([3])
+    assert client.compliance([3], TODAY)[3]['days_used'] == before['days_used'] + 10
+    assert client.stats()['invalidations'] == 1
+
+
+def test_configured_daemon_serves_employee_compliance(daemon, test_app, monkeypatch):
+    server, _ = daemon
+    monkeypatch.setitem(test_app.config['CONFIG'], 'COMPLIANCE_DAEMON_SOCKET', server.server_address)
+
+    with test_app.app_context():
+        summary = compliance_cache.employee_compliance(2, TODAY, lambda: pytest.fail("local memo was used"))
+        compliance_cache.invalidate([2])
+
+    assert summary['days_used'] == 16
+    assert server.cache.stats()['invalidations'] == 1
+
+
+def test_unreachable_daemon_falls_back_to_local_memo(test_app, monkeypatch):
+    monkeypatch.setitem(test_app.config['CONFIG'], 'COMPLIANCE_DAEMON_SOCKET', '/nonexistent/compliance.sock')
+    compliance_cache.compliance_cache.clear()
+
+    with test_app.app_context():
+        summary = compliance_cache.employee_compliance(42, TODAY, lambda: _trip_dicts(2))
+        compliance_cache.invalidate([42])
+
+    assert summary['days_used'] == 16
+    assert compliance_cache.compliance_cache.version(42) == 1
@@ -0,0 +1,160 @@
+"""
+Unit tests for future job compliance forecasts
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+from app.services.compliance_forecast import (
+    calculate_future_job_compliance, get_all_future_jobs_for_employee, find_job_slots,
+    rank_employees_for_job
+)
+from app.repositories import scenario_repository
+from app.services.rolling90 import presence_days
+
+COUNTRIES = ['FR', 'DE', 'IT', 'IE', 'ES', 'United Kingdom']
+
+
+def _random_trips(rng, count):
+    today = date.today()
+    trips = []
+    for _ in range(count):
+        entry = today + timedelta(days=rng.randint(-400, 400))
+        exit_date = entry + timedelta(days=rng.randint(0, 60))
+        trips.append({
+            'entry_date': entry.isoformat(),
+            'exit_date': exit_date.isoformat(),
+            'country': rng.choice(COUNTRIES),
+        })
+    return trips
+
+
+def _per_job_reference(trips, compliance_start_date):
+    today = date.today()
+    future = sorted(
+        (t for t in trips if date.fromisoformat(t['entry_date']) > today),
+        key=lambda t: t['entry_date'],
+    )
+    return [
+        calculate_future_job_compliance(7, job, trips, 80, compliance_start_date=compliance_start_date)
+        for job in future
+    ]
+
+
+def test_sweep_matches_per_job_forecasts():
+    """Single-pass forecasts equal the per-job calculation for random histories"""
+    rng = random.Random(20251012)
+    for _ in range(40):
+        trips = _random_trips(rng, rng.randint(0, 25))
+        for compliance_start_date in (None, date.today() - timedelta(days=200)):
+            assert get_all_future_jobs_for_employee(7, trips, 80, compliance_start_date) == \
+                _per_job_reference(trips, compliance_start_date)
+
+
+def test_over_limit_job_gets_compliant_from_date():
+    today = date.today()
+    trips = [
+        {'entry_date': (today - timedelta(days=80)).isoformat(),
+         'exit_date': (today - timedelta(days=1)).isoformat(), 'country': 'FR'},
+        {'entry_date': (today + timedelta(days=5)).isoformat(),
+         'exit_date': (today + timedelta(days=24)).isoformat(), 'country': 'DE'},
+    ]
+    [forecast] = get_all_future_jobs_for_employee(1, trips, compliance_start_date=None)
+    assert forecast['is_compliant'] is False
+    assert forecast['compliant_from_date'] == _per_job_reference(trips, None)[0]['compliant_from_date']
+    assert forecast['trips_in_window'] == [trips[0]]
+
+
+def _slot_fits(presence, start, duration, limit=90):
+    job = {start + timedelta(days=i) for i in range(duration)}
+    combined = set(presence) | job
+    for offset in range(duration + 179):
+        day = start + timedelta(days=offset)
+        window_start = day - timedelta(days=179)
+        if sum(1 for d in combined if window_start <= d <= day) > limit:
+            return False
+    return True
+
+
+def test_slot_finder_matches_brute_force():
+    """Every returned start date is exactly the set of fitting starts"""
+    rng = random.Random(7)
+    horizon_start = date.today() + timedelta(days=1)
+    for _ in range(6):
+        trips = _random_trips(rng, rng.randint(0, 8))
+        presence = presence_days(trips, None)
+        for duration in (1, 20, 60):
+            horizon_end = horizon_start + timedelta(days=120)
+            expected = [
+                horizon_start + timedelta(days=k) for k in range(121)
+                if _slot_fits(presence, horizon_start + timedelta(days=k), duration)
+            ]
+            assert find_job_slots(trips, duration, horizon_start, horizon_end, compliance_start_date=None) == expected
+
+
+def test_slot_finder_respects_scheduled_trips_and_limits():
+    today = date.today()
+    trips = [{'entry_date': (today + timedelta(days=30)).isoformat(),
+              'exit_date': (today + timedelta(days=109)).isoformat(), 'country': 'FR'}]
+    slots = find_job_slots(trips, 15, today + timedelta(days=1), today + timedelta(days=400),
+                           compliance_start_date=None, max_results=3)
+    # Starting tomorrow would push the scheduled 80-day trip's window to 95 days
+    assert len(slots) == 3
+    assert slots[0] > today + timedelta(days=1)
+    presence = presence_days(trips, None)
+    assert all(_slot_fits(presence, slot, 15) for slot in slots)
+    assert find_job_slots(trips, 91, today, today + timedelta(days=30)) == []
+
+
+def test_staffing_ranker_matches_per_employee_scenarios():
+    """Batch ranking agrees with calculate_future_job_compliance for each candidate"""
+    rng = random.Random(11)
+    workforce = {emp_id: _random_trips(rng, rng.randint(0, 10)) for emp_id in range(1, 30)}
+    job_start = date.today() + timedelta(days=20)
+    job = {'entry_date': job_start.isoformat(),
+           'exit_date': (job_start + timedelta(days=24)).isoformat(), 'country': 'FR'}
+    ranked = rank_employees_for_job(workforce, job_start, job_start + timedelta(days=24), 'FR', compliance_start_date=None)
+    remaining = [item['days_remaining_after_job'] for item in ranked]
+    assert remaining == sorted(remaining, reverse=True)
+    assert sorted(item['employee_id'] for item in ranked) == sorted(workforce)
+    for item in ranked:
+        expected = calculate_future_job_compliance(item['employee_id'], job, workforce[item['employee_id']], compliance_start_date=None)
+        for key in ('days_used_before_job', 'days_after_job', 'days_remaining_after_job',
+                    'risk_level', 'is_compliant', 'compliant_from_date'):
+            assert item[key] == expected[key]
+
+
+def test_trips_for_employees_handles_more_ids_than_sqlite_variables(tmp_path):
+    db_path = str(tmp_path / 'scenario.db')
+    with sqlite3.connect(db_path) as conn:
+        conn.execute(
+            'CREATE TABLE trips (employee_id INTEGER, entry_date TEXT, exit_date TEXT, country TEXT, '
+            'entry_ord INTEGER, exit_ord INTEGER, is_schengen INTEGER)'
+        )
+        conn.execute('CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT)')
+        conn.executemany('INSERT INTO employees (id) VALUES (?)', [(emp_id,) for emp_id in range(1, 40_001)])
+        conn.execute('DELETE FROM employees WHERE id = 9')  # deleted employee whose trip remains
+        conn.execute("INSERT INTO trips VALUES (7, '2026-01-05', '2026-01-09', 'FR', NULL, NULL, 1)")
+        conn.execute("INSERT INTO trips VALUES (9, '2026-01-05', '2026-01-09', 'DE', NULL, NULL, 1)")
+    employee_ids = range(1, 40_003)
+
+    grouped = scenario_repository.fetch_trips_for_employees(db_path, employee_ids)
+
+    assert len(grouped) == 39_999
+    assert [trip['country'] for trip in grouped[7]] == ['FR']
+    assert grouped[8] == []
+    assert 9 not in grouped and 40_001 not in grouped
+
+
+def test_planner_slots_skips_unknown_employees(auth_client):
+    emp_id = auth_client.post('/api/employees', json={'name': 'Slot Sal'}).get_json()['id']
+    payload = {'duration': 5, 'start_date': '2026-03-01', 'horizon_days': 30, 'max_results': 1}
+
+    response = auth_client.post('/api/planner/slots', json=dict(payload, employee_ids=[emp_id, emp_id + 999]))
+    assert response.status_code == 200
+    employees = response.get_json()['employees']
+    assert [row['employee_id'] for row in employees] == [emp_id]
+    assert employees[0]['employee_name'] == 'Slot Sal'
+
+    response = auth_client.post('/api/planner/slots', json=dict(payload, employee_id=emp_id + 999))
+    assert response.status_code == 404
@@ -0,0 +1,133 @@
+"""
+Tests for the persisted forward projection
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import compliance_snapshot
+from app.services.compliance_projection import PROJECTION_DAYS, Projection, load_projection, load_projections
+from app.services.rolling90 import COMPLIANCE_START_DATE, days_used_in_window, presence_days
+
+TODAY = date(2026, 2, 1)
+COUNTRIES = ['FR', 'DE', 'IE', 'GB', 'IT']
+
+
+def test_projection_matches_rolling90_and_round_trips():
+    rng = random.Random(20)
+    for _ in range(20):
+        trips = []
+        for _ in range(rng.randint(0, 8)):
+            entry = COMPLIANCE_START_DATE + timedelta(days=rng.randint(-30, 500))
+            trips.append({
+                'entry_date': entry.isoformat(),
+                'exit_date': (entry + timedelta(days=rng.randint(0, 60))).isoformat(),
+                'country': rng.choice(COUNTRIES),
+            })
+        projection = Projection.from_trips(trips, TODAY)
+        presence = presence_days(trips)
+
+        assert len(projection.days_used) == PROJECTION_DAYS
+        for offset in range(0, PROJECTION_DAYS, 11):
+            day = TODAY + timedelta(days=offset)
+            assert projection.used_on(day) == days_used_in_window(presence, day)
+
+        restored = Projection.from_blob(projection.start_ord, projection.to_blob())
+        assert restored.days_used == projection.days_used
+        assert len(projection.to_blob()) == PROJECTION_DAYS * 2
+
+
+def test_slicing_and_peak():
+    trips = [{'entry_date': '2026-02-10', 'exit_date': '2026-02-19', 'country': 'FR'}]
+    projection = Projection.from_trips(trips, TODAY)
+
+    assert projection.used_on(TODAY - timedelta(days=1)) is None
+    assert list(projection.days_used_between(date(2026, 2, 10), date(2026, 2, 12))) == [0, 1, 2]
+    assert list(projection.days_remaining_between(date(2026, 2, 20), date(2026, 2, 20))) == [80]
+    assert projection.peak(TODAY, TODAY + timedelta(days=100)) == (10, date(2026, 2, 20))
+    with pytest.raises(ValueError):
+        projection.days_used_between(TODAY, TODAY + timedelta(days=PROJECTION_DAYS))
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Ana'), (2, 'Ben');
+        INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES
+            (1, 1, 'FR', '2026-01-01', '2026-01-10'),
+            (2, 2, 'DE', '2026-03-01', '2026-03-05');
+    ''')
+    yield connection
+    connection.close()
+
+
+def test_projections_follow_writes_and_day_rollover(conn):
+    projections = load_projections(conn, [1, 2, 3], TODAY)
+    assert set(projections) == {1, 2}
+    assert projections[2].used_on(date(2026, 3, 10)) == 5
+    assert conn.execute('SELECT COUNT(*) FROM employee_projection').fetchone()[0] == 2
+
+    conn.execute("INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES (3, 2, 'IT', '2026-04-01', '2026-04-03')")
+    # The raw write drops the stale row; the snapshot refresh writes a fresh one
+    assert conn.execute('SELECT COUNT(*) FROM employee_projection WHERE employee_id = 2').fetchone()[0] == 0
+    compliance_snapshot.refresh_snapshots(conn, [2], today=TODAY)
+    assert conn.execute('SELECT COUNT(*) FROM employee_projection WHERE employee_id = 2').fetchone()[0] == 1
+    assert load_projection(conn, 2, TODAY).used_on(date(2026, 4, 10)) == 8
+
+    tomorrow = TODAY + timedelta(days=1)
+    rolled = load_projection(conn, 1, tomorrow)
+    assert rolled.start == tomorrow
+    assert conn.execute('SELECT start_ord FROM employee_projection WHERE employee_id = 1').fetchone()[0] == tomorrow.toordinal()
+
+    conn.execute('DELETE FROM employees WHERE id = 2')
+    compliance_snapshot.refresh_snapshots(conn, [2], today=TODAY)
+    assert load_projection(conn, 2, TODAY) is None
+    assert conn.execute('SELECT COUNT(*) FROM employee_projection WHERE employee_id = 2').fetchone()[0] == 0
+
+
+def test_snapshot_transition_matches_next_risk_transition(conn):
+    compliance_snapshot.refresh_snapshots(conn, today=TODAY)
+    thresholds = {'green': 30, 'amber': 10}
+    for employee_id, trips in [(1, [('FR', '2026-01-01', '2026-01-10')]), (2, [('DE', '2026-03-01', '2026-03-05')])]:
+        trip_dicts = [{'country': c, 'entry_date': e, 'exit_date': x} for c, e, x in trips]
+        expected = compliance_snapshot.next_risk_transition(trip_dicts, TODAY, thresholds)
+        row = conn.execute(
+            'SELECT next_risk_transition_date FROM employee_compliance WHERE employee_id = ?', (employee_id,)
+        ).fetchone()[0]
+        assert row == (expected.isoformat() if expected else None)
+
+
+def test_usage_timeline_api_slices_projection(auth_client):
+    emp_id = auth_client.post('/api/employees', json={'name': 'Projection Pia'}).get_json()['id']
+    today = date.today()
+    auth_client.post('/api/trips', json={
+        'employee_id': emp_id,
+        'country': 'FR',
+        'start_date': (today + timedelta(days=5)).isoformat(),
+        'end_date': (today + timedelta(days=9)).isoformat(),
+    })
+
+    response = auth_client.get(f'/api/employees/{emp_id}/usage_timeline')
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['days_used'][:7] == [0, 0, 0, 0, 0, 0, 1]
+    assert body['days_used'][-1] == 5
+    assert body['days_remaining'][-1] == 85
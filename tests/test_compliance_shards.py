@@ -0,0 +1,113 @@
+"""
+Tests for process-pool sharded compliance computation
+"""
+
+import random
+from datetime import date, timedelta
+
+from app.services import compliance_shards
+from app.services.compliance_batch import calculate_batch_compliance
+from app.services.compliance_forecast import get_all_future_jobs_for_employee
+from app.services.compliance_shards import (
+    pack_shard,
+    sharded_batch_compliance,
+    sharded_future_jobs,
+    unpack_shard,
+)
+
+TODAY = date(2026, 3, 1)
+COUNTRIES = ['FR', 'DE', 'IE', 'IT', 'GB', 'ES']
+
+
+def _workforce(size, seed=17):
+    rng = random.Random(seed)
+    workforce = {}
+    for employee_id in range(1, size + 1):
+        trips = []
+        for _ in range(rng.randint(0, 5)):
+            entry = date(2025, 9, 1) + timedelta(days=rng.randint(0, 500))
+            exit_ = entry + timedelta(days=rng.randint(0, 40))
+            trips.append({
+                'entry_date': entry.isoformat(),
+                'exit_date': exit_.isoformat(),
+                'country': rng.choice(COUNTRIES),
+            })
+        workforce[employee_id * 7] = trips
+    return workforce
+
+
+def test_pack_round_trip_keeps_trips_and_drops_unparsable():
+    employees = [
+        (3, [{'entry_date': '2026-01-05', 'exit_date': '2026-01-09', 'country': 'FR'}]),
+        (1, []),
+        (2, [
+            {'entry_date': 'not a date', 'exit_date': '2026-01-09', 'country': 'DE'},
+            {'entry_date': '2026-02-01', 'exit_date': '2026-02-03', 'country': 'IE'},
+        ]),
+    ]
+
+    unpacked = unpack_shard(pack_shard(employees))
+
+    assert [employee_id for employee_id, _ in unpacked] == [3, 1, 2]
+    assert unpacked[0][1][0]['entry_date'] == '2026-01-05'
+    assert unpacked[0][1][0]['is_schengen'] == 1
+    assert unpacked[1][1] == []
+    assert len(unpacked[2][1]) == 1
+    assert unpacked[2][1][0]['country'] == 'IE'
+    assert unpacked[2][1][0]['is_schengen'] == 0
+
+
+def test_sharded_batch_matches_in_process_and_keeps_order():
+    workforce = _workforce(60)
+    expected = calculate_batch_compliance(workforce, TODAY)
+
+    result = sharded_batch_compliance(workforce, TODAY, threshold=0, workers=3)
+
+    assert result.sharded
+    assert result.results == expected
+    assert list(result.results) == list(workforce)
+    assert [timing['shard'] for timing in result.shard_timings] == [0, 1, 2]
+    assert sum(timing['employees'] for timing in result.shard_timings) == len(workforce)
+    assert all(timing['seconds'] >= 0 for timing in result.shard_timings)
+
+
+def test_sharded_future_jobs_match_in_process():
+    workforce = _workforce(40, seed=5)
+
+    result = sharded_future_jobs(workforce, 80, threshold=0, workers=2)
+
+    assert result.sharded
+    assert list(result.results) == list(workforce)
+    for employee_id, trips in workforce.items():
+        expected = get_all_future_jobs_for_employee(employee_id, trips, 80)
+        actual = result.results[employee_id]
+        assert len(actual) == len(expected)
+        for got, want in zip(actual, expected):
+            assert got['job_start_date'] == want['job_start_date']
+            assert got['days_after_job'] == want['days_after_job']
+            assert got['risk_level'] == want['risk_level']
+            assert got['compliant_from_date'] == want['compliant_from_date']
+            assert got['job']['country'] == want['job']['country']
+
+
+def test_small_workforce_runs_in_process():
+    workforce = _workforce(10)
+
+    result = sharded_batch_compliance(workforce, TODAY, threshold=50, workers=4)
+
+    assert not result.sharded
+    assert result.results == calculate_batch_compliance(workforce, TODAY)
+
+
+def test_pool_failure_falls_back_to_in_process(monkeypatch):
+    class BrokenPool:
+        def __init__(self, *args, **kwargs):
+            raise OSError("no processes available")
+
+    monkeypatch.setattr(compliance_shards, 'ProcessPoolExecutor', BrokenPool)
+    workforce = _workforce(20)
+
+    result = sharded_batch_compliance(workforce, TODAY, threshold=0, workers=2)
+
+    assert not result.sharded
+    assert result.results == calculate_batch_compliance(workforce, TODAY)
@@ -0,0 +1,168 @@
+"""
+Tests for the materialised employee_compliance snapshot
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import compliance_snapshot
+from app.services.compliance_batch import calculate_batch_compliance
+
+TODAY = date(2026, 3, 1)
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Idle'), (2, 'Busy'), (3, 'Over');
+        INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES
+            (2, 'FR', '2026-01-01', '2026-02-20'),
+            (3, 'DE', '2025-11-01', '2026-02-28'),
+            (3, 'GB', '2026-02-01', '2026-02-10');
+    ''')
+    yield connection
+    connection.close()
+
+
+def _snapshot_rows(conn):
+    return {row['employee_id']: dict(row) for row in conn.execute('SELECT * FROM employee_compliance')}
+
+
+def test_refresh_matches_batch_engine(conn):
+    written = compliance_snapshot.refresh_snapshots(conn, today=TODAY)
+    assert written == 3
+
+    trips = {
+        emp_id: [dict(r) for r in conn.execute('SELECT * FROM trips WHERE employee_id = ?', (emp_id,))]
+        for emp_id in (1, 2, 3)
+    }
+    expected = calculate_batch_compliance(trips, TODAY)
+    rows = _snapshot_rows(conn)
+    for emp_id, result in expected.items():
+        row = rows[emp_id]
+        assert row['days_used'] == result['days_used']
+        assert row['days_remaining'] == result['days_remaining']
+        assert row['risk_level'] == result['risk_level']
+        safe_entry = result['safe_entry_date']
+        assert row['safe_entry_date'] == (safe_entry.isoformat() if safe_entry else None)
+        assert row['computed_for'] == TODAY.isoformat()
+
+
+def test_partial_refresh_bumps_version_and_drops_deleted_employees(conn):
+    compliance_snapshot.refresh_snapshots(conn, today=TODAY)
+    before = _snapshot_rows(conn)
+
+    conn.execute("INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (1, 'IT', '2026-02-01', '2026-02-05')")
+    conn.execute('DELETE FROM employees WHERE id = 3')
+    compliance_snapshot.refresh_snapshots(conn, [1, 3], today=TODAY)
+    after = _snapshot_rows(conn)
+
+    assert set(after) == {1, 2}
+    assert after[1]['days_used'] == 5
+    assert after[1]['data_version'] == before[1]['data_version'] + 1
+    assert after[2]['data_version'] == before[2]['data_version']
+
+
+def test_next_risk_transition_is_first_level_change():
+    thresholds = {'green': 30, 'amber': 10}
+    trips = [{'entry_date': '2026-01-01', 'exit_date': '2026-02-20', 'country': 'FR'}]
+    transition = compliance_snapshot.next_risk_transition(trips, TODAY, thresholds)
+    assert transition is None  # 51 days used: stays green as days only roll off
+
+    trips = [{'entry_date': '2026-01-01', 'exit_date': '2026-03-31', 'country': 'FR'}]
+    transition = compliance_snapshot.next_risk_transition(trips, TODAY, thresholds)
+    # 59 used today; the future trip pushes usage past 60 (amber) on 3 March
+    assert transition == TODAY + timedelta(days=2)
+
+
+def test_load_snapshots_rolls_stale_rows_forward(conn):
+    compliance_snapshot.refresh_snapshots(conn, today=TODAY)
+    tomorrow = TODAY + timedelta(days=1)
+
+    snapshots = compliance_snapshot.load_snapshots(conn, tomorrow)
+
+    assert {row['computed_for'] for row in snapshots.values()} == {tomorrow}
+    over = snapshots[3]
+    assert over['days_remaining'] < 0
+    assert over['compliance_date'] == over['safe_entry_date']
+    assert over['days_until_compliant'] == (over['safe_entry_date'] - tomorrow).days
+    assert compliance_snapshot.at_risk_count(conn, 10, tomorrow) == 1
+
+
+def test_trip_api_refreshes_snapshot(auth_client):
+    from app.models import get_db
+
+    employee = auth_client.post('/api/employees', json={'name': 'Snapshot Sam'})
+    emp_id = employee.get_json()['id']
+    today = date.today()
+    trip = auth_client.post('/api/trips', json={
+        'employee_id': emp_id,
+        'country': 'FR',
+        'start_date': (today - timedelta(days=9)).isoformat(),
+        'end_date': today.isoformat(),
+    })
+    assert trip.status_code == 201
+
+    with auth_client.application.app_context():
+        row = get_db().execute(
+            'SELECT days_used, computed_for FROM employee_compliance WHERE employee_id = ?', (emp_id,)
+        ).fetchone()
+    assert row is not None
+    assert row['computed_for'] == today.isoformat()
+    assert row['days_used'] == 9
+
+
+def test_at_risk_count_ignores_deleted_employees(conn):
+    compliance_snapshot.refresh_snapshots(conn, today=TODAY)
+    assert compliance_snapshot.at_risk_count(conn, 10, TODAY) == 1
+
+    conn.execute('DELETE FROM employees WHERE id = 3')
+    assert compliance_snapshot.at_risk_count(conn, 10, TODAY) == 0
+
+
+def test_dsar_delete_drops_snapshot(auth_client):
+    from app.models import get_db
+    from app.services.dsar import delete_employee_data
+
+    emp_id = auth_client.post('/api/employees', json={'name': 'Erased Eve'}).get_json()['id']
+    today = date.today()
+    auth_client.post('/api/trips', json={
+        'employee_id': emp_id, 'country': 'FR',
+        'start_date': (today - timedelta(days=4)).isoformat(), 'end_date': today.isoformat(),
+    })
+
+    with auth_client.application.app_context():
+        assert delete_employee_data(auth_client.application.config['DATABASE'], emp_id)['success']
+        row = get_db().execute('SELECT 1 FROM employee_compliance WHERE employee_id = ?', (emp_id,)).fetchone()
+    assert row is None
+
+
+def test_daily_rollover_is_claimed_by_one_worker(tmp_path):
+    db_path = str(tmp_path / 'rollover.db')
+    workers = [sqlite3.connect(db_path), sqlite3.connect(db_path)]
+    today = date(2026, 3, 1)
+    try:
+        assert compliance_snapshot.claim_daily_rollover(workers[0], today)
+        assert not compliance_snapshot.claim_daily_rollover(workers[1], today)
+        assert not compliance_snapshot.claim_daily_rollover(workers[1], today - timedelta(days=1))
+        assert compliance_snapshot.claim_daily_rollover(workers[1], today + timedelta(days=1))
+        assert not workers[0].in_transaction and not workers[1].in_transaction
+    finally:
+        for worker in workers:
+            worker.close()
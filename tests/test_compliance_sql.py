@@ -0,0 +1,106 @@
+"""
+Tests for the SQL-side windowed compliance aggregate
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.models import backfill_trip_normalized_columns
+from app.services import compliance_sql
+from app.services.compliance_batch import calculate_batch_compliance
+from app.services.rolling90 import (
+    COMPLIANCE_START_DATE, days_used_in_window, normalized_trip_columns, presence_days
+)
+
+COUNTRIES = ['FR', 'DE', 'IE', 'GB', 'Italy', 'ES']
+
+
+@pytest.fixture
+def workforce():
+    rng = random.Random(12)
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+    ''')
+    trips_by_employee = {}
+    for employee_id in range(1, 41):
+        conn.execute('INSERT INTO employees (id, name) VALUES (?, ?)', (employee_id, f'E{employee_id}'))
+        trips = []
+        # Straddles the compliance start, overlaps and reversed dates included
+        for _ in range(rng.randint(0, 8)):
+            entry = COMPLIANCE_START_DATE + timedelta(days=rng.randint(-60, 420))
+            exit_d = entry + timedelta(days=rng.randint(-2, 70))
+            trips.append({'entry_date': entry.isoformat(), 'exit_date': exit_d.isoformat(),
+                          'country': rng.choice(COUNTRIES)})
+        for index, trip in enumerate(trips):
+            if index % 3 == 0:
+                # Some rows predate the normalised columns and are backfilled at startup
+                conn.execute(
+                    'INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (?, ?, ?, ?)',
+                    (employee_id, trip['country'], trip['entry_date'], trip['exit_date']),
+                )
+            else:
+                columns = normalized_trip_columns(trip['entry_date'], trip['exit_date'], trip['country'])
+                conn.execute(
+                    'INSERT INTO trips (employee_id, country, entry_date, exit_date, entry_ord, exit_ord, '
+                    'country_code, is_schengen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (employee_id, trip['country'], trip['entry_date'], trip['exit_date'],
+                     columns['entry_ord'], columns['exit_ord'], columns['country_code'], columns['is_schengen']),
+                )
+        trips_by_employee[employee_id] = trips
+    backfill_trip_normalized_columns(conn)
+    conn.commit()
+    yield conn, trips_by_employee
+    conn.close()
+
+
+@pytest.mark.parametrize('compliance_start_date', [COMPLIANCE_START_DATE, None])
+def test_sql_days_used_matches_rolling90(workforce, compliance_start_date):
+    conn, trips_by_employee = workforce
+    for offset in range(-30, 480, 11):
+        today = COMPLIANCE_START_DATE + timedelta(days=offset)
+        usage = compliance_sql.days_used_for_all(conn, today, compliance_start_date)
+        assert set(usage) == set(trips_by_employee)
+        for employee_id, trips in trips_by_employee.items():
+            presence = presence_days(trips, compliance_start_date)
+            assert usage[employee_id] == days_used_in_window(presence, today, compliance_start_date), (
+                employee_id, today)
+
+
+def test_overlapping_trips_are_counted_once(workforce):
+    conn, _ = workforce
+    conn.execute("INSERT INTO employees (id, name) VALUES (99, 'Overlap')")
+    for entry, exit_d in (('2026-01-01', '2026-01-20'), ('2026-01-05', '2026-01-10'), ('2026-01-15', '2026-02-01')):
+        columns = normalized_trip_columns(entry, exit_d, 'FR')
+        conn.execute(
+            'INSERT INTO trips (employee_id, country, entry_date, exit_date, entry_ord, exit_ord, is_schengen) '
+            'VALUES (99, ?, ?, ?, ?, ?, ?)',
+            ('FR', entry, exit_d, columns['entry_ord'], columns['exit_ord'], columns['is_schengen']),
+        )
+    assert compliance_sql.days_used_for_all(conn, date(2026, 3, 1))[99] == 32
+
+
+def test_sql_compliance_matches_batch_engine(workforce):
+    conn, trips_by_employee = workforce
+    thresholds = {'green': 30, 'amber': 10}
+    for offset in (100, 200, 300):
+        today = COMPLIANCE_START_DATE + timedelta(days=offset)
+        expected = calculate_batch_compliance(trips_by_employee, today, risk_thresholds=thresholds)
+        assert compliance_sql.calculate_sql_compliance(conn, today, risk_thresholds=thresholds) == expected
+        at_risk = sum(1 for result in expected.values() if result['days_remaining'] < 10)
+        assert compliance_sql.at_risk_count(conn, 10, today) == at_risk
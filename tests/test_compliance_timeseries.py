@@ -0,0 +1,122 @@
+"""
+Tests for the company-wide daily risk time series
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import compliance_snapshot, compliance_timeseries
+from app.services.rolling90 import days_used_in_window, get_risk_level, presence_days
+
+TODAY = date(2026, 3, 1)
+THRESHOLDS = {'green': 30, 'amber': 10}
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Ana'), (2, 'Ben'), (3, 'Cy');
+        INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES
+            (1, 1, 'FR', '2025-11-01', '2026-01-20'),
+            (2, 2, 'DE', '2026-04-01', '2026-06-15'),
+            (3, 3, 'IE', '2026-01-01', '2026-02-01');
+    ''')
+    yield connection
+    connection.close()
+
+
+def _brute_force(conn):
+    trips = {}
+    for row in conn.execute('SELECT employee_id, country, entry_date, exit_date FROM trips'):
+        trips.setdefault(row['employee_id'], []).append(dict(row))
+    employee_ids = [row[0] for row in conn.execute('SELECT id FROM employees')]
+    start, end = compliance_timeseries.series_range(TODAY)
+    expected = {'green': [], 'amber': [], 'red': []}
+    day = start
+    while day <= end:
+        levels = [
+            get_risk_level(90 - days_used_in_window(presence_days(trips.get(employee_id, [])), day), THRESHOLDS)
+            for employee_id in employee_ids
+        ]
+        for level in expected:
+            expected[level].append(levels.count(level))
+        day += timedelta(days=1)
+    return expected
+
+
+def _series(conn):
+    series = compliance_timeseries.load_timeseries(conn, TODAY, THRESHOLDS)
+    return series, {level: series[level] for level in ('green', 'amber', 'red')}
+
+
+def test_series_matches_per_day_window_counts(conn):
+    series, counts = _series(conn)
+    assert series['start'] == '2025-03-01' and series['end'] == '2026-08-31'
+    assert counts == _brute_force(conn)
+    assert max(counts['red']) == 1
+
+
+def test_trip_write_updates_only_changed_days(conn):
+    series, _ = _series(conn)
+    before = {row[0]: tuple(row[1:]) for row in conn.execute('SELECT * FROM compliance_risk_series')}
+
+    conn.execute("UPDATE trips SET exit_date = '2026-01-25' WHERE id = 1")
+    compliance_snapshot.refresh_snapshots(conn, [1], today=TODAY)
+
+    updated, counts = _series(conn)
+    assert counts == _brute_force(conn)
+    assert updated['version'] != series['version']
+    after = {row[0]: tuple(row[1:]) for row in conn.execute('SELECT * FROM compliance_risk_series')}
+    changed = [day for day in after if after[day] != before[day]]
+    assert changed and len(changed) < len(after)
+
+
+def test_employees_added_or_removed_without_refresh_are_reconciled(conn):
+    _series(conn)
+    conn.execute('DELETE FROM employees WHERE id = 3')
+    conn.execute("INSERT INTO employees (id, name) VALUES (4, 'Dee')")
+    conn.execute("INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (4, 'IT', '2026-02-01', '2026-02-20')")
+
+    _, counts = _series(conn)
+    assert counts == _brute_force(conn)
+    ids = [row[0] for row in conn.execute('SELECT employee_id FROM employee_risk_series ORDER BY employee_id')]
+    assert ids == [1, 2, 4]
+
+
+def test_threshold_change_rebuilds(conn):
+    _series(conn)
+    strict = {'green': 60, 'amber': 40}
+    series = compliance_timeseries.load_timeseries(conn, TODAY, strict)
+    assert max(series['red']) == 2
+
+
+def test_timeseries_endpoint_etag(auth_client):
+    response = auth_client.get('/api/compliance/timeseries')
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert len(response.get_json()['dates']) == 549
+
+    cached = auth_client.get('/api/compliance/timeseries', headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+
+    employee = auth_client.post('/api/employees', json={'name': 'Series Sam'})
+    assert employee.status_code == 201
+    changed = auth_client.get('/api/compliance/timeseries', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
@@ -0,0 +1,115 @@
+"""
+Tests for the paginated dashboard API
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+
+def _add_trip(client, emp_id, country, start_offset, end_offset):
+    today = date.today()
+    response = client.post('/api/trips', json={
+        'employee_id': emp_id,
+        'country': country,
+        'start_date': (today + timedelta(days=start_offset)).isoformat(),
+        'end_date': (today + timedelta(days=end_offset)).isoformat(),
+    })
+    assert response.status_code in (200, 201)
+
+
+def _seed(client):
+    ids = {}
+    for name in ['Alice Zed', 'Bob Young', 'Carla Xu', 'Alan Smith', 'Dana_Ward']:
+        ids[name] = client.post('/api/employees', json={'name': name}).get_json()['id']
+    _add_trip(client, ids['Bob Young'], 'FR', -95, -1)   # red: 95 days used
+    _add_trip(client, ids['Carla Xu'], 'DE', -70, -1)    # amber: 70 days used
+    _add_trip(client, ids['Alice Zed'], 'IT', 10, 14)    # upcoming
+    return ids
+
+
+def test_pages_sort_and_filter(auth_client):
+    ids = _seed(auth_client)
+
+    first = auth_client.get('/api/dashboard?page=1&page_size=2').get_json()
+    second = auth_client.get('/api/dashboard?page=2&page_size=2').get_json()
+    assert first['total'] == 5 and first['pages'] == 3
+    assert [e['name'] for e in first['employees'] + second['employees']] == [
+        'Alan Smith', 'Alice Zed', 'Bob Young', 'Carla Xu'
+    ]
+
+    by_risk = auth_client.get('/api/dashboard?sort=risk&page_size=3').get_json()
+    assert [e['name'] for e in by_risk['employees']] == ['Bob Young', 'Carla Xu', 'Alan Smith']
+    assert by_risk['employees'][0]['days_used'] == 95
+    assert by_risk['employees'][0]['days_until_compliant'] is not None
+
+    red = auth_client.get('/api/dashboard?risk=red').get_json()
+    assert red['total'] == 1 and red['employees'][0]['id'] == ids['Bob Young']
+
+    prefix = auth_client.get('/api/dashboard?q=al').get_json()
+    assert [e['name'] for e in prefix['employees']] == ['Alan Smith', 'Alice Zed']
+    # LIKE wildcards in the prefix match literally
+    assert auth_client.get('/api/dashboard?q=Dana_').get_json()['total'] == 1
+    assert auth_client.get('/api/dashboard?q=Dan%25').get_json()['total'] == 0
+
+    alice = prefix['employees'][1]
+    assert alice['trip_count'] == 1
+    assert alice['next_trip']['country'] == 'IT'
+    assert 'forecasts' not in alice
+
+
+def test_invalid_arguments_are_rejected(auth_client):
+    for query in ['page=0', 'page=x', 'page_size=1000', 'sort=salary', 'risk=purple']:
+        response = auth_client.get(f'/api/dashboard?{query}')
+        assert response.status_code == 400, query
+        assert 'error' in response.get_json()
+
+
+def test_forecasts_load_per_row_and_redact_private_trips(test_app, auth_client):
+    ids = _seed(auth_client)
+    emp_id = ids['Alice Zed']
+    with sqlite3.connect(test_app.config['DATABASE']) as conn:
+        conn.execute('UPDATE trips SET is_private = 1 WHERE employee_id = ?', (emp_id,))
+
+    response = auth_client.get(f'/api/dashboard/{emp_id}/forecasts')
+
+    assert response.status_code == 200
+    forecasts = response.get_json()['forecasts']
+    assert len(forecasts) == 1
+    assert forecasts[0]['country'] == 'Personal Trip'
+    assert forecasts[0]['job_duration'] == 5
+    assert forecasts[0]['job_start_date'] == (date.today() + timedelta(days=10)).isoformat()
+
+    row = auth_client.get('/api/dashboard?q=Alice').get_json()['employees'][0]
+    assert row['next_trip']['country'] == 'Personal Trip'
+
+    assert auth_client.get('/api/dashboard/999999/forecasts').status_code == 404
+
+
+def test_html_dashboard_renders_one_page(auth_client, monkeypatch):
+    from app.services import dashboard_service
+
+    ids = _seed(auth_client)
+    forecast_calls = []
+    real_forecasts = dashboard_service.get_all_future_jobs_for_employee
+
+    def counting_forecasts(emp_id, *args):
+        forecast_calls.append(emp_id)
+        return real_forecasts(emp_id, *args)
+
+    monkeypatch.setattr(dashboard_service, 'get_all_future_jobs_for_employee', counting_forecasts)
+
+    response = auth_client.get('/dashboard?page=2&page_size=2')
+    assert response.status_code == 200
+    html = response.get_data(as_text=True)
+    assert 'Bob Young' in html and 'Carla Xu' in html
+    assert 'Alan Smith' not in html and 'Dana_Ward' not in html
+    assert 'Showing 3&ndash;4 of 5 employees' in html
+    assert 'rel="prev"' in html and 'rel="next"' in html
+    # Forecasts only for the rendered page
+    assert sorted(forecast_calls) == sorted([ids['Bob Young'], ids['Carla Xu']])
+
+    red = auth_client.get('/dashboard?risk=red').get_data(as_text=True)
+    assert 'Showing 1&ndash;1 of 1 employees' in red
+
+    invalid = auth_client.get('/dashboard?page_size=0')
+    assert invalid.status_code == 302
@@ -0,0 +1,98 @@
+"""
+Tests for the single-query dashboard loader
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.repositories import dashboard_repository
+
+TODAY = '2026-03-01'
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row  # the loader must not depend on the connection's row factory
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            is_private INTEGER DEFAULT 0,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            is_schengen INTEGER
+        );
+    ''')
+    rng = random.Random(21)
+    # More employees than SQLite's default bind-variable limit
+    connection.executemany(
+        'INSERT INTO employees (id, name) VALUES (?, ?)',
+        [(employee_id, f'Person {employee_id:04d} Surname{rng.randint(0, 50)}') for employee_id in range(1, 1201)],
+    )
+    trips = []
+    for employee_id in list(range(1, 1201)) + [9999]:  # 9999 has trips but no employee row
+        for _ in range(rng.randint(0, 9)):
+            entry = date(2025, 11, 1) + timedelta(days=rng.randint(0, 240))
+            exit_ = entry + timedelta(days=rng.randint(0, 20))
+            trips.append((employee_id, rng.choice(['FR', 'DE', 'IE']), entry.isoformat(), exit_.isoformat(),
+                          rng.randint(0, 1)))
+    connection.executemany(
+        'INSERT INTO trips (employee_id, country, entry_date, exit_date, is_private) VALUES (?, ?, ?, ?, ?)', trips
+    )
+    yield connection
+    connection.close()
+
+
+def test_loader_matches_separate_queries(conn):
+    data = dashboard_repository.fetch_dashboard_trips(conn, TODAY)
+    employee_ids = [row[0] for row in conn.execute('SELECT id FROM employees')]
+
+    assert 9999 not in data.trips
+    for employee_id in employee_ids:
+        rows = conn.execute(
+            'SELECT id, entry_date, exit_date, country, is_private FROM trips WHERE employee_id = ?', (employee_id,)
+        ).fetchall()
+        assert data.trip_count(employee_id) == len(rows)
+        assert sorted(trip['trip_id'] for trip in data.trip_dicts(employee_id)) == sorted(row['id'] for row in rows)
+        entries = [trip['entry_date'] for trip in data.trip_dicts(employee_id)]
+        assert entries == sorted(entries, reverse=True)
+
+        upcoming = sorted((row['entry_date'], row['id']) for row in rows if row['entry_date'] > TODAY)
+        next_trip = data.next_trip.get(employee_id)
+        if upcoming:
+            assert next_trip[1] == upcoming[0][0]
+        else:
+            assert next_trip is None
+
+        recent = sorted(rows, key=lambda row: (row['exit_date'], row['id']), reverse=True)[:5]
+        assert data.recent.get(employee_id, []) == [
+            (row['country'], row['entry_date'], row['exit_date'], row['is_private']) for row in recent
+        ]
+
+
+def test_employee_order(conn):
+    by_first = dashboard_repository.fetch_employees(conn)
+    by_last = dashboard_repository.fetch_employees(conn, 'last_name')
+
+    assert [name for _, name in by_first] == sorted(name for _, name in by_first)
+    assert [name.split(' ', 1)[1] for _, name in by_last] == sorted(name.split(' ', 1)[1] for _, name in by_last)
+    assert isinstance(by_first[0], tuple)
+
+
+def test_name_prefix_filter_uses_nocase_index(conn):
+    conn.execute('CREATE TABLE employee_compliance (employee_id INTEGER PRIMARY KEY, computed_for TEXT, risk_level TEXT)')
+    conn.execute('CREATE INDEX idx_employees_name ON employees (name)')  # pre-NOCASE definition
+    dashboard_repository.ensure_page_indexes(conn)
+    where, params = dashboard_repository._page_filter(None, 'person 001')
+    plan = ' '.join(
+        row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN SELECT e.id FROM employees e{where}', params)
+    )
+    assert 'idx_employees_name' in plan and 'SCAN' not in plan
@@ -0,0 +1,88 @@
+"""
+Tests for the trigger-maintained data version counters and versioned cache keys
+"""
+
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.repositories import data_version_repository
+from app.repositories.data_version_repository import ALERTS_SCOPE, GLOBAL_SCOPE, employee_scope
+from app.utils.cache_helpers import versioned_cache_key
+
+TODAY = date(2026, 3, 1)
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL
+        );
+        CREATE TABLE alerts (id INTEGER PRIMARY KEY, employee_id INTEGER, resolved INTEGER DEFAULT 0);
+        INSERT INTO employees (id, name) VALUES (1, 'Ana'), (2, 'Ben');
+    ''')
+    yield connection
+    connection.close()
+
+
+def _versions(conn):
+    return data_version_repository.fetch_versions(
+        conn, [GLOBAL_SCOPE, employee_scope(1), employee_scope(2), ALERTS_SCOPE]
+    )
+
+
+def test_triggers_bump_global_and_employee_counters(conn):
+    # The schema is created on first read; earlier writes are not counted
+    assert _versions(conn) == {GLOBAL_SCOPE: 0, 'employee:1': 0, 'employee:2': 0, ALERTS_SCOPE: 0}
+
+    conn.execute("INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES (1, 1, 'FR', '2026-01-01', '2026-01-05')")
+    assert _versions(conn) == {GLOBAL_SCOPE: 1, 'employee:1': 1, 'employee:2': 0, ALERTS_SCOPE: 0}
+
+    # Edits and deletes count too, not just inserts
+    conn.execute("UPDATE trips SET country = 'DE' WHERE id = 1")
+    assert _versions(conn) == {GLOBAL_SCOPE: 2, 'employee:1': 2, 'employee:2': 0, ALERTS_SCOPE: 0}
+
+    # Moving a trip touches both employees
+    conn.execute("UPDATE trips SET employee_id = 2 WHERE id = 1")
+    assert _versions(conn) == {GLOBAL_SCOPE: 3, 'employee:1': 3, 'employee:2': 1, ALERTS_SCOPE: 0}
+
+    conn.execute("DELETE FROM trips WHERE id = 1")
+    conn.execute("UPDATE employees SET name = 'Benedict' WHERE id = 2")
+    assert _versions(conn) == {GLOBAL_SCOPE: 5, 'employee:1': 3, 'employee:2': 3, ALERTS_SCOPE: 0}
+
+    conn.execute("INSERT INTO alerts (employee_id) VALUES (1)")
+    assert _versions(conn)[ALERTS_SCOPE] == 1
+
+
+def test_versioned_cache_key_changes_with_data_and_date(conn):
+    key = versioned_cache_key(conn, 'dashboard', 'first_name', today=TODAY)
+    assert key == versioned_cache_key(conn, 'dashboard', 'first_name', today=TODAY)
+    assert key != versioned_cache_key(conn, 'dashboard', 'first_name', today=TODAY + timedelta(days=1))
+    assert key != versioned_cache_key(conn, 'dashboard', 'last_name', today=TODAY)
+
+    employee_key = versioned_cache_key(conn, 'forecast', 1, scopes=[employee_scope(1)], today=TODAY)
+    conn.execute("INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (2, 'FR', '2026-01-01', '2026-01-05')")
+    assert versioned_cache_key(conn, 'dashboard', 'first_name', today=TODAY) != key
+    assert versioned_cache_key(conn, 'forecast', 1, scopes=[employee_scope(1)], today=TODAY) == employee_key
+
+
+def test_dashboard_cache_sees_edits_outside_the_app(test_app, auth_client):
+    auth_client.post('/api/employees', json={'name': 'Version Vera'})
+    assert b'Version Vera' in auth_client.get('/dashboard').data
+
+    # An edit that leaves created_at untouched and skips the app's invalidation hooks
+    with sqlite3.connect(test_app.config['DATABASE']) as db:
+        db.execute("UPDATE employees SET name = 'Version Valerie' WHERE name = 'Version Vera'")
+
+    body = auth_client.get('/dashboard').data
+    assert b'Version Valerie' in body
+    assert b'Version Vera' not in body
@@ -12,3 +12,14 @@ def test_health_endpoints(client):
     vr = client.get("/api/version")
     assert vr.status_code == 200
     assert "version" in vr.get_json()
+
+
+def test_cache_diagnostics_require_login(client):
+    """Memo and daemon counters are internal and only shown to signed-in users."""
+    r = client.get("/health/cache")
+    assert r.status_code == 401
+
+    client.post("/login", data={"username": "admin", "password": "admin123"})
+    r = client.get("/health/cache")
+    assert r.status_code == 200
+    assert "compliance_cache" in r.get_json()
@@ -0,0 +1,113 @@
+"""
+Tests for the persistent presence bitmap
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.services import compliance_snapshot
+from app.services.presence_bitmap import PresenceBitmap, load_bitmap, load_bitmaps
+from app.services.presence_delta import record_trip_change
+from app.services.rolling90 import COMPLIANCE_START_DATE, days_used_in_window, presence_days
+
+COUNTRIES = ['FR', 'DE', 'IE', 'GB', 'IT']
+
+
+def _random_trips(rng, count):
+    trips = []
+    for _ in range(count):
+        entry = COMPLIANCE_START_DATE + timedelta(days=rng.randint(-40, 500))
+        exit_d = entry + timedelta(days=rng.randint(-1, 60))
+        trips.append({'entry_date': entry.isoformat(), 'exit_date': exit_d.isoformat(),
+                      'country': rng.choice(COUNTRIES)})
+    return trips
+
+
+def test_bitmap_matches_presence_days():
+    rng = random.Random(46)
+    for _ in range(25):
+        trips = _random_trips(rng, rng.randint(0, 10))
+        presence = presence_days(trips)
+        bitmap = PresenceBitmap.from_trips(trips)
+
+        assert bitmap.intervals() == presence.calendar.intervals
+        assert len(bitmap) == len(presence)
+        for offset in range(-10, 620, 7):
+            ref = COMPLIANCE_START_DATE + timedelta(days=offset)
+            assert bitmap.days_used(ref) == days_used_in_window(presence, ref)
+            assert (ref.toordinal() in bitmap) == (ref in presence)
+
+        restored = PresenceBitmap.from_blob(bitmap.base_ord, bitmap.to_blob())
+        assert restored.intervals() == bitmap.intervals()
+
+
+def test_set_range_within_and_across_bytes():
+    base = COMPLIANCE_START_DATE.toordinal()
+    bitmap = PresenceBitmap.from_intervals([(base + 2, base + 4), (base + 6, base + 21)])
+    assert bitmap.to_blob() == bytes([0b11011100, 0xFF, 0b00111111])
+    assert bitmap.count(base, base + 7) == 5
+    assert bitmap.count(base - 30, base + 100) == 19
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Ana'), (2, 'Ben');
+        INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES
+            (1, 1, 'FR', '2026-01-01', '2026-01-10'),
+            (2, 2, 'IE', '2026-01-01', '2026-01-10');
+    ''')
+    yield connection
+    connection.close()
+
+
+def test_bitmaps_follow_snapshot_refresh_and_trip_deltas(conn):
+    ref = date(2026, 2, 1)
+    bitmaps = load_bitmaps(conn)
+    assert bitmaps[1].days_used(ref) == 10
+    assert bitmaps[2].days_used(ref) == 0
+    # Loading never writes: missing bitmaps are built in memory and the caller's transaction is untouched
+    assert conn.execute('SELECT COUNT(*) FROM employee_presence_bitmap').fetchone()[0] == 0
+    conn.execute("INSERT INTO employees (id, name) VALUES (3, 'Cy')")
+    assert load_bitmap(conn, 3).days_used(ref) == 0
+    assert conn.in_transaction
+    conn.rollback()
+    assert conn.execute('SELECT COUNT(*) FROM employees WHERE id = 3').fetchone()[0] == 0
+    compliance_snapshot.refresh_snapshots(conn, [1, 2], today=ref)
+    assert conn.execute('SELECT COUNT(*) FROM employee_presence_bitmap').fetchone()[0] == 2
+
+    conn.execute("INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES (3, 2, 'DE', '2026-01-05', '2026-01-06')")
+    # The raw write drops the stale bitmap; the snapshot refresh rebuilds it
+    assert conn.execute('SELECT COUNT(*) FROM employee_presence_bitmap WHERE employee_id = 2').fetchone()[0] == 0
+    compliance_snapshot.refresh_snapshots(conn, [2], today=ref)
+    assert conn.execute('SELECT COUNT(*) FROM employee_presence_bitmap WHERE employee_id = 2').fetchone()[0] == 1
+    assert load_bitmap(conn, 2).days_used(ref) == 2
+
+    before = {'employee_id': 1, 'entry_date': '2026-01-01', 'exit_date': '2026-01-10', 'country': 'FR'}
+    after = dict(before, exit_date='2026-01-20')
+    conn.execute("UPDATE trips SET exit_date = '2026-01-20' WHERE id = 1")
+    conn.commit()
+    record_trip_change(conn, before, after)
+    assert load_bitmap(conn, 1).days_used(ref) == 20
+
+    conn.execute('DELETE FROM employees WHERE id = 2')
+    compliance_snapshot.refresh_snapshots(conn, [2], today=ref)
+    assert load_bitmap(conn, 2) is None
+    assert set(load_bitmaps(conn)) == {1}
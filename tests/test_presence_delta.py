@@ -0,0 +1,211 @@
+"""
+Tests for incremental presence maintenance
+"""
+
+import random
+import sqlite3
+from datetime import date, timedelta
+
+import pytest
+
+from app.repositories import compliance_repository, data_version_repository
+from app.services.presence_delta import (
+    CoverageCounts,
+    apply_trip_delta,
+    record_trip_change,
+    trip_interval,
+    window_changes,
+)
+from app.services.rolling90 import days_used_in_window, presence_days
+
+ORIGIN = date(2025, 11, 1)
+COUNTRIES = ['FR', 'DE', 'IE', 'GB', 'IT']
+
+
+def _random_trip(rng, employee_id=1):
+    entry = ORIGIN + timedelta(days=rng.randint(-30, 400))
+    exit_d = entry + timedelta(days=rng.randint(0, 40))
+    return {
+        'employee_id': employee_id,
+        'entry_date': entry.isoformat(),
+        'exit_date': exit_d.isoformat(),
+        'country': rng.choice(COUNTRIES),
+    }
+
+
+def _totals(trips, refs):
+    presence = presence_days(trips)
+    return {ref: days_used_in_window(presence, ref) for ref in refs}
+
+
+def test_trip_interval_mirrors_presence_filter():
+    assert trip_interval({'entry_date': '2026-01-01', 'exit_date': '2026-01-03', 'country': 'FR'}) == (
+        date(2026, 1, 1).toordinal(), date(2026, 1, 3).toordinal())
+    assert trip_interval({'entry_date': '2026-01-01', 'exit_date': '2026-01-03', 'country': 'IE'}) is None
+    assert trip_interval({'entry_date': '2026-01-05', 'exit_date': '2026-01-03', 'country': 'FR'}) is None
+    assert trip_interval({'entry_date': '2025-10-01', 'exit_date': '2025-10-20', 'country': 'FR'}) is None
+    assert trip_interval(None) is None
+
+
+def test_random_edits_report_exact_window_changes():
+    rng = random.Random(90180)
+    trips = [_random_trip(rng) for _ in range(12)]
+    coverage = CoverageCounts.from_trips(trips)
+    refs = [ORIGIN + timedelta(days=offset) for offset in range(-40, 700)]
+    totals = _totals(trips, refs)
+
+    for _ in range(60):
+        index = rng.randrange(len(trips))
+        action = rng.choice(['move', 'create', 'delete'])
+        before = trips[index] if action != 'create' else None
+        after = _random_trip(rng) if action != 'delete' else None
+        if action == 'move':
+            trips[index] = after
+        elif action == 'create':
+            trips.append(after)
+        elif len(trips) > 1:
+            trips.pop(index)
+        else:
+            continue
+
+        flips = apply_trip_delta(coverage, trip_interval(before), trip_interval(after))
+        assert coverage.intervals() == presence_days(trips).calendar.intervals
+
+        new_totals = _totals(trips, refs)
+        reported = {}
+        for first, last, delta in window_changes(flips):
+            for offset in range((last - first).days + 1):
+                reported[first + timedelta(days=offset)] = delta
+        for ref in refs:
+            assert new_totals[ref] - totals[ref] == reported.get(ref, 0), (action, ref)
+            assert coverage.days_used(ref) == new_totals[ref]
+        totals = new_totals
+
+
+def test_overlapping_trip_edit_changes_nothing():
+    outer = {'entry_date': '2026-01-01', 'exit_date': '2026-01-31', 'country': 'FR'}
+    inner = {'entry_date': '2026-01-10', 'exit_date': '2026-01-12', 'country': 'DE'}
+    moved = {'entry_date': '2026-01-20', 'exit_date': '2026-01-22', 'country': 'DE'}
+    coverage = CoverageCounts.from_trips([outer, inner])
+
+    flips = apply_trip_delta(coverage, trip_interval(inner), trip_interval(moved))
+
+    assert flips == {}
+    assert window_changes(flips) == []
+
+
+def test_blob_round_trip():
+    coverage = CoverageCounts.from_trips([
+        {'entry_date': '2026-01-01', 'exit_date': '2026-01-10', 'country': 'FR'},
+        {'entry_date': '2026-01-05', 'exit_date': '2026-01-20', 'country': 'DE'},
+    ])
+    restored = CoverageCounts.from_blob(coverage.base_ord, coverage.to_blob())
+    assert restored.base_ord == coverage.base_ord
+    assert list(restored.counts) == list(coverage.counts)
+
+
+@pytest.fixture
+def conn():
+    connection = sqlite3.connect(':memory:')
+    connection.row_factory = sqlite3.Row
+    connection.executescript('''
+        CREATE TABLE employees (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE trips (
+            id INTEGER PRIMARY KEY,
+            employee_id INTEGER NOT NULL,
+            country TEXT NOT NULL,
+            entry_date DATE NOT NULL,
+            exit_date DATE NOT NULL,
+            entry_ord INTEGER,
+            exit_ord INTEGER,
+            country_code TEXT,
+            is_schengen INTEGER
+        );
+        INSERT INTO employees (id, name) VALUES (1, 'Ana'), (2, 'Ben');
+    ''')
+    data_version_repository.ensure_schema(connection)
+    yield connection
+    connection.close()
+
+
+def _write_trip(conn, trip_id, trip):
+    if trip is None:
+        conn.execute('DELETE FROM trips WHERE id = ?', (trip_id,))
+    else:
+        conn.execute(
+            'INSERT INTO trips (id, employee_id, country, entry_date, exit_date) VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (id) DO UPDATE SET employee_id = excluded.employee_id, country = excluded.country, '
+            'entry_date = excluded.entry_date, exit_date = excluded.exit_date',
+            (trip_id, trip['employee_id'], trip['country'], trip['entry_date'], trip['exit_date']),
+        )
+    conn.commit()
+
+
+def test_record_trip_change_persists_counts_across_employees(conn):
+    first = {'employee_id': 1, 'entry_date': '2026-01-01', 'exit_date': '2026-01-10', 'country': 'FR'}
+    _write_trip(conn, 1, first)
+    # Nothing persisted yet: counts are rebuilt from trips (which already hold the write)
+    deltas = record_trip_change(conn, None, first)
+    changes = deltas[1].window_changes
+    assert changes[0] == (date(2026, 1, 2), date(2026, 1, 2), 1)
+    assert changes[-1] == (date(2026, 7, 9), date(2026, 7, 9), 1)
+    assert max(delta for _, _, delta in changes) == 10
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 10
+
+    moved = dict(first, employee_id=2)
+    _write_trip(conn, 1, moved)
+    deltas = record_trip_change(conn, first, moved)
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 0
+    assert deltas[2].coverage.days_used(date(2026, 2, 1)) == 10
+    assert deltas[1].affects(date(2026, 2, 1)) and deltas[2].affects(date(2026, 2, 1))
+
+    stored = conn.execute('SELECT employee_id FROM employee_presence_counts ORDER BY employee_id').fetchall()
+    assert [row[0] for row in stored] == [1, 2]
+
+
+def test_interleaved_edits_from_two_workers_keep_counts_exact(conn):
+    first = {'employee_id': 1, 'entry_date': '2026-01-01', 'exit_date': '2026-01-10', 'country': 'FR'}
+    second = {'employee_id': 1, 'entry_date': '2026-01-20', 'exit_date': '2026-01-24', 'country': 'DE'}
+    _write_trip(conn, 1, first)
+    record_trip_change(conn, None, first)
+
+    # Both edits commit before either worker records its change, then they record out of order
+    extended = dict(first, exit_date='2026-01-15')
+    _write_trip(conn, 1, extended)
+    _write_trip(conn, 2, second)
+    deltas = record_trip_change(conn, None, second)
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 20
+    assert deltas[1].affects(date(2026, 1, 16))  # the other worker's extension is reported too
+
+    deltas = record_trip_change(conn, first, extended)
+    assert not deltas[1].changed
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 20
+
+    # Counts are current again, so the next write is applied as a delta
+    _write_trip(conn, 2, None)
+    deltas = record_trip_change(conn, second, None)
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 15
+    assert deltas[1].window_changes[0] == (date(2026, 1, 21), date(2026, 1, 21), -1)
+
+
+def test_consecutive_edits_apply_the_delta_without_reading_trips(conn, monkeypatch):
+    first = {'employee_id': 1, 'entry_date': '2026-01-01', 'exit_date': '2026-01-10', 'country': 'FR'}
+    _write_trip(conn, 1, first)
+    record_trip_change(conn, None, first)
+    record_trip_change(conn, None, {'employee_id': 2})  # persist Ben's (empty) counts
+
+    def no_trip_reads(*args, **kwargs):
+        raise AssertionError('incremental path read the trips table')
+
+    monkeypatch.setattr(compliance_repository, 'fetch_trips_by_employee', no_trip_reads)
+    extended = dict(first, exit_date='2026-01-15')
+    _write_trip(conn, 1, extended)
+    deltas = record_trip_change(conn, first, extended)
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 15
+    assert deltas[1].affects(date(2026, 1, 12)) and not deltas[1].affects(date(2026, 1, 5))
+
+    moved = dict(extended, employee_id=2)
+    _write_trip(conn, 1, moved)
+    deltas = record_trip_change(conn, extended, moved)
+    assert deltas[1].coverage.days_used(date(2026, 2, 1)) == 0
+    assert deltas[2].coverage.days_used(date(2026, 2, 1)) == 15
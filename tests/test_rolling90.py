@@ -7,7 +7,8 @@ from datetime import date, timedelta
 from app.services.rolling90 import (
     presence_days, days_used_in_window, earliest_safe_entry,
     calculate_days_remaining, get_risk_level, days_until_compliant,
-    is_schengen_country
+    is_schengen_country, PresenceCalendar, merge_intervals, usage_timeline,
+    max_permissible_stay, normalized_trip_columns
 )
 
 
@@ -199,3 +200,196 @@ class TestEdgeCases:
         presence = presence_days(trips)
         expected = {date(2024, 1, 30), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 2)}
         assert presence == expected
+
+
+class TestPresenceCalendar:
+    def _brute_force_used(self, presence, ref_date, compliance_start_date=None):
+        window_start = ref_date - timedelta(days=180)
+        if compliance_start_date:
+            window_start = max(window_start, compliance_start_date)
+        return sum(1 for d in presence if window_start <= d <= ref_date - timedelta(days=1))
+
+    def test_matches_brute_force_window_counts(self):
+        """Prefix-sum counts match a direct scan for every reference date"""
+        trips = [
+            {'entry_date': '2025-11-01', 'exit_date': '2025-12-20', 'country': 'FR'},
+            {'entry_date': '2026-01-10', 'exit_date': '2026-02-15', 'country': 'DE'},
+            {'entry_date': '2026-02-10', 'exit_date': '2026-03-01', 'country': 'IT'},
+            {'entry_date': '2026-04-01', 'exit_date': '2026-04-05', 'country': 'IE'},
+        ]
+        presence = presence_days(trips)
+        calendar = PresenceCalendar.from_dates(presence)
+        start = date(2025, 10, 1)
+        for offset in range(400):
+            ref = start + timedelta(days=offset)
+            expected = self._brute_force_used(presence, ref, date(2025, 10, 12))
+            assert calendar.days_used(ref) == expected
+            assert days_used_in_window(presence, ref) == expected
+
+    def test_plain_set_input(self):
+        """Adapters still accept ordinary sets of dates"""
+        presence = {date(2024, 1, 1) + timedelta(days=i) for i in range(95)}
+        ref = date(2024, 4, 10)
+        assert days_used_in_window(presence, ref, None) == self._brute_force_used(presence, ref)
+
+    def test_empty_calendar(self):
+        calendar = PresenceCalendar.from_dates(set())
+        assert len(calendar) == 0
+        assert calendar.days_used(date(2026, 1, 1)) == 0
+        assert calendar.first_on_or_after(0) is None
+        assert calendar.earliest_safe_entry(date(2026, 1, 1)) is None
+
+    def test_first_on_or_after(self):
+        days = {date(2026, 1, 1), date(2026, 1, 5)}
+        calendar = PresenceCalendar.from_dates(days)
+        assert calendar.first_on_or_after(date(2025, 12, 1).toordinal()) == date(2026, 1, 1).toordinal()
+        assert calendar.first_on_or_after(date(2026, 1, 2).toordinal()) == date(2026, 1, 5).toordinal()
+        assert calendar.first_on_or_after(date(2026, 1, 6).toordinal()) is None
+
+    def test_earliest_safe_entry_matches_linear_scan(self):
+        """Sweep result equals the first day whose window count drops below the limit"""
+        presence = {date(2025, 11, 1) + timedelta(days=i) for i in range(100)}
+        today = date(2026, 2, 15)
+        expected = None
+        for offset in range(1, 181):
+            candidate = today + timedelta(days=offset)
+            if self._brute_force_used(presence, candidate, date(2025, 10, 12)) <= 89:
+                expected = candidate
+                break
+        assert earliest_safe_entry(presence, today) == expected
+        days, when = days_until_compliant(presence, today)
+        if calculate_days_remaining(presence, today) < 0:
+            assert when == expected and days == (expected - today).days
+
+
+class TestPresenceIntervals:
+    def test_merge_intervals(self):
+        """Overlapping and adjacent runs collapse; reversed runs are dropped"""
+        assert merge_intervals([(10, 12), (1, 3), (4, 5), (11, 20), (30, 29)]) == [(1, 5), (10, 20)]
+
+    def test_presence_days_uses_merged_intervals(self):
+        """Overlapping Schengen trips become one interval; Ireland is ignored"""
+        trips = [
+            {'entry_date': '2025-11-01', 'exit_date': '2025-11-10', 'country': 'FR'},
+            {'entry_date': '2025-11-05', 'exit_date': '2025-11-15', 'country': 'DE'},
+            {'entry_date': '2025-11-16', 'exit_date': '2025-11-20', 'country': 'IE'},
+        ]
+        presence = presence_days(trips)
+        start = date(2025, 11, 1)
+        assert presence.calendar.intervals == [(start.toordinal(), date(2025, 11, 15).toordinal())]
+        assert len(presence) == 15
+        assert date(2025, 11, 15) in presence
+        assert date(2025, 11, 16) not in presence
+        assert presence == {start + timedelta(days=i) for i in range(15)}
+
+    def test_long_history_counts_without_expansion(self):
+        """Multi-year secondments count correctly from interval arithmetic"""
+        trips = [{'entry_date': '2025-10-12', 'exit_date': '2030-10-11', 'country': 'NL'}]
+        presence = presence_days(trips)
+        assert len(presence.calendar.intervals) == 1
+        assert days_used_in_window(presence, date(2028, 1, 1)) == 180
+        assert days_used_in_window(presence, date(2025, 12, 1)) == (date(2025, 12, 1) - date(2025, 10, 12)).days
+
+
+class TestNormalizedTripColumns:
+    def test_columns_match_parsing(self):
+        """Write-time columns carry ordinals, the code and the Schengen flag"""
+        assert normalized_trip_columns('2026-01-01', '2026-01-05', ' france ') == {
+            'entry_ord': date(2026, 1, 1).toordinal(),
+            'exit_ord': date(2026, 1, 5).toordinal(),
+            'country_code': 'FR',
+            'is_schengen': 1,
+        }
+        columns = normalized_trip_columns(date(2026, 2, 1), 'not-a-date', 'ie')
+        assert columns['country_code'] == 'IE'
+        assert columns['is_schengen'] == 0
+        assert columns['entry_ord'] == date(2026, 2, 1).toordinal()
+        assert columns['exit_ord'] is None
+
+    def test_presence_from_columns_matches_string_path(self):
+        """Rows carrying the columns give the same presence as raw rows"""
+        trips = [
+            {'entry_date': '2025-11-01', 'exit_date': '2025-11-10', 'country': 'FR'},
+            {'entry_date': '2025-11-05', 'exit_date': '2025-11-15', 'country': 'Germany'},
+            {'entry_date': '2025-11-16', 'exit_date': '2025-11-20', 'country': 'IE'},
+            {'entry_date': '2025-09-01', 'exit_date': '2025-10-20', 'country': 'IT'},
+            {'entry_date': '2025-12-05', 'exit_date': '2025-12-01', 'country': 'ES'},
+        ]
+        normalized = [
+            dict(trip, **normalized_trip_columns(trip['entry_date'], trip['exit_date'], trip['country']))
+            for trip in trips
+        ]
+        assert presence_days(normalized).calendar.intervals == presence_days(trips).calendar.intervals
+        assert presence_days(normalized, None).calendar.intervals == presence_days(trips, None).calendar.intervals
+
+
+class TestUsageTimeline:
+    def test_matches_per_date_window_counts(self):
+        """Every timeline entry equals days_used_in_window for that date"""
+        trips = [
+            {'entry_date': '2025-09-01', 'exit_date': '2025-10-30', 'country': 'FR'},
+            {'entry_date': '2025-12-01', 'exit_date': '2026-01-31', 'country': 'DE'},
+            {'entry_date': '2026-03-01', 'exit_date': '2026-03-20', 'country': 'IE'},
+            {'entry_date': '2026-04-10', 'exit_date': '2026-05-10', 'country': 'ES'},
+        ]
+        presence = presence_days(trips)
+        start, end = date(2025, 10, 1), date(2026, 8, 1)
+        timeline = usage_timeline(presence, start, end)
+        assert len(timeline['days_used']) == (end - start).days + 1
+        for k, used in enumerate(timeline['days_used']):
+            day = start + timedelta(days=k)
+            assert used == days_used_in_window(presence, day)
+            assert timeline['days_remaining'][k] == calculate_days_remaining(presence, day)
+
+    def test_empty_range(self):
+        timeline = usage_timeline(set(), date(2026, 1, 2), date(2026, 1, 1))
+        assert len(timeline['days_used']) == 0
+
+
+class TestMaxPermissibleStay:
+    def _brute_force(self, presence, entry, limit=90):
+        best = 0
+        for length in range(1, 181):
+            stay = {entry + timedelta(days=i) for i in range(length)}
+            combined = set(presence) | stay
+            if all(
+                sum(1 for d in combined if day - timedelta(days=179) <= d <= day and d >= date(2025, 10, 12)) <= limit
+                for day in stay
+            ):
+                best = length
+            else:
+                break
+        return best
+
+    def test_docstring_example(self):
+        presence = {date(2026, 1, 1) + timedelta(days=i) for i in range(80)}
+        assert max_permissible_stay(presence, date(2026, 4, 1)) == (10, date(2026, 4, 10))
+
+    def test_cannot_enter(self):
+        presence = {date(2026, 1, 1) + timedelta(days=i) for i in range(90)}
+        assert max_permissible_stay(presence, date(2026, 4, 1)) == (0, None)
+
+    def test_matches_brute_force(self):
+        """Sliding result equals checking every candidate stay length directly"""
+        trips = [
+            {'entry_date': '2025-11-01', 'exit_date': '2025-12-15', 'country': 'FR'},
+            {'entry_date': '2026-02-01', 'exit_date': '2026-02-20', 'country': 'DE'},
+            {'entry_date': '2026-05-01', 'exit_date': '2026-05-10', 'country': 'IT'},
+        ]
+        presence = presence_days(trips)
+        for entry in (date(2026, 1, 5), date(2026, 3, 1), date(2026, 4, 20), date(2026, 6, 15)):
+            days, last_day = max_permissible_stay(presence, entry)
+            assert days == self._brute_force(presence, entry)
+            if days:
+                assert last_day == entry + timedelta(days=days - 1)
+
+
+def test_max_stay_api_rejects_unknown_employee(auth_client):
+    emp_id = auth_client.post('/api/employees', json={'name': 'Stay Stan'}).get_json()['id']
+
+    response = auth_client.post('/api/max_stay', json={'employee_id': emp_id, 'entry_date': '2026-03-01'})
+    assert response.status_code == 200
+    assert response.get_json()['max_stay_days'] == 90
+
+    response = auth_client.post('/api/max_stay', json={'employee_id': emp_id + 999, 'entry_date': '2026-03-01'})
+    assert response.status_code == 404
@@ -22,3 +22,24 @@ def test_admin_hash_synced_from_env(fresh_app):
     assert row is not None
     assert row[0] == TEST_ADMIN_HASH
 
+
+
+def test_trip_normalized_columns_backfilled(fresh_app):
+    from app.models import backfill_trip_normalized_columns
+
+    app, db_path = fresh_app
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO employees (name) VALUES ('Backfill')")
+    employee_id = conn.execute("SELECT MAX(id) FROM employees").fetchone()[0]
+    conn.execute(
+        "INSERT INTO trips (employee_id, country, entry_date, exit_date) VALUES (?, 'Spain', '2026-01-01', '2026-01-03')",
+        (employee_id,),
+    )
+    assert backfill_trip_normalized_columns(conn) >= 1
+    row = conn.execute(
+        "SELECT entry_ord, exit_ord, country_code, is_schengen FROM trips WHERE employee_id = ?", (employee_id,)
+    ).fetchone()
+    indexes = {r[1] for r in conn.execute("PRAGMA index_list(trips)")}
+    conn.close()
+    assert row == (739617, 739619, 'ES', 1)
+    assert 'idx_trips_schengen_employee' in indexes
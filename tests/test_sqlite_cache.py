@@ -0,0 +1,89 @@
+"""
+Tests for the shared SQLite response cache
+"""
+
+import multiprocessing
+import time
+
+from app.utils import sqlite_cache
+from app.utils.sqlite_cache import SQLiteCache
+from app.utils.tagged_cache import DASHBOARD_TAG, NEWS_TAG, employee_tag
+
+
+def _worker_writes(path):
+    cache = SQLiteCache(path)
+    cache.set('forecast:1', {'used': 12}, tags=(employee_tag(1),))
+    cache.invalidate(DASHBOARD_TAG)
+
+
+def test_entries_and_invalidation_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = SQLiteCache(path)
+    cache.set('dashboard:first_name', '<html>', tags=(DASHBOARD_TAG,))
+    cache.set('news:home', [{'title': 'Entry/Exit System'}], tags=(NEWS_TAG,))
+
+    worker = multiprocessing.Process(target=_worker_writes, args=(path,))
+    worker.start()
+    worker.join(10)
+    assert worker.exitcode == 0
+
+    assert cache.get('dashboard:first_name') is None
+    assert cache.get('news:home') == [{'title': 'Entry/Exit System'}]
+    assert cache.get('forecast:1') == {'used': 12}
+
+
+def test_overwrite_replaces_tags_and_ttl_expires(tmp_path, monkeypatch):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'), default_timeout=60)
+    cache.set('fragment', 'v1', tags=(employee_tag(1),))
+    cache.set('fragment', 'v2', tags=(employee_tag(2),))
+    cache.invalidate(employee_tag(1))
+    assert cache.get('fragment') == 'v2'
+    cache.invalidate(employee_tag(2))
+    assert cache.get('fragment') is None
+
+    cache.set('short', 1, timeout=5)
+    cache.set('default', 2)
+    cache.set('forever', 3, timeout=0)
+    now = time.time()
+    monkeypatch.setattr(sqlite_cache.time, 'time', lambda: now + 30)
+    assert cache.get('short') is None and not cache.has('short')
+    assert cache.get('default') == 2
+    monkeypatch.setattr(sqlite_cache.time, 'time', lambda: now + 3600)
+    assert cache.get('default') is None
+    assert cache.get('forever') == 3
+    assert cache.prune() == 2
+
+    assert cache.delete('forever') is True
+    assert cache.get('forever') is None
+
+
+def test_warm_hits_are_a_single_read_on_the_thread_connection(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'))
+    cache.set('dashboard:first_name', 'x' * 200_000, tags=(DASHBOARD_TAG,))
+    conn = cache._connect()
+    changes = conn.total_changes
+    statements = []
+    conn.set_trace_callback(statements.append)
+
+    for _ in range(5):
+        assert cache.get('dashboard:first_name') == 'x' * 200_000
+    conn.set_trace_callback(None)
+
+    assert cache._connect() is conn
+    assert conn.total_changes == changes
+    assert len(statements) == 5 and all(sql.startswith('SELECT value FROM cache_entries') for sql in statements)
+
+
+def test_value_computed_before_invalidation_is_not_stored(tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.db'))
+    other_worker = SQLiteCache(str(tmp_path / 'cache.db'))
+    tags = (DASHBOARD_TAG, employee_tag(1))
+
+    tokens = cache.tag_tokens(tags)
+    other_worker.invalidate(employee_tag(1))  # a write lands while the page is rendered
+    assert cache.set('dashboard:first_name', '<stale>', tags=tags, tokens=tokens) is False
+    assert cache.get('dashboard:first_name') is None
+
+    tokens = cache.tag_tokens(tags)
+    assert cache.set('dashboard:first_name', '<fresh>', tags=tags, tokens=tokens) is True
+    assert other_worker.get('dashboard:first_name') == '<fresh>'
@@ -0,0 +1,116 @@
+"""
+Tests for the multi-rule stay engine
+"""
+
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from app.services.rolling90 import days_used_in_window, presence_days
+from app.services.stay_rules import (
+    SCHENGEN_RULE,
+    SCHENGEN_RULE_KEY,
+    StayRule,
+    evaluate_rules,
+    parse_rule,
+    rules_from_config,
+)
+
+TODAY = date(2026, 3, 1)
+COUNTRIES = ['FR', 'DE', 'IE', 'IT', 'GB', 'ES', 'France']
+
+
+def _days(trips, countries, start, end):
+    """Brute-force count of distinct days in [start, end] spent in ``countries``."""
+    days = set()
+    for trip in trips:
+        entry = date.fromisoformat(trip['entry_date'])
+        exit_ = date.fromisoformat(trip['exit_date'])
+        if trip['country'] not in countries or entry < date(2025, 10, 12):
+            continue
+        day = entry
+        while day <= exit_:
+            if start <= day <= end:
+                days.add(day)
+            day += timedelta(days=1)
+    return len(days)
+
+
+def test_schengen_rule_matches_rolling90_and_extra_rules_match_brute_force():
+    rng = random.Random(11)
+    rules = (
+        SCHENGEN_RULE,
+        StayRule('fr', 'France 60/365', 365, 60, frozenset({'FR'})),
+        StayRule('de_it', 'DE+IT 30/90', 90, 30, frozenset({'DE', 'IT'})),
+    )
+    for _ in range(150):
+        trips = []
+        for _ in range(rng.randint(0, 6)):
+            entry = date(2025, 9, 1) + timedelta(days=rng.randint(0, 200))
+            trips.append({
+                'entry_date': entry.isoformat(),
+                'exit_date': (entry + timedelta(days=rng.randint(0, 50))).isoformat(),
+                'country': rng.choice(COUNTRIES),
+            })
+
+        results = evaluate_rules(trips, rules, TODAY)
+
+        assert results[SCHENGEN_RULE_KEY]['days_used'] == days_used_in_window(presence_days(trips), TODAY)
+        end = TODAY - timedelta(days=1)
+        assert results['fr']['days_used'] == _days(trips, {'FR', 'France'}, TODAY - timedelta(days=365), end)
+        assert results['de_it']['days_used'] == _days(trips, {'DE', 'IT'}, TODAY - timedelta(days=90), end)
+
+
+def test_non_schengen_rule_counts_ireland_and_reports_limits():
+    trips = [
+        {'entry_date': '2026-01-01', 'exit_date': '2026-01-31', 'country': 'IE'},
+        {'entry_date': '2026-01-20', 'exit_date': '2026-02-10', 'country': 'IE'},
+    ]
+    rule = StayRule('ie', 'Ireland 30/180', 180, 30, frozenset({'IE'}))
+
+    results = evaluate_rules(trips, (SCHENGEN_RULE, rule), TODAY)
+
+    assert results[SCHENGEN_RULE_KEY]['days_used'] == 0
+    assert results['ie']['days_used'] == 41
+    assert results['ie']['days_remaining'] == -11
+    assert results['ie']['over_limit'] is True
+    assert results['ie']['risk_level'] == 'red'
+    assert list(results) == [SCHENGEN_RULE_KEY, 'ie']
+
+
+def test_rule_parsing_and_config_validation():
+    rule = parse_rule({'key': 'fr', 'countries': ['france', 'fr'], 'window_days': 365, 'limit': 60})
+    assert rule.countries == frozenset({'FR'})
+    assert rule.label == 'fr'
+    assert parse_rule({'key': 's', 'countries': 'SCHENGEN', 'window_days': 30, 'limit': 5}).countries is None
+
+    with pytest.raises(ValueError):
+        parse_rule({'key': 'bad', 'window_days': 0, 'limit': 5})
+
+    rules = rules_from_config([
+        {'key': 'fr', 'countries': ['FR'], 'window_days': 365, 'limit': 60},
+        {'key': 'fr', 'countries': ['DE'], 'window_days': 365, 'limit': 60},
+        {'key': 'broken'},
+    ])
+    assert [rule.key for rule in rules] == [SCHENGEN_RULE_KEY, 'fr']
+
+
+def test_dashboard_shows_configured_rules(test_app, auth_client, monkeypatch):
+    monkeypatch.setitem(test_app.config['CONFIG'], 'STAY_RULES', [
+        {'key': 'de_residency', 'label': 'Germany 183-day', 'countries': ['DE'], 'window_days': 365, 'limit': 183},
+    ])
+    employee = auth_client.post('/api/employees', json={'name': 'Rule Rita'})
+    emp_id = employee.get_json()['id']
+    today = date.today()
+    auth_client.post('/api/trips', json={
+        'employee_id': emp_id,
+        'country': 'DE',
+        'start_date': (today - timedelta(days=10)).isoformat(),
+        'end_date': (today - timedelta(days=1)).isoformat(),
+    })
+
+    response = auth_client.get('/dashboard?sort=last_name')
+
+    assert response.status_code == 200
+    assert b'Germany 183-day: 10/183' in response.data
@@ -0,0 +1,83 @@
+"""
+Tests for tag-based cache invalidation
+"""
+
+from cachelib import SimpleCache
+
+from app.utils.tagged_cache import (
+    AGGREGATE_TAGS,
+    DASHBOARD_TAG,
+    ENTRY_REQUIREMENTS_TAG,
+    NEWS_TAG,
+    TaggedCache,
+    employee_tag,
+)
+
+
+def test_invalidate_evicts_only_tagged_entries():
+    cache = TaggedCache(SimpleCache())
+    cache.set('dashboard:first_name', 'page', tags=(DASHBOARD_TAG,))
+    cache.set('forecast:1', {'used': 10}, tags=(employee_tag(1),))
+    cache.set('forecast:2', {'used': 20}, tags=(employee_tag(2),))
+    cache.set('news:home', ['item'], tags=(NEWS_TAG,))
+    cache.set('plain', 42)
+
+    cache.invalidate(employee_tag(1), *AGGREGATE_TAGS)
+
+    assert cache.get('dashboard:first_name') is None
+    assert cache.get('forecast:1') is None
+    assert cache.get('forecast:2') == {'used': 20}
+    assert cache.get('news:home') == ['item']
+    assert cache.get('plain') == 42
+
+    # Entries stored after an invalidation are valid again
+    cache.set('forecast:1', {'used': 11}, tags=(employee_tag(1),))
+    assert cache.get('forecast:1') == {'used': 11}
+
+
+def test_entry_with_several_tags_and_lost_tag_tokens():
+    backend = SimpleCache()
+    cache = TaggedCache(backend)
+    cache.set('calendar:trips', 'feed', tags=('calendar', 'alerts'))
+    cache.invalidate('alerts')
+    assert cache.get('calendar:trips') is None
+
+    cache.set('calendar:trips', 'feed', tags=('calendar',))
+    backend.delete('_tag:calendar')  # an evicted tag token must not resurrect old entries
+    assert cache.get('calendar:trips') is None
+
+
+def test_value_computed_before_invalidation_is_not_served():
+    cache = TaggedCache(SimpleCache())
+    tokens = cache.tag_tokens((DASHBOARD_TAG, employee_tag(1)))
+    cache.invalidate(employee_tag(1))  # a write lands while the page is rendered
+    cache.set('dashboard:first_name', '<stale>', tags=(DASHBOARD_TAG, employee_tag(1)), tokens=tokens)
+    assert cache.get('dashboard:first_name') is None
+
+    tokens = cache.tag_tokens((DASHBOARD_TAG, employee_tag(1)))
+    cache.set('dashboard:first_name', '<fresh>', tags=(DASHBOARD_TAG, employee_tag(1)), tokens=tokens)
+    assert cache.get('dashboard:first_name') == '<fresh>'
+
+
+def test_trip_write_keeps_unrelated_cached_pages(test_app, auth_client):
+    cache = test_app.config['CACHE']
+    first = auth_client.post('/api/employees', json={'name': 'Tag Tara'}).get_json()['id']
+    second = auth_client.post('/api/employees', json={'name': 'Tag Tom'}).get_json()['id']
+    auth_client.get('/api/entry-requirements')
+    with test_app.app_context():
+        cache.set('forecast-fragment', 'first', tags=(employee_tag(first),))
+        cache.set('other-fragment', 'second', tags=(employee_tag(second),))
+        cache.set('dashboard-fragment', 'all', tags=(DASHBOARD_TAG,))
+
+    response = auth_client.post('/api/trips', json={
+        'employee_id': first, 'country': 'FR', 'start_date': '2026-01-05', 'end_date': '2026-01-09',
+    })
+    assert response.status_code in (200, 201)
+
+    with test_app.app_context():
+        assert cache.get('forecast-fragment') is None
+        assert cache.get('dashboard-fragment') is None
+        assert cache.get('other-fragment') == 'second'
+        assert cache.get('entry_requirements:sorted') is not None
+        cache.invalidate(ENTRY_REQUIREMENTS_TAG)
+        assert cache.get('entry_requirements:sorted') is None